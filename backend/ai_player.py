@@ -1,48 +1,453 @@
 """
 五子棋AI玩家实现
-使用Minimax算法配合Alpha-Beta剪枝和启发式评估函数
+使用Minimax算法配合Alpha-Beta剪枝和启发式评估函数，
+高难度默认使用Negamax + PVS（主要变例搜索）引擎
 """
 
+import cProfile
+import pstats
 import random
-from game_logic import GomokuGame
+import time
+from concurrent.futures import wait
+from concurrent.futures.process import BrokenProcessPool
+from game_logic import GomokuGame, NEAR_WEIGHT
+from transposition import TranspositionTable, EXACT, LOWER, UPPER
+from evaluator import IncrementalEvaluator
+from threat_search import ThreatSolver
+from vector_eval import HAS_NUMPY, evaluate_components, position_values
+from parallel_search import get_pool, shutdown_pool, score_root_task, timed_out_root_result
+from patterns import (PATTERN_TABLE, FIVE, OPEN_FOUR, FOUR,
+                      OPEN_THREE, THREE, window_code, threat_map)
+
+# 置换表键中区分行棋方的Zobrist常量（最大化一方行棋时异或到局面哈希上）
+MAXIMIZING_KEY = 0x9E3779B97F4A7C15
+# PVS引擎的分数以行棋方为视角，使用另一组行棋方常量，避免与minimax的条目混用
+SIDE_KEYS = {1: 0x3C6EF372FE94F82B, 2: 0xA54FF53A5F1D36F1}
+# minimax的分数以AI执子方为视角；为黑方分析时异或此常量，避免与为白方搜索的条目混用
+BLACK_VIEW_KEY = 0x510E527FADE682D1
+
+# 搜索引擎：minimax 为原有的双分支Alpha-Beta；pvs 为Negamax + 主要变例搜索
+ENGINES = ('minimax', 'pvs')
+
+# 胜负分数：PVS引擎中第ply层获胜记为 WIN_SCORE - ply，越快获胜分数越高
+WIN_SCORE = 100000
+MATE_THRESHOLD = WIN_SCORE - 1000
+# 根节点期望窗口的半宽
+ASPIRATION_WINDOW = 200
+
+# 各难度在常规搜索前使用的威胁空间搜索：vcf 只找连续冲四，vct 再加上活三
+THREAT_SEARCH_MODES = {3: 'vcf', 4: 'vcf', 5: 'vct'}
+# VCT最多占用本步思考时间的比例；不限时搜索时VCT的时间上限（毫秒）
+VCT_TIME_FRACTION = 0.25
+VCT_DEFAULT_TIME_MS = 500
+
+# 关键位置的棋型价值：对手在此落子形成的棋型（防守）/ AI在此落子形成的棋型（进攻）
+DEFENSE_VALUES = {FIVE: 50000, OPEN_FOUR: 40000, FOUR: 8000, OPEN_THREE: 3000, THREE: 500}
+ATTACK_VALUES = {FIVE: 100000, OPEN_FOUR: 80000, FOUR: 15000, OPEN_THREE: 5000, THREE: 1000}
+
+# 每搜索多少个节点检查一次是否超时
+TIME_CHECK_INTERVAL = 64
+# 根节点并行搜索时，超过截止时间后再等待工作进程返回的时间（毫秒）
+ROOT_TASK_GRACE_MS = 100
+
+# 后台预读时最多提前搜索的对手应手数
+PONDER_REPLIES = 3
+
+# 提示复用置换表条目的最低搜索深度：更浅的结果不如重新搜索
+MIN_REUSE_DEPTH = 2
+
+
+class SearchTimeout(Exception):
+    """搜索时间用完，中止当前迭代"""
+    pass
+
+
+def is_mate_score(score):
+    """分数是否表示已搜到必胜/必败"""
+    return abs(score) >= MATE_THRESHOLD
+
 
 class GomokuAI:
-    def __init__(self, difficulty=3):
+    def __init__(self, difficulty=3, tt_size_bits=16, time_limit_ms=None, engine=None,
+                 use_numpy=None, workers=1, seed=None, opening_book=None, position_cache=None,
+                 collect_stats=False, profile=False, max_time_ms=None):
         """
         初始化AI玩家
         :param difficulty: 难度等级 (1-5)，影响搜索深度
+        :param tt_size_bits: 置换表大小（2的幂次），默认65536个槽位
+        :param time_limit_ms: 每步默认思考时间上限（毫秒），None表示只受搜索深度限制
+        :param engine: 搜索引擎 'minimax' 或 'pvs'，默认难度4及以上使用pvs
+        :param use_numpy: 是否使用NumPy向量化评估，默认已安装NumPy时使用；未安装时总是回退到纯Python实现
+        :param workers: 根节点并行搜索的工作进程数，1表示在当前进程内串行搜索
+        :param seed: 随机种子；指定后开局选点可复现，并且搜索按固定深度进行、不受思考时间影响，
+                     同一局面总是得到相同结果
+        :param opening_book: 开局库（OpeningBook实例），收录的局面直接走库中的落子
+        :param position_cache: 多个AI共享的局面缓存（PositionCache实例），对称的局面复用已完成的搜索结果
+        :param collect_stats: 是否在搜索结果中附带详细统计（result['stats']，见 build_stats）
+        :param profile: 是否用cProfile剖析每次搜索，结果保存在 last_profile（pstats.Stats）
+        :param max_time_ms: 每步思考时间的硬上限（毫秒），指定seed时也生效；服务端用它防止固定深度的搜索长时间占用工作线程，
+                            超过上限的固定种子搜索不再可复现
         """
+        if engine is None:
+            engine = 'pvs' if difficulty >= 4 else 'minimax'
+        if engine not in ENGINES:
+            raise ValueError('未知的搜索引擎: %s' % engine)
+        self.engine = engine
         self.difficulty = difficulty
         # 增加搜索深度，让AI更聪明
         depth_map = {1: 2, 2: 3, 3: 4, 4: 6, 5: 8}
         self.max_depth = depth_map.get(difficulty, 4)
         self.ai_player = 2  # AI是白子
         self.human_player = 1  # 人类是黑子
-        
-    def get_best_move(self, game):
+        self.tt = TranspositionTable(tt_size_bits)
+        self.evaluator = None  # 搜索期间绑定到工作棋盘的增量评估器
+        self.time_limit_ms = time_limit_ms
+        self.deadline = None  # 当前迭代的截止时间，None表示不检查超时
+        self.nodes = 0
+        self.last_search = None  # 最近一次搜索的结果摘要
+        # 搜索统计：叶节点评估次数、展开的内部节点数、生成的候选总数、每层剪枝次数
+        self.evaluations = 0
+        self.expanded = 0
+        self.generated = 0
+        self.cutoffs = []
+        self.tt_base = (0, 0)  # 本次搜索开始时置换表的 (查询数, 命中数)
+        self.depth_log = []  # 每轮迭代的 {'depth', 'time_ms', 'nodes'}
+        self.last_counters = None  # 最近一次搜索的计数汇总（根节点并行时包含各工作进程）
+        self.collect_stats = collect_stats
+        self.profile = profile
+        self.last_profile = None
+        # 走法排序启发信息
+        self.killers = []  # 每层两个杀手走法：在兄弟节点中引发过剪枝的落子
+        self.history = {}  # 历史表：(row, col) -> 引发剪枝的累计权重
+        self.pv = []  # 上一轮迭代的主要变例
+        # 威胁空间搜索（VCF/VCT），在常规搜索前寻找强制取胜序列
+        self.threat_search = THREAT_SEARCH_MODES.get(difficulty)
+        self.threat_solver = ThreatSolver(node_limit=5000) if self.threat_search else None
+        # 候选位置打分与全盘评估的NumPy向量化后端
+        self.use_numpy = HAS_NUMPY if use_numpy is None else (use_numpy and HAS_NUMPY)
+        self.workers = max(1, workers)
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.max_time_ms = max_time_ms
+        self.opening_book = opening_book
+        self.position_cache = position_cache
+        # 后台预读（在对手思考期间提前搜索）：{局面键: 搜索结果}，以及中止预读的事件
+        self.ponder_results = {}
+        self.stop_event = None
+        
+    def get_best_move(self, game, time_limit_ms=None):
         """
         获取AI的最佳落子位置
         :param game: GomokuGame实例
+        :param time_limit_ms: 本步思考时间上限（毫秒），默认使用初始化时的设置
         :return: (row, col) 最佳位置
         """
-        if self.is_opening_move(game):
-            return self.get_opening_move(game)
-            
-        # 使用Minimax算法寻找最佳落子
-        _, best_move = self.minimax(game, self.max_depth, True, float('-inf'), float('inf'))
-        return best_move
+        return self.search(game, time_limit_ms)['move']
+    
+    def search(self, game, time_limit_ms=None, use_book=True):
+        """
+        搜索最佳落子（见 run_search），开启profile时用cProfile剖析本次搜索
+        """
+        if not self.profile:
+            return self.run_search(game, time_limit_ms, use_book)
+        profiler = cProfile.Profile()
+        result = profiler.runcall(self.run_search, game, time_limit_ms, use_book)
+        self.last_profile = pstats.Stats(profiler)
+        return result
+    
+    def run_search(self, game, time_limit_ms=None, use_book=True):
+        """
+        迭代加深搜索：从深度1开始逐层加深到max_depth，时间用完时
+        返回最深一轮完整搜索的结果
+        :param game: GomokuGame实例
+        :param time_limit_ms: 本步思考时间上限（毫秒），默认使用初始化时的设置
+        :param use_book: 是否使用开局库和开局规则，False时总是搜索（生成开局库时使用）
+        :return: {'move': 最佳落子, 'score': 评估分数, 'depth': 完成的搜索深度,
+                  'time_ms': 用时, 'nodes': 搜索节点数, 'timed_out': 是否因超时提前结束,
+                  'pv': 主要变例, 'source': 结果来源 ponder/book/opening/cache/vcf/vct/search,
+                  'stats': 详细统计（仅collect_stats开启时）}
+        """
+        start = time.perf_counter()
+        self.depth_log = []
+        self.last_counters = None
+        if time_limit_ms is None:
+            time_limit_ms = self.time_limit_ms
+        if self.seed is not None:
+            time_limit_ms = None  # 固定种子：按固定深度搜索，结果与机器快慢无关
+        if self.max_time_ms is not None:
+            time_limit_ms = self.max_time_ms if time_limit_ms is None else min(time_limit_ms, self.max_time_ms)
+        result = {'move': None, 'score': 0, 'depth': 0, 'time_ms': 0,
+                  'nodes': 0, 'timed_out': False, 'pv': [], 'source': 'search'}
+        
+        pondered = self.ponder_results.pop(self.tt_key(game, game.current_player), None)
+        
+        forced = None
+        cached = None
+        book_move = self.opening_book.probe(game) if use_book and self.opening_book is not None else None
+        if pondered is not None and game.is_valid_move(*pondered['move']):
+            result.update(pondered)
+            result['source'] = 'ponder'
+        elif book_move is not None:
+            result['move'], result['score'] = book_move
+            result['source'] = 'book'
+        elif use_book and self.is_opening_move(game):
+            result['move'] = self.get_opening_move(game)
+            result['source'] = 'opening'
+        else:
+            if self.position_cache is not None:
+                cached = self.position_cache.probe(game, self)
+            if cached is not None:
+                result.update(cached)
+                result['source'] = 'cache'
+            else:
+                forced = self.find_forced_win(game, time_limit_ms)
+        
+        if forced is not None:
+            # 威胁空间搜索找到强制取胜序列，无需常规搜索
+            # 与常规搜索一致：PVS按成五的层数计分（越快获胜分数越高），minimax不区分胜负距离
+            source, line = forced
+            plies = self.threat_solver.win_plies(game, self.ai_player, line)
+            result.update({'move': line[0], 'score': WIN_SCORE - plies if self.engine == 'pvs' else WIN_SCORE,
+                           'depth': plies, 'pv': line, 'source': source})
+        elif result['move'] is None:
+            if self.workers > 1:
+                self.root_split_search(game, result, start, time_limit_ms)
+            else:
+                self.serial_search(game, result, start, time_limit_ms)
+        
+        # 只缓存完整搜索的结果，超时提前结束的结果深度不足
+        if (self.position_cache is not None and cached is None and result['move'] is not None
+                and result['source'] in ('vcf', 'vct', 'search') and not result['timed_out']):
+            self.position_cache.store(game, self, result)
+        
+        result['time_ms'] = (time.perf_counter() - start) * 1000
+        if self.collect_stats:
+            result['stats'] = self.build_stats(result)
+        self.last_search = result
+        return result
+    
+    def serial_search(self, game, result, start, time_limit_ms):
+        """
+        在当前进程内串行的迭代加深
+        :param result: search() 的结果字典，原地更新
+        """
+        # 在副本上通过落子/撤销搜索，不改动调用方棋盘
+        self.tt.new_search()
+        board = game.copy()
+        self.evaluator = IncrementalEvaluator(board)
+        self.reset_counters()
+        self.deadline = None  # 深度1必须完整搜索，保证总有可用结果
+        self.reset_move_ordering()
+        try:
+            for depth in range(1, self.max_depth + 1):
+                iteration_start = time.perf_counter()
+                iteration_nodes = self.nodes
+                if self.engine == 'pvs':
+                    score, move = self.aspiration_search(board, depth, result['score'])
+                else:
+                    score, move = self.minimax(board, depth, True, float('-inf'), float('inf'))
+                result['score'], result['move'], result['depth'] = score, move, depth
+                self.log_depth(depth, iteration_start, self.nodes - iteration_nodes)
+                # 记录主要变例，下一轮迭代优先搜索
+                self.pv = self.extract_pv(board, depth)
+                result['pv'] = list(self.pv)
+                # 已找到必胜/必败，继续加深没有意义
+                if is_mate_score(score):
+                    break
+                if time_limit_ms is not None:
+                    self.deadline = start + time_limit_ms / 1000.0
+                    if time.perf_counter() >= self.deadline:
+                        result['timed_out'] = True
+                        break
+        except SearchTimeout:
+            result['timed_out'] = True
+        finally:
+            self.evaluator = None
+            self.deadline = None
+        result['nodes'] = self.nodes
+        self.last_counters = self.counters()
+    
+    def analyze(self, game, player=None, time_limit_ms=None):
+        """
+        为指定一方分析局面、给出建议落子（提示功能使用）
+        优先复用上一次搜索留下的结果：主要变例中该方的应手，其次是置换表中记录的最佳落子；
+        都没有时以该方的视角做一次限时搜索
+        :param game: GomokuGame实例（不会被修改）
+        :param player: 分析哪一方，默认为当前行棋方；必须轮到该方落子
+        :param time_limit_ms: 需要重新搜索时的思考时间上限（毫秒）
+        :return: search() 格式的结果字典，分数以player为视角；source 为 pv/tt 时表示复用了已有结果
+        """
+        if player is None:
+            player = game.current_player
+        if player != game.current_player:
+            raise ValueError('只能分析轮到落子的一方')
+        start = time.perf_counter()
+        result = self.reuse_search(game, player)
+        if result is None:
+            return self.search_as(game, player, time_limit_ms)
+        result['time_ms'] = (time.perf_counter() - start) * 1000
+        return result
+    
+    def reuse_search(self, game, player):
+        """
+        从上一次搜索的主要变例或置换表中取出player在当前局面的最佳落子
+        置换表条目的深度至少为 MIN_REUSE_DEPTH，且不能是行棋方视角的上界（fail-low）
+        :return: search() 格式的结果字典，没有可用结果时返回None
+        """
+        result = {'move': None, 'score': 0, 'depth': 0, 'time_ms': 0,
+                  'nodes': 0, 'timed_out': False, 'pv': [], 'source': None}
+        last = self.last_search
+        pv = last['pv'] if last else []
+        # 上一次搜索的第一步正是当前局面的最后一手，变例中的下一步就是对方的最佳应手
+        if (len(pv) >= 2 and game.move_stack and game.move_stack[-1][1] != player and
+                game.move_stack[-1][0] == game.index(*pv[0]) and game.is_valid_move(*pv[1])):
+            score = last['score'] if player == self.ai_player else -last['score']
+            result.update({'move': tuple(pv[1]), 'score': score, 'depth': max(last['depth'] - 1, 1),
+                           'pv': [tuple(step) for step in pv[1:]], 'source': 'pv'})
+            return result
+        
+        # 只复用足够深、且落子确实是最佳（精确值）或至少不差于已知下界的条目；
+        # 全部落子都没超过alpha时（以行棋方看是上界）记下的落子并不比其他落子好，分数也不是局面的值。
+        # minimax的分数以AI为视角，对方行棋的节点上行棋方的下界记为UPPER
+        entry = self.tt.probe(self.tt_key(game, player))
+        if self.engine == 'pvs' or player == self.ai_player:
+            reliable = (EXACT, LOWER)
+        else:
+            reliable = (EXACT, UPPER)
+        if (entry is not None and entry[0] >= MIN_REUSE_DEPTH and entry[1] in reliable and
+                entry[3] is not None and game.is_valid_move(*entry[3])):
+            depth, _, score, move = entry
+            if self.engine == 'pvs':
+                score = self.score_from_tt(score, 0)
+            elif player != self.ai_player:
+                score = -score
+            result.update({'move': tuple(move), 'score': score, 'depth': depth,
+                           'pv': [tuple(move)], 'source': 'tt'})
+            return result
+        return None
+    
+    def search_as(self, game, player, time_limit_ms=None, use_book=True):
+        """
+        以player的视角搜索（临时交换AI与对手的执子方，包括威胁空间搜索和并行搜索的工作进程）
+        不改变 last_search，之后的预读和提示仍基于AI自己的上一次搜索
+        :param use_book: 是否使用开局库和开局规则（见 run_search）
+        """
+        if player == self.ai_player:
+            last_search = self.last_search
+            result = self.search(game, time_limit_ms, use_book)
+            self.last_search = last_search
+            return result
+        saved = (self.ai_player, self.human_player, self.last_search, self.ponder_results)
+        self.ai_player, self.human_player = player, 3 - player
+        self.ponder_results = {}
+        try:
+            return self.search(game, time_limit_ms, use_book)
+        finally:
+            self.ai_player, self.human_player, self.last_search, self.ponder_results = saved
+    
+    def score_move_as(self, game, player, move, depth):
+        """
+        以player的视角按给定深度搜索根节点的一个落子（复盘时为实际落子打分）
+        与同一局面同一深度的搜索视野相同，分数可以直接和 search_as 结果的分数比较
+        :param game: 轮到player落子的局面（不会被修改）
+        :param depth: 包括这一步在内的搜索深度
+        :return: score_root_move 的结果，分数以player为视角
+        """
+        saved = (self.ai_player, self.human_player)
+        self.ai_player, self.human_player = player, 3 - player
+        try:
+            return self.score_root_move(game.copy(), tuple(move), depth)
+        finally:
+            self.ai_player, self.human_player = saved
+    
+    def ponder(self, game, time_limit_ms=None, max_replies=PONDER_REPLIES, stop_event=None):
+        """
+        后台预读：在对手思考期间，预测对手的几个应手并提前搜索应手后的局面
+        结果保存在 ponder_results 中，对手实际走了其中一步时，下一次 search() 直接返回结果
+        预读总是在当前进程内串行搜索，不占用并行搜索的进程池
+        :param game: 轮到对手落子的局面（不会被修改）
+        :param time_limit_ms: 每个应手的思考时间上限（毫秒）
+        :param max_replies: 最多预读的应手数
+        :param stop_event: threading.Event，被设置时尽快中止预读
+        :return: 完成预读的应手数
+        """
+        last_search = self.last_search
+        workers = self.workers
+        results = {}
+        self.stop_event = stop_event
+        if self.threat_solver is not None:
+            self.threat_solver.stop_event = stop_event
+        self.workers = 1
+        try:
+            for row, col in self.predict_replies(game, max_replies):
+                if stop_event is not None and stop_event.is_set():
+                    break
+                board = game.copy()
+                board.make_move(row, col)
+                if board.game_over:
+                    continue
+                result = self.search(board, time_limit_ms)
+                if stop_event is not None and stop_event.is_set():
+                    break
+                results[self.tt_key(board, board.current_player)] = result
+        finally:
+            self.stop_event = None
+            if self.threat_solver is not None:
+                self.threat_solver.stop_event = None
+            self.workers = workers
+            self.last_search = last_search
+            self.ponder_results = results
+        return len(results)
+    
+    def predict_replies(self, game, max_replies):
+        """
+        预测对手的应手：上一次搜索主要变例中的应手优先，其余按候选排序补足
+        :return: [(row, col), ...]
+        """
+        replies = []
+        pv = self.last_search['pv'] if self.last_search else []
+        if (len(pv) >= 2 and game.move_stack and
+                game.move_stack[-1][0] == game.index(*pv[0]) and game.is_valid_move(*pv[1])):
+            replies.append(tuple(pv[1]))
+        for move in self.get_candidate_moves(game):
+            if len(replies) >= max_replies:
+                break
+            if move not in replies:
+                replies.append(move)
+        return replies[:max_replies]
+    
+    def find_forced_win(self, game, time_limit_ms=None):
+        """
+        用威胁空间搜索寻找AI的强制取胜序列
+        :return: ('vcf'或'vct', 取胜序列)，没有找到返回None
+        """
+        if self.threat_solver is None:
+            return None
+        line = self.threat_solver.find_vcf(game, self.ai_player)
+        if line:
+            return 'vcf', line
+        if self.threat_search == 'vct':
+            if self.seed is not None and self.max_time_ms is None:
+                budget = None  # 固定种子时只受节点数限制，保证结果可复现
+            elif time_limit_ms is None:
+                budget = VCT_DEFAULT_TIME_MS
+            else:
+                budget = time_limit_ms * VCT_TIME_FRACTION
+            line = self.threat_solver.find_vct(game, self.ai_player, time_limit_ms=budget)
+            if line:
+                return 'vct', line
+        return None
     
     def is_opening_move(self, game):
         """检查是否是开局阶段"""
-        total_pieces = sum(sum(1 for cell in row if cell != 0) for row in game.board)
-        return total_pieces <= 2
+        return game.stones <= 2
     
     def get_opening_move(self, game):
         """获取开局落子"""
         center = game.board_size // 2
         
         # 如果是第一步，下在中心
-        if all(cell == 0 for row in game.board for cell in row):
+        if not any(game.cells):
             return (center, center)
         
         # 如果中心已有子，在附近下子
@@ -55,14 +460,299 @@ class GomokuAI:
         valid_positions = [(r, c) for r, c in nearby_positions 
                           if game.is_valid_move(r, c)]
         
-        return random.choice(valid_positions) if valid_positions else self.get_random_move(game)
+        return self.rng.choice(valid_positions) if valid_positions else self.get_random_move(game)
     
     def get_random_move(self, game):
         """获取随机有效落子位置"""
         valid_moves = game.get_valid_moves()
-        return random.choice(valid_moves) if valid_moves else None
+        return self.rng.choice(valid_moves) if valid_moves else None
+    
+    def root_split_search(self, game, result, start, time_limit_ms):
+        """
+        根节点并行的迭代加深：每一轮先单独搜索上一轮的最佳落子得到alpha，
+        再把其余候选落子分给进程池并行搜索，只需证明"不比它好"即可提前剪枝
+        （各进程之间无法实时共享alpha）。所有落子都搜完才算完成这一轮，
+        超时的一轮作废，保留上一轮的结果。
+        汇总时分数相同的落子按候选顺序取第一个，结果与任务完成顺序无关
+        :param result: search() 的结果字典，原地更新
+        """
+        moves = self.get_candidate_moves(game)
+        nodes = 0
+        counters = self.empty_counters()
+        pool = get_pool(self.workers)
+        try:
+            for depth in range(1, self.max_depth + 1):
+                iteration_start = time.perf_counter()
+                scored = self.score_root_batch(pool, game, moves[:1], depth, float('-inf'),
+                                               start, time_limit_ms)
+                if len(moves) > 1 and not scored[0]['timed_out']:
+                    scored += self.score_root_batch(pool, game, moves[1:], depth, scored[0]['score'],
+                                                    start, time_limit_ms)
+                iteration_nodes = sum(item['nodes'] for item in scored)
+                nodes += iteration_nodes
+                for item in scored:
+                    self.merge_counters(counters, item['counters'])
+                if any(item['timed_out'] for item in scored):
+                    result['timed_out'] = True
+                    break
+                
+                best = max(scored, key=lambda item: item['score'])
+                result['score'], result['move'], result['depth'] = best['score'], best['move'], depth
+                self.log_depth(depth, iteration_start, iteration_nodes)
+                result['pv'] = [best['move']] + best['pv']
+                if is_mate_score(best['score']):
+                    break
+                # 下一轮按本轮分数从高到低排列（稳定排序，同分保持原顺序）
+                moves = [item['move'] for item in sorted(scored, key=lambda item: item['score'],
+                                                         reverse=True)]
+        except (BrokenProcessPool, OSError, RuntimeError):
+            # 进程池损坏（如工作进程被杀），或已被发现它损坏的其他线程关闭（提交任务时抛出RuntimeError）：
+            # 丢弃进程池，本步退回当前进程串行搜索
+            shutdown_pool(pool)
+            result.update({'move': None, 'score': 0, 'depth': 0, 'pv': [], 'timed_out': False})
+            self.serial_search(game, result, start, time_limit_ms)
+            return
+        result['nodes'] = nodes
+        counters['expanded'] += 1  # 根节点本身
+        counters['generated'] += len(moves)
+        self.last_counters = counters
+    
+    def score_root_batch(self, pool, game, moves, depth, alpha, start, time_limit_ms):
+        """
+        在进程池中并行搜索一批根节点落子
+        :param pool: 共享进程池（见 parallel_search.get_pool）
+        :param alpha: AI视角的下界
+        :return: 与moves对应的 score_root_move 结果列表；时间已用完时全部标记为超时
+        """
+        budget = None
+        deadline = None
+        if depth > 1 and time_limit_ms is not None:  # 深度1不限时，保证总有可用结果
+            budget = time_limit_ms - (time.perf_counter() - start) * 1000
+            if budget <= 0:
+                return [timed_out_root_result(move) for move in moves]
+            # 发给工作进程的是绝对截止时间（各进程共用的系统时钟）：排队等待的任务不会重新得到完整的剩余时间
+            deadline = time.time() + budget / 1000.0
+        board = game.board
+        fresh = self.seed is not None
+        futures = [pool.submit(score_root_task, (self.difficulty, self.engine, board, game.current_player,
+                                                 self.ai_player, move, depth, deadline, alpha, fresh))
+                   for move in moves]
+        timeout = None if budget is None else (budget + ROOT_TASK_GRACE_MS) / 1000.0
+        done, _ = wait(futures, timeout=timeout)
+        results = []
+        for move, future in zip(moves, futures):
+            if future in done:
+                results.append(future.result())
+            else:
+                # 超过截止时间仍未返回（进程池繁忙）：取消尚未开始的任务，这一轮作废
+                future.cancel()
+                results.append(timed_out_root_result(move))
+        return results
     
-    def minimax(self, game, depth, maximizing_player, alpha, beta):
+    def score_root_move(self, game, move, depth, time_limit_ms=None, alpha=float('-inf')):
+        """
+        搜索根节点的单个候选落子（根节点并行搜索的工作单元）
+        :param game: 根节点局面（会被修改，调用方传入副本）
+        :param move: AI的候选落子
+        :param depth: 包括这一步在内的搜索深度
+        :param time_limit_ms: 时间上限（毫秒），None表示不限时
+        :param alpha: AI视角的下界，分数不超过alpha时只是上界
+        :return: {'move', 'score': AI视角分数, 'pv': 后续主要变例, 'nodes', 'timed_out',
+                  'counters': 搜索计数（见 counters）}
+        """
+        row, col = move
+        result = {'move': move, 'score': 0, 'pv': [], 'nodes': 0, 'timed_out': False}
+        self.tt.new_search()
+        self.evaluator = IncrementalEvaluator(game)
+        self.reset_counters()
+        self.killers = [[None, None] for _ in range(depth + 1)]
+        self.pv = []
+        if time_limit_ms is not None:
+            self.deadline = time.perf_counter() + time_limit_ms / 1000.0
+        try:
+            self.apply_move(game, row, col, self.ai_player)
+            if game.game_over:
+                if game.winner == self.ai_player:
+                    result['score'] = WIN_SCORE - 1 if self.engine == 'pvs' else 100000
+            elif self.engine == 'pvs':
+                result['score'] = -self.negamax(game, depth - 1, float('-inf'), -alpha,
+                                                1, self.human_player)[0]
+            else:
+                result['score'] = self.minimax(game, depth - 1, False, alpha, float('inf'), 1)[0]
+            result['pv'] = self.extract_pv(game, depth - 1, self.human_player)
+        except SearchTimeout:
+            result['timed_out'] = True
+        finally:
+            self.evaluator = None
+            self.deadline = None
+        result['nodes'] = self.nodes
+        result['counters'] = self.counters()
+        return result
+    
+    def reset_counters(self):
+        """开始新的搜索：清零节点数和各项统计"""
+        self.nodes = 0
+        self.evaluations = 0
+        self.expanded = 0
+        self.generated = 0
+        self.cutoffs = []
+        self.tt_base = (self.tt.probes, self.tt.hits)
+    
+    def counters(self):
+        """本次搜索到目前为止的计数（可在进程间传递的普通字典）"""
+        return {
+            'evaluations': self.evaluations,
+            'expanded': self.expanded,
+            'generated': self.generated,
+            'cutoffs': list(self.cutoffs),
+            'tt_probes': self.tt.probes - self.tt_base[0],
+            'tt_hits': self.tt.hits - self.tt_base[1]
+        }
+    
+    def empty_counters(self):
+        return {'evaluations': 0, 'expanded': 0, 'generated': 0, 'cutoffs': [],
+                'tt_probes': 0, 'tt_hits': 0}
+    
+    def merge_counters(self, total, counters):
+        """把一个工作单元的计数累加到total上"""
+        if counters is None:
+            return
+        for name in ('evaluations', 'expanded', 'generated', 'tt_probes', 'tt_hits'):
+            total[name] += counters[name]
+        cutoffs = total['cutoffs']
+        for ply, count in enumerate(counters['cutoffs']):
+            if ply < len(cutoffs):
+                cutoffs[ply] += count
+            else:
+                cutoffs.append(count)
+    
+    def should_stop(self):
+        """
+        是否应中止搜索：超过本轮截止时间，或预读被要求中止
+        中止事件与截止时间分开检查：固定种子、深度1等不设截止时间的搜索也能被打断
+        """
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            return True
+        return self.stop_event is not None and self.stop_event.is_set()
+    
+    def log_depth(self, depth, iteration_start, nodes):
+        """记录完成的一轮迭代"""
+        self.depth_log.append({'depth': depth, 'nodes': nodes,
+                               'time_ms': round((time.perf_counter() - iteration_start) * 1000, 2)})
+    
+    def build_stats(self, result):
+        """
+        汇总一次搜索的详细统计
+        :return: {'nodes', 'leaf_evaluations', 'nps': 每秒节点数, 'tt_probes', 'tt_hits', 'tt_hit_rate',
+                  'cutoffs_per_ply': 每层剪枝次数, 'expanded_nodes': 展开的内部节点数,
+                  'avg_candidates': 每个内部节点的平均候选数,
+                  'depths': 每轮迭代的 {'depth', 'time_ms', 'nodes'},
+                  'branching_factor': 有效分支因子（相邻两轮迭代节点数之比的几何平均）}
+        """
+        counters = self.last_counters or self.empty_counters()
+        seconds = result['time_ms'] / 1000.0
+        ratios = [current['nodes'] / previous['nodes']
+                  for previous, current in zip(self.depth_log, self.depth_log[1:])
+                  if previous['nodes'] and current['nodes']]
+        branching = None
+        if ratios:
+            product = 1.0
+            for ratio in ratios:
+                product *= ratio
+            branching = round(product ** (1.0 / len(ratios)), 2)
+        probes = counters['tt_probes']
+        expanded = counters['expanded']
+        return {
+            'nodes': result['nodes'],
+            'leaf_evaluations': counters['evaluations'],
+            'nps': round(result['nodes'] / seconds) if seconds > 0 else 0,
+            'tt_probes': probes,
+            'tt_hits': counters['tt_hits'],
+            'tt_hit_rate': round(counters['tt_hits'] / probes, 4) if probes else 0.0,
+            'cutoffs_per_ply': counters['cutoffs'],
+            'expanded_nodes': expanded,
+            'avg_candidates': round(counters['generated'] / expanded, 2) if expanded else 0.0,
+            'depths': list(self.depth_log),
+            'branching_factor': branching
+        }
+    
+    def apply_move(self, game, row, col, player):
+        """搜索中落子，同时更新增量评估器"""
+        game.push_move(row, col, player)
+        if self.evaluator is not None:
+            self.evaluator.update(row * game.board_size + col)
+
+    def undo_move(self, game):
+        """搜索中撤销落子，同时更新增量评估器"""
+        row, col = game.pop_move()
+        if self.evaluator is not None:
+            self.evaluator.update(row * game.board_size + col)
+
+    def reset_move_ordering(self):
+        """新一步搜索前重置杀手走法，并衰减历史表（旧局面的经验逐渐失效）"""
+        self.killers = [[None, None] for _ in range(self.max_depth + 1)]
+        self.history = {move: value // 2 for move, value in self.history.items() if value > 1}
+        self.pv = []
+
+    def order_moves(self, moves, ply, tt_move):
+        """
+        走法排序：置换表最佳落子 > 主要变例 > 杀手走法 > 按历史表得分
+        历史得分相同时保持候选生成时的静态价值顺序
+        """
+        history = self.history
+        ordered = sorted(moves, key=lambda move: history.get(move, 0), reverse=True)
+        
+        first = [tt_move]
+        if ply < len(self.pv):
+            first.append(self.pv[ply])
+        if ply < len(self.killers):
+            first.extend(self.killers[ply])
+        
+        front = []
+        for move in first:
+            if move is not None and move in ordered and move not in front:
+                front.append(move)
+        if front:
+            ordered = front + [move for move in ordered if move not in front]
+        return ordered
+
+    def record_cutoff(self, move, ply, depth):
+        """记录引发剪枝的落子：更新该层杀手走法和历史表"""
+        cutoffs = self.cutoffs
+        while len(cutoffs) <= ply:
+            cutoffs.append(0)
+        cutoffs[ply] += 1
+        if ply < len(self.killers):
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+        self.history[move] = self.history.get(move, 0) + depth * depth
+
+    def tt_key(self, game, player):
+        """置换表键：局面哈希加上行棋方（不同引擎的分数视角不同，键也不同）"""
+        if self.engine == 'pvs':
+            return game.hash ^ SIDE_KEYS[player]
+        key = game.hash ^ MAXIMIZING_KEY if player == self.ai_player else game.hash
+        return key if self.ai_player == 2 else key ^ BLACK_VIEW_KEY
+
+    def extract_pv(self, game, depth, player=None):
+        """沿置换表中记录的最佳落子取出主要变例，player为当前行棋方（默认AI）"""
+        pv = []
+        if player is None:
+            player = self.ai_player
+        for _ in range(depth):
+            move = self.tt.get_best_move(self.tt_key(game, player))
+            if move is None or game.game_over or not game.is_valid_move(*move):
+                break
+            self.apply_move(game, move[0], move[1], player)
+            pv.append(move)
+            player = 3 - player
+        for _ in pv:
+            self.undo_move(game)
+        return pv
+
+    def minimax(self, game, depth, maximizing_player, alpha, beta, ply=0):
         """
         Minimax算法配合Alpha-Beta剪枝
         :param game: 游戏状态
@@ -70,13 +760,37 @@ class GomokuAI:
         :param maximizing_player: 是否是最大化玩家
         :param alpha: Alpha值
         :param beta: Beta值
+        :param ply: 距离根节点的层数（用于杀手走法）
         :return: (评估分数, 最佳落子位置)
         """
+        self.nodes += 1
+        if self.nodes % TIME_CHECK_INTERVAL == 0 and self.should_stop():
+            raise SearchTimeout()
+        
         if depth == 0 or game.game_over:
             return self.evaluate_board(game), None
         
-        # 获取候选落子位置（减少搜索空间）
-        candidate_moves = self.get_candidate_moves(game)
+        # 查询置换表：同一局面已有足够深度的结果时直接使用或收窄窗口
+        key = self.tt_key(game, self.ai_player if maximizing_player else self.human_player)
+        entry = self.tt.probe(key)
+        tt_move = None
+        if entry is not None:
+            entry_depth, flag, score, tt_move = entry
+            if entry_depth >= depth and tt_move is not None:
+                if flag == EXACT:
+                    return score, tt_move
+                elif flag == LOWER:
+                    alpha = max(alpha, score)
+                elif flag == UPPER:
+                    beta = min(beta, score)
+                if alpha >= beta:
+                    return score, tt_move
+        alpha_orig, beta_orig = alpha, beta
+        
+        # 获取候选落子位置（减少搜索空间），按启发信息排序以尽早剪枝
+        candidate_moves = self.order_moves(self.get_candidate_moves(game), ply, tt_move)
+        self.expanded += 1
+        self.generated += len(candidate_moves)
         
         if maximizing_player:
             max_eval = float('-inf')
@@ -84,14 +798,14 @@ class GomokuAI:
             
             # 首先检查是否有直接获胜的机会
             for row, col in candidate_moves:
-                game_copy = game.copy()
-                game_copy.make_move(row, col, self.ai_player)
-                
-                # 如果这步棋直接获胜，立即返回最高分数
-                if game_copy.game_over and game_copy.winner == self.ai_player:
+                # 如果这步棋直接获胜，立即返回最高分数（不落子，直接查直线位掩码）
+                if game.is_winning_move(row, col, self.ai_player):
+                    self.tt.store(key, depth, EXACT, 100000, (row, col))
                     return 100000, (row, col)  # 确保优先选择获胜棋步
                 
-                eval_score, _ = self.minimax(game_copy, depth - 1, False, alpha, beta)
+                self.apply_move(game, row, col, self.ai_player)
+                eval_score, _ = self.minimax(game, depth - 1, False, alpha, beta, ply + 1)
+                self.undo_move(game)
                 
                 if eval_score > max_eval:
                     max_eval = eval_score
@@ -99,23 +813,23 @@ class GomokuAI:
                 
                 alpha = max(alpha, eval_score)
                 if beta <= alpha:
+                    self.record_cutoff((row, col), ply, depth)
                     break  # Alpha-Beta剪枝
-                    
-            return max_eval, best_move
+            
+            best_eval = max_eval
         else:
             min_eval = float('inf')
             best_move = None
             
             # 检查是否需要阻止对手获胜
             for row, col in candidate_moves:
-                game_copy = game.copy()
-                game_copy.make_move(row, col, self.human_player)
-                
                 # 如果对手这步棋直接获胜，给予极低分数
-                if game_copy.game_over and game_copy.winner == self.human_player:
+                if game.is_winning_move(row, col, self.human_player):
                     eval_score = -100000  # 必须阻止对手获胜
                 else:
-                    eval_score, _ = self.minimax(game_copy, depth - 1, True, alpha, beta)
+                    self.apply_move(game, row, col, self.human_player)
+                    eval_score, _ = self.minimax(game, depth - 1, True, alpha, beta, ply + 1)
+                    self.undo_move(game)
                 
                 if eval_score < min_eval:
                     min_eval = eval_score
@@ -123,16 +837,143 @@ class GomokuAI:
                 
                 beta = min(beta, eval_score)
                 if beta <= alpha:
+                    self.record_cutoff((row, col), ply, depth)
                     break  # Alpha-Beta剪枝
-                    
-            return min_eval, best_move
+            
+            best_eval = min_eval
+        
+        # 写入置换表，记录结果是精确值还是上/下界
+        if best_move is not None:
+            if best_eval >= beta_orig:
+                flag = LOWER
+            elif best_eval <= alpha_orig:
+                flag = UPPER
+            else:
+                flag = EXACT
+            self.tt.store(key, depth, flag, best_eval, best_move)
+        
+        return best_eval, best_move
     
+    def aspiration_search(self, game, depth, previous_score):
+        """
+        根节点期望窗口：以上一轮分数为中心用窄窗口搜索，失败时再用全窗口重搜
+        :return: (AI视角分数, 最佳落子位置)
+        """
+        if depth > 1 and not is_mate_score(previous_score):
+            alpha = previous_score - ASPIRATION_WINDOW
+            beta = previous_score + ASPIRATION_WINDOW
+            score, move = self.negamax(game, depth, alpha, beta, 0, self.ai_player)
+            if alpha < score < beta:
+                return score, move
+        return self.negamax(game, depth, float('-inf'), float('inf'), 0, self.ai_player)
+
+    def negamax(self, game, depth, alpha, beta, ply, player):
+        """
+        Negamax + 主要变例搜索（PVS）
+        第一个落子用完整窗口搜索，其余落子先用零窗口验证能否超过alpha，
+        只有验证成功时才用完整窗口重搜
+        :param game: 游戏状态
+        :param depth: 剩余搜索深度
+        :param alpha: Alpha值（行棋方视角）
+        :param beta: Beta值（行棋方视角）
+        :param ply: 距离根节点的层数
+        :param player: 行棋方
+        :return: (行棋方视角分数, 最佳落子位置)
+        """
+        self.nodes += 1
+        if self.nodes % TIME_CHECK_INTERVAL == 0 and self.should_stop():
+            raise SearchTimeout()
+        
+        if depth == 0 or game.game_over:
+            score = self.evaluate_board(game)
+            return (score if player == self.ai_player else -score), None
+        
+        # 查询置换表（必胜分数按层数存取，保证不同路径下的胜负距离正确）
+        key = self.tt_key(game, player)
+        entry = self.tt.probe(key)
+        tt_move = None
+        if entry is not None:
+            entry_depth, flag, score, tt_move = entry
+            if entry_depth >= depth and tt_move is not None:
+                score = self.score_from_tt(score, ply)
+                if flag == EXACT:
+                    return score, tt_move
+                elif flag == LOWER:
+                    alpha = max(alpha, score)
+                elif flag == UPPER:
+                    beta = min(beta, score)
+                if alpha >= beta:
+                    return score, tt_move
+        alpha_orig = alpha
+        
+        candidate_moves = self.order_moves(self.get_candidate_moves(game), ply, tt_move)
+        self.expanded += 1
+        self.generated += len(candidate_moves)
+        opponent = 3 - player
+        best_score = float('-inf')
+        best_move = None
+        
+        for i, (row, col) in enumerate(candidate_moves):
+            # 直接获胜：越早获胜分数越高，不可能有更好的落子（不落子，直接查直线位掩码）
+            if game.is_winning_move(row, col, player):
+                score = WIN_SCORE - (ply + 1)
+                self.tt.store(key, depth, EXACT, self.score_to_tt(score, ply), (row, col))
+                return score, (row, col)
+            
+            self.apply_move(game, row, col, player)
+            if game.game_over:
+                score = 0  # 平局
+            elif i == 0:
+                score = -self.negamax(game, depth - 1, -beta, -alpha, ply + 1, opponent)[0]
+            else:
+                # 零窗口验证
+                score = -self.negamax(game, depth - 1, -alpha - 1, -alpha, ply + 1, opponent)[0]
+                if alpha < score < beta:
+                    score = -self.negamax(game, depth - 1, -beta, -score, ply + 1, opponent)[0]
+            self.undo_move(game)
+            
+            if score > best_score:
+                best_score = score
+                best_move = (row, col)
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                self.record_cutoff((row, col), ply, depth)
+                break  # Beta剪枝
+        
+        if best_move is not None:
+            if best_score >= beta:
+                flag = LOWER
+            elif best_score <= alpha_orig:
+                flag = UPPER
+            else:
+                flag = EXACT
+            self.tt.store(key, depth, flag, self.score_to_tt(best_score, ply), best_move)
+        
+        return best_score, best_move
+
+    def score_to_tt(self, score, ply):
+        """必胜分数存入置换表时换算为相对当前节点的距离"""
+        if score >= MATE_THRESHOLD:
+            return score + ply
+        if score <= -MATE_THRESHOLD:
+            return score - ply
+        return score
+
+    def score_from_tt(self, score, ply):
+        """从置换表取出必胜分数时换算回相对根节点的距离"""
+        if score >= MATE_THRESHOLD:
+            return score - ply
+        if score <= -MATE_THRESHOLD:
+            return score + ply
+        return score
+
     def get_candidate_moves(self, game):
         """
         智能获取候选落子位置，优先考虑威胁和防守
         """
         # 如果棋盘为空，选择中心
-        if all(game.board[i][j] == 0 for i in range(game.board_size) for j in range(game.board_size)):
+        if not game.candidates and not any(game.cells):
             center = game.board_size // 2
             return [(center, center)]
         
@@ -144,32 +985,27 @@ class GomokuAI:
         # 2. 寻找有价值的位置
         valuable_moves = []
         
-        # 只考虑已有棋子周围1-2格的位置
-        candidates = set()
-        for i in range(game.board_size):
-            for j in range(game.board_size):
-                if game.board[i][j] != 0:
-                    # 周围1格必须考虑，2格选择性考虑
-                    for di in range(-2, 3):
-                        for dj in range(-2, 3):
-                            ni, nj = i + di, j + dj
-                            if (0 <= ni < game.board_size and 
-                                0 <= nj < game.board_size and 
-                                game.board[ni][nj] == 0):
-                                # 优先考虑直接相邻的位置
-                                if abs(di) <= 1 and abs(dj) <= 1:
-                                    candidates.add((ni, nj))
-                                elif abs(di) <= 2 and abs(dj) <= 2:
-                                    # 2格范围内的位置需要有更多邻居才考虑
-                                    neighbor_count = self.count_neighbors(game, ni, nj)
-                                    if neighbor_count >= 2:
-                                        candidates.add((ni, nj))
+        # 只考虑紧邻已有棋子的空位，直接从棋盘增量维护的候选集合中取出
+        # （按索引排序，保证同分时结果稳定）
+        size = game.board_size
+        counts = game.neighbor_counts
+        candidates = [divmod(idx, size) for idx in sorted(game.candidates)
+                      if counts[idx] >= NEAR_WEIGHT]
         
         # 评估每个候选位置的价值
-        for row, col in candidates:
-            value = self.evaluate_position_value(game, row, col)
-            if value > 0:
-                valuable_moves.append((row, col, value))
+        if self.use_numpy and candidates:
+            # 向量化后端一次算完全部候选位置
+            indices = [row * size + col for row, col in candidates]
+            values = position_values(game, indices, self.ai_player, self.human_player,
+                                     [game.count_near(idx) for idx in indices])
+            for (row, col), value in zip(candidates, values):
+                if value > 0:
+                    valuable_moves.append((row, col, value))
+        else:
+            for row, col in candidates:
+                value = self.evaluate_position_value(game, row, col)
+                if value > 0:
+                    valuable_moves.append((row, col, value))
         
         # 按价值排序
         valuable_moves.sort(key=lambda x: x[2], reverse=True)
@@ -179,7 +1015,7 @@ class GomokuAI:
         
         # 如果没有找到有价值的位置，返回基本候选
         if not result:
-            result = list(candidates)[:15]
+            result = candidates[:15]
         
         return result if result else game.get_valid_moves()[:10]
     
@@ -198,7 +1034,7 @@ class GomokuAI:
                     ni, nj = row + di, col + dj
                     if (0 <= ni < game.board_size and 
                         0 <= nj < game.board_size and 
-                        game.board[ni][nj] != 0):
+                        game.cells[ni * game.board_size + nj] != 0):
                         neighbor_count += 1
             
             return -neighbor_count * 10 - center_distance  # 负数因为我们要降序排列
@@ -211,6 +1047,7 @@ class GomokuAI:
         :param game: 游戏状态
         :return: 评估分数（正数对AI有利，负数对人类有利）
         """
+        self.evaluations += 1
         if game.game_over:
             if game.winner == self.ai_player:
                 return 10000
@@ -219,271 +1056,57 @@ class GomokuAI:
             else:
                 return 0  # 平局
         
-        # 增强评估：优先考虑攻防威胁
-        ai_score = self.evaluate_player_enhanced(game, self.ai_player)
-        human_score = self.evaluate_player_enhanced(game, self.human_player)
+        evaluator = self.evaluator
+        if evaluator is not None and evaluator.game is game:
+            # 搜索中使用增量评估器，只需读取累计值
+            ai_score = evaluator.pattern_score(self.ai_player)
+            human_score = evaluator.pattern_score(self.human_player)
+            defense_bonus = evaluator.threat_count(self.human_player) * -1500
+            attack_bonus = evaluator.threat_count(self.ai_player) * 1200
+            return ai_score - human_score * 1.1 + defense_bonus + attack_bonus
+        
+        if self.use_numpy:
+            # 向量化后端一次算出双方的棋型分与威胁数
+            components = evaluate_components(game)
+            ai_score = components[self.ai_player - 1]
+            human_score = components[self.human_player - 1]
+            defense_bonus = components[self.human_player + 1] * -1500
+            attack_bonus = components[self.ai_player + 1] * 1200
+            return ai_score - human_score * 1.1 + defense_bonus + attack_bonus
+        
+        # 增强评估：优先考虑攻防威胁。不在搜索中时临时建一个增量评估器按直线计算，
+        # 计算量只取决于棋子分布的范围，大棋盘上不必扫描每个格子
+        evaluator = IncrementalEvaluator(game)
+        ai_score = evaluator.pattern_score(self.ai_player)
+        human_score = evaluator.pattern_score(self.human_player)
         
         # 加重防守权重：防止对手获胜比自己获胜更重要
-        defense_bonus = self.check_immediate_threats(game, self.human_player) * -1500
-        attack_bonus = self.check_immediate_threats(game, self.ai_player) * 1200
+        defense_bonus = evaluator.threat_count(self.human_player) * -1500
+        attack_bonus = evaluator.threat_count(self.ai_player) * 1200
         
         return ai_score - human_score * 1.1 + defense_bonus + attack_bonus
     
-    def evaluate_player(self, game, player):
-        """评估某个玩家的局面分数"""
-        score = 0
-        
-        # 检查所有方向的连子情况
-        directions = [(0, 1), (1, 0), (1, 1), (1, -1)]
-        
-        for i in range(game.board_size):
-            for j in range(game.board_size):
-                if game.board[i][j] == player:
-                    for dx, dy in directions:
-                        score += self.evaluate_line(game, i, j, dx, dy, player)
-        
-        return score
-    
-    def evaluate_line(self, game, row, col, dx, dy, player):
-        """评估从某个位置开始某个方向的连线价值"""
-        score = 0
-        
-        # 向前看5个位置
-        line = []
-        for k in range(5):
-            r, c = row + k * dx, col + k * dy
-            if 0 <= r < game.board_size and 0 <= c < game.board_size:
-                line.append(game.board[r][c])
-            else:
-                line.append(-1)  # 边界标记
-        
-        # 评估这条线的价值
-        if len(line) == 5:
-            score += self.score_line(line, player)
-        
-        return score
-    
-    def score_line(self, line, player):
-        """为5个位置的线段打分"""
-        if len(line) != 5:
-            return 0
-        
-        # 统计己方棋子和空位
-        my_count = line.count(player)
-        empty_count = line.count(0)
-        opponent = 3 - player
-        opponent_count = line.count(opponent)
-        
-        # 如果有对方棋子，这条线无价值
-        if opponent_count > 0:
-            return 0
-        
-        # 根据己方棋子数量给分
-        if my_count == 5:
-            return 1000  # 五连
-        elif my_count == 4 and empty_count == 1:
-            return 100   # 活四
-        elif my_count == 3 and empty_count == 2:
-            return 10    # 活三
-        elif my_count == 2 and empty_count == 3:
-            return 1     # 活二
-        
-        return 0
-    
-    def evaluate_player_enhanced(self, game, player):
-        """增强的玩家评估函数"""
-        score = 0
-        
-        # 检查所有方向的连子情况
-        directions = [(0, 1), (1, 0), (1, 1), (1, -1)]
-        
-        for i in range(game.board_size):
-            for j in range(game.board_size):
-                if game.board[i][j] == player:
-                    for dx, dy in directions:
-                        score += self.evaluate_line_enhanced(game, i, j, dx, dy, player)
-        
-        return score
-    
-    def evaluate_line_enhanced(self, game, row, col, dx, dy, player):
-        """增强的连线评估"""
-        score = 0
-        
-        # 检查不同长度的连子模式
-        for length in range(2, 6):  # 检查2-5连
-            for start_offset in range(-length + 1, 1):
-                line = []
-                for k in range(length):
-                    r = row + (start_offset + k) * dx
-                    c = col + (start_offset + k) * dy
-                    if 0 <= r < game.board_size and 0 <= c < game.board_size:
-                        line.append(game.board[r][c])
-                    else:
-                        line.append(-1)  # 边界
-                
-                if len(line) == length:
-                    score += self.score_pattern(line, player, length)
-        
-        return score
-    
-    def score_pattern(self, line, player, length):
-        """为特定模式打分"""
-        my_count = line.count(player)
-        empty_count = line.count(0)
-        opponent = 3 - player
-        opponent_count = line.count(opponent)
-        
-        # 如果有对手棋子，这个模式无价值
-        if opponent_count > 0:
-            return 0
-        
-        # 根据连子数量和空位给分
-        if length == 5:
-            if my_count == 5:
-                return 10000  # 五连胜利
-            elif my_count == 4 and empty_count == 1:
-                return 1000   # 活四
-            elif my_count == 3 and empty_count == 2:
-                return 100    # 活三
-            elif my_count == 2 and empty_count == 3:
-                return 10     # 活二
-        elif length == 4:
-            if my_count == 4:
-                return 800    # 冲四
-            elif my_count == 3 and empty_count == 1:
-                return 50     # 冲三
-            elif my_count == 2 and empty_count == 2:
-                return 5      # 活二
-        elif length == 3:
-            if my_count == 3:
-                return 200    # 连三
-            elif my_count == 2 and empty_count == 1:
-                return 2      # 连二
-        
-        return 0
-    
-    def check_immediate_threats(self, game, player):
-        """检查立即威胁（四连、活三等）"""
-        threat_count = 0
-        directions = [(0, 1), (1, 0), (1, 1), (1, -1)]
-        
-        for i in range(game.board_size):
-            for j in range(game.board_size):
-                if game.board[i][j] == 0:  # 空位
-                    # 模拟在这个位置放子
-                    game.board[i][j] = player
-                    
-                    # 检查是否形成威胁
-                    for dx, dy in directions:
-                        count = self.count_consecutive(game, i, j, dx, dy, player)
-                        if count >= 4:  # 四连或以上
-                            threat_count += 1
-                        elif count == 3:  # 三连，检查是否是活三
-                            if self.is_live_three(game, i, j, dx, dy, player):
-                                threat_count += 1
-                    
-                    # 恢复空位
-                    game.board[i][j] = 0
-        
-        return threat_count
-    
-    def count_consecutive(self, game, row, col, dx, dy, player):
-        """计算连续棋子数量"""
-        count = 1  # 包含当前位置
-        
-        # 向前计数
-        r, c = row + dx, col + dy
-        while (0 <= r < game.board_size and 0 <= c < game.board_size and 
-               game.board[r][c] == player):
-            count += 1
-            r, c = r + dx, c + dy
-        
-        # 向后计数
-        r, c = row - dx, col - dy
-        while (0 <= r < game.board_size and 0 <= c < game.board_size and 
-               game.board[r][c] == player):
-            count += 1
-            r, c = r - dx, c - dy
-        
-        return count
-    
-    def is_live_three(self, game, row, col, dx, dy, player):
-        """检查是否是活三（两端都可以扩展）"""
-        # 检查三连的两端是否都是空位
-        front_r, front_c = row + 4 * dx, col + 4 * dy
-        back_r, back_c = row - dx, col - dy
-        
-        front_empty = (0 <= front_r < game.board_size and 
-                      0 <= front_c < game.board_size and 
-                      game.board[front_r][front_c] == 0)
-        
-        back_empty = (0 <= back_r < game.board_size and 
-                     0 <= back_c < game.board_size and 
-                     game.board[back_r][back_c] == 0)
-        
-        return front_empty and back_empty
-    
     def find_critical_positions(self, game):
         """寻找关键位置：必须防守或可以获胜的位置"""
         critical = []
-        directions = [(0, 1), (1, 0), (1, 1), (1, -1)]
-        
-        for i in range(game.board_size):
-            for j in range(game.board_size):
-                if game.board[i][j] == 0:
-                    # 检查防守价值（阻止对手）
-                    game.board[i][j] = self.human_player
-                    defense_value = 0
-                    
-                    for dx, dy in directions:
-                        count = self.count_consecutive(game, i, j, dx, dy, self.human_player)
-                        if count >= 5:
-                            defense_value = 50000  # 必须防守，立即获胜
-                            break
-                        elif count == 4:
-                            # 检查是否是真正的活四
-                            if self.is_winning_four(game, i, j, dx, dy, self.human_player):
-                                defense_value = max(defense_value, 40000)  # 必须防守的活四
-                            else:
-                                defense_value = max(defense_value, 8000)   # 冲四也要防
-                        elif count == 3:
-                            # 检查是否是活三
-                            if self.is_live_three_threat(game, i, j, dx, dy, self.human_player):
-                                defense_value = max(defense_value, 3000)  # 活三威胁
-                            else:
-                                defense_value = max(defense_value, 500)   # 普通三连
-                    
-                    game.board[i][j] = 0  # 恢复
-                    
-                    # 检查攻击价值（AI自己）
-                    game.board[i][j] = self.ai_player
-                    attack_value = 0
-                    
-                    for dx, dy in directions:
-                        count = self.count_consecutive(game, i, j, dx, dy, self.ai_player)
-                        if count >= 5:
-                            attack_value = 100000  # 直接获胜，最高优先级
-                            break
-                        elif count == 4:
-                            # 检查是否是获胜的活四
-                            if self.is_winning_four(game, i, j, dx, dy, self.ai_player):
-                                attack_value = max(attack_value, 80000)  # 活四获胜
-                            else:
-                                attack_value = max(attack_value, 15000)  # 冲四
-                        elif count == 3:
-                            # 检查是否是活三
-                            if self.is_live_three_threat(game, i, j, dx, dy, self.ai_player):
-                                attack_value = max(attack_value, 5000)   # 活三
-                            else:
-                                attack_value = max(attack_value, 1000)   # 普通三连
-                    
-                    game.board[i][j] = 0  # 恢复
-                    
-                    # 攻击优先，但防守也很重要
-                    total_value = attack_value + defense_value * 0.9
-                    
-                    if total_value >= 1000:  # 重要位置阈值
-                        critical.append((i, j, total_value))
+        size = game.board_size
+        classes = threat_map(game)
+        human_classes = classes[self.human_player]
+        ai_classes = classes[self.ai_player]
+        
+        # 只有候选空位（周围两格内有棋子）可能形成威胁
+        for idx in sorted(set(human_classes) | set(ai_classes)):
+            # 防守价值：对手在此落子能形成的最强棋型
+            defense_value = DEFENSE_VALUES.get(human_classes.get(idx), 0)
+            # 攻击价值：AI在此落子能形成的最强棋型
+            attack_value = ATTACK_VALUES.get(ai_classes.get(idx), 0)
+            
+            # 攻击优先，但防守也很重要
+            total_value = attack_value + defense_value * 0.9
+            
+            if total_value >= 1000:  # 重要位置阈值
+                i, j = divmod(idx, size)
+                critical.append((i, j, total_value))
         
         # 按重要性排序
         critical.sort(key=lambda x: x[2], reverse=True)
@@ -491,7 +1114,7 @@ class GomokuAI:
     
     def evaluate_position_value(self, game, row, col):
         """评估位置的具体价值"""
-        if game.board[row][col] != 0:
+        if game.cells[row * game.board_size + col] != 0:
             return 0
         
         value = 0
@@ -522,160 +1145,9 @@ class GomokuAI:
         return value
     
     def count_neighbors(self, game, row, col):
-        """计算某位置周围的棋子数量"""
-        count = 0
-        for di in [-1, 0, 1]:
-            for dj in [-1, 0, 1]:
-                if di == 0 and dj == 0:
-                    continue
-                ni, nj = row + di, col + dj
-                if (0 <= ni < game.board_size and 
-                    0 <= nj < game.board_size and 
-                    game.board[ni][nj] != 0):
-                    count += 1
-        return count
+        """计算某位置周围的棋子数量（读取棋盘维护的邻域计数）"""
+        return game.count_near(row * game.board_size + col)
     
     def calculate_direction_potential(self, game, row, col, dx, dy, player):
-        """计算在特定方向的连子潜力"""
-        # 模拟放子
-        game.board[row][col] = player
-        
-        # 计算连子数
-        consecutive = self.count_consecutive(game, row, col, dx, dy, player)
-        
-        # 恢复
-        game.board[row][col] = 0
-        
-        # 根据连子数评分
-        if consecutive >= 5:
-            return 10000
-        elif consecutive == 4:
-            # 检查是否被封死
-            return 1000 if self.check_open_ends(game, row, col, dx, dy, consecutive) else 500
-        elif consecutive == 3:
-            return 200 if self.check_open_ends(game, row, col, dx, dy, consecutive) else 100
-        elif consecutive == 2:
-            return 20 if self.check_open_ends(game, row, col, dx, dy, consecutive) else 10
-        else:
-            return 0
-    
-    def check_open_ends(self, game, row, col, dx, dy, length):
-        """检查连子两端是否有空位（简化版）"""
-        # 检查前端
-        front_r = row + length * dx
-        front_c = col + length * dy
-        front_open = (0 <= front_r < game.board_size and 
-                     0 <= front_c < game.board_size and 
-                     game.board[front_r][front_c] == 0)
-        
-        # 检查后端
-        back_r = row - dx
-        back_c = col - dy
-        back_open = (0 <= back_r < game.board_size and 
-                    0 <= back_c < game.board_size and 
-                    game.board[back_r][back_c] == 0)
-        
-        return front_open or back_open  # 至少一端开放
-    
-    def is_winning_four(self, game, row, col, dx, dy, player):
-        """检查是否是获胜的活四（两端都可以扩展或一端能立即获胜）"""
-        # 检查四连两端的情况
-        positions = []
-        
-        # 找到四连的所有位置
-        current_pos = []
-        for i in range(-4, 5):
-            r, c = row + i * dx, col + i * dy
-            if (0 <= r < game.board_size and 0 <= c < game.board_size):
-                current_pos.append((r, c, game.board[r][c]))
-        
-        # 找连续的四子
-        consecutive_count = 0
-        for i, (r, c, piece) in enumerate(current_pos):
-            if piece == player:
-                consecutive_count += 1
-                if consecutive_count >= 4:
-                    # 检查前后是否有空位形成活四
-                    start_idx = i - 3
-                    end_idx = i + 1
-                    
-                    front_free = (start_idx >= 0 and 
-                                 start_idx < len(current_pos) and 
-                                 current_pos[start_idx][2] == 0)
-                    
-                    back_free = (end_idx >= 0 and 
-                                end_idx < len(current_pos) and 
-                                current_pos[end_idx][2] == 0)
-                    
-                    return front_free or back_free
-            else:
-                consecutive_count = 0
-        
-        return False
-    
-    def is_live_three_threat(self, game, row, col, dx, dy, player):
-        """检查是否是有威胁的活三（能形成活四或获胜）"""
-        # 检查三连两端是否都有空位，且延伸后不被阻挡
-        
-        # 获取当前方向的一段棋子
-        line_pieces = []
-        for i in range(-5, 6):
-            r, c = row + i * dx, col + i * dy
-            if 0 <= r < game.board_size and 0 <= c < game.board_size:
-                line_pieces.append(game.board[r][c])
-            else:
-                line_pieces.append(-1)  # 边界
-        
-        # 在line_pieces中找到当前位置
-        center_idx = 5  # 当前位置在line_pieces中的索引
-        
-        # 检查是否能形成活四
-        # 即三连的两端都有足够空间扩展
-        three_start = None
-        three_end = None
-        
-        # 向前找三连的起始
-        consecutive = 1  # 包含当前位置
-        for i in range(center_idx - 1, -1, -1):
-            if i < len(line_pieces) and line_pieces[i] == player:
-                consecutive += 1
-                if consecutive >= 3:
-                    three_start = i
-                    break
-            else:
-                break
-        
-        # 向后找三连的结束
-        consecutive = 1
-        for i in range(center_idx + 1, len(line_pieces)):
-            if line_pieces[i] == player:
-                consecutive += 1
-                if consecutive >= 3:
-                    three_end = i
-                    break
-            else:
-                break
-        
-        # 如果找到了三连，检查两端是否可以扩展
-        if three_start is not None and three_end is not None:
-            # 检查三连前后是否有空位
-            front_space = (three_start > 0 and 
-                          line_pieces[three_start - 1] == 0)
-            back_space = (three_end < len(line_pieces) - 1 and 
-                         line_pieces[three_end + 1] == 0)
-            
-            # 活三需要至少一端可以扩展，且扩展后还有空间
-            if front_space and three_start > 1:
-                front_space2 = line_pieces[three_start - 2] == 0
-            else:
-                front_space2 = False
-                
-            if back_space and three_end < len(line_pieces) - 2:
-                back_space2 = line_pieces[three_end + 2] == 0
-            else:
-                back_space2 = False
-            
-            # 活三：两端都能扩展，或者一端能扩展且另一端不被阻挡
-            return (front_space and back_space) or (front_space and front_space2) or (back_space and back_space2)
-        
-        return False
\ No newline at end of file
+        """计算在特定方向的连子潜力（查表，分值见 patterns.CLASS_SCORES）"""
+        return PATTERN_TABLE[window_code(game.cells, game.board_size, row, col, dx, dy, player)][1]
@@ -0,0 +1,314 @@
+"""
+AI基准测试
+对固定的局面集（benchmark_positions.json，开局/中局/杀棋/防守局面，以落子序列保存）在各难度下测量
+落子用时、每秒节点数、与期望落子是否一致以及内存峰值，另测 GomokuGame 基本操作的吞吐量。
+结果以JSON输出，可与之前版本的结果对比：
+
+    python benchmark.py --output bench.json
+    python benchmark.py --compare bench.json
+
+默认使用固定种子（按固定深度搜索），节点数与落子在同一版本下完全可复现；
+指定 --time-limit-ms 时改为限时搜索，测量给定思考时间内能搜多深。
+--board-sizes 把局面集平移到更大棋盘的中央再测，检查大棋盘上的用时是否随面积增长：
+
+    python benchmark.py --board-sizes 15,19,31,63,127 --difficulties 1,3
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+from game_logic import GomokuGame
+from ai_player import GomokuAI
+from vector_eval import HAS_NUMPY
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_positions.json')
+DEFAULT_DIFFICULTIES = (1, 2, 3, 4, 5)
+
+# 对比时用时变化超过该比例才标记
+TIME_CHANGE_THRESHOLD = 0.10
+
+
+def load_corpus(path=DEFAULT_CORPUS):
+    """
+    读取局面集
+    :return: (棋盘大小, [{'name', 'category', 'moves', 'expected'}, ...])
+    """
+    with open(path, encoding='utf-8') as f:
+        corpus = json.load(f)
+    return corpus.get('board_size', 15), corpus['positions']
+
+
+def build_game(board_size, moves):
+    """按落子序列（黑白交替）还原局面"""
+    game = GomokuGame(board_size)
+    for row, col in moves:
+        if not game.make_move(row, col):
+            raise ValueError('局面集中的落子无效: (%d, %d)' % (row, col))
+    return game
+
+
+def shift_position(position, offset):
+    """把局面（落子序列和期望落子）整体平移offset行、offset列"""
+    shifted = dict(position)
+    shifted['moves'] = [[row + offset, col + offset] for row, col in position['moves']]
+    if position.get('expected'):
+        shifted['expected'] = [[row + offset, col + offset] for row, col in position['expected']]
+    return shifted
+
+
+def run_position(position, board_size, difficulty, time_limit_ms=None, engine=None,
+                 workers=1, measure_memory=True, repeat=3):
+    """
+    在一个局面上测量AI落子
+    :param repeat: 重复次数（每次使用新的AI），用时取中位数
+    :return: 该局面在该难度下的测量结果字典
+    """
+    game = build_game(board_size, position['moves'])
+    seed = None if time_limit_ms is not None else 0
+    times = []
+    for _ in range(max(1, repeat)):
+        ai = GomokuAI(difficulty, engine=engine, workers=workers, seed=seed, collect_stats=True)
+        result = ai.search(game, time_limit_ms)
+        times.append(result['time_ms'])
+    stats = result['stats']
+    time_ms = statistics.median(times)
+
+    expected = position.get('expected')
+    move = list(result['move']) if result['move'] is not None else None
+    entry = {
+        'name': position['name'],
+        'category': position['category'],
+        'board_size': board_size,
+        'difficulty': difficulty,
+        'move': move,
+        'agrees': (move in expected) if expected else None,
+        'source': result['source'],
+        'depth': result['depth'],
+        'score': result['score'],
+        'time_ms': round(time_ms, 2),
+        'nodes': result['nodes'],
+        'nps': round(result['nodes'] / (time_ms / 1000.0)) if time_ms > 0 else 0,
+        'leaf_evaluations': stats['leaf_evaluations'],
+        'tt_hit_rate': stats['tt_hit_rate'],
+        'branching_factor': stats['branching_factor'],
+        'timed_out': result['timed_out']
+    }
+
+    if measure_memory:
+        # tracemalloc会显著拖慢搜索，单独用新的AI再搜一次测内存峰值
+        ai = GomokuAI(difficulty, engine=engine, workers=workers, seed=seed)
+        tracemalloc.start()
+        try:
+            ai.search(game, time_limit_ms)
+            entry['peak_kb'] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        finally:
+            tracemalloc.stop()
+    return entry
+
+
+def bench_game(board_size=15, moves=2000, seed=0):
+    """
+    GomokuGame 基本操作的吞吐量：搜索式的落子/撤销、复制、候选生成
+    :return: {'push_pop_per_sec', 'copy_per_sec', 'candidates_per_sec'}
+    """
+    rng = random.Random(seed)
+    game = GomokuGame(board_size)
+    cells = list(range(board_size * board_size))
+    # 落子/撤销：随机下满一段再全部撤销，重复到总次数
+    start = time.perf_counter()
+    done = 0
+    while done < moves:
+        rng.shuffle(cells)
+        pushed = 0
+        for idx in cells[:40]:
+            game.push_move(*divmod(idx, board_size))
+            pushed += 1
+            if game.game_over:
+                break
+        for _ in range(pushed):
+            game.pop_move()
+        done += pushed
+    push_pop = done / (time.perf_counter() - start)
+
+    for idx in cells[:30]:
+        game.make_move(*divmod(idx, board_size))
+        if game.game_over:
+            break
+    start = time.perf_counter()
+    for _ in range(moves):
+        game.copy()
+    copies = moves / (time.perf_counter() - start)
+
+    ai = GomokuAI(3)
+    start = time.perf_counter()
+    rounds = max(1, moves // 10)
+    for _ in range(rounds):
+        ai.get_candidate_moves(game)
+    candidates = rounds / (time.perf_counter() - start)
+    return {
+        'push_pop_per_sec': round(push_pop),
+        'copy_per_sec': round(copies),
+        'candidates_per_sec': round(candidates)
+    }
+
+
+def summarize(entries):
+    """按棋盘大小和难度汇总（键为 '棋盘大小/难度'）：局面数、总用时、平均用时、每秒节点数、期望落子一致数"""
+    summary = {}
+    for entry in entries:
+        item = summary.setdefault('%d/%d' % (entry['board_size'], entry['difficulty']), {
+            'board_size': entry['board_size'], 'difficulty': entry['difficulty'],
+            'positions': 0, 'total_time_ms': 0.0, 'nodes': 0, 'agree': 0, 'checked': 0,
+            'max_peak_kb': 0.0})
+        item['positions'] += 1
+        item['total_time_ms'] += entry['time_ms']
+        item['nodes'] += entry['nodes']
+        if entry['agrees'] is not None:
+            item['checked'] += 1
+            item['agree'] += 1 if entry['agrees'] else 0
+        item['max_peak_kb'] = max(item['max_peak_kb'], entry.get('peak_kb', 0.0))
+    for item in summary.values():
+        seconds = item['total_time_ms'] / 1000.0
+        item['total_time_ms'] = round(item['total_time_ms'], 2)
+        item['mean_time_ms'] = round(item['total_time_ms'] / item['positions'], 2)
+        item['nps'] = round(item['nodes'] / seconds) if seconds > 0 else 0
+    return summary
+
+
+def run_benchmark(corpus_path=DEFAULT_CORPUS, difficulties=DEFAULT_DIFFICULTIES, time_limit_ms=None,
+                  engine=None, workers=1, measure_memory=True, names=None, log=None, repeat=3,
+                  board_sizes=None):
+    """
+    运行整套基准测试
+    :param names: 只测这些名字的局面，None表示全部
+    :param log: 可选的回调 log(单项结果)
+    :param board_sizes: 在这些大小的棋盘上测（局面平移到棋盘中央），None表示只用局面集的棋盘大小
+    :return: 可直接写成JSON的结果字典 {'meta', 'positions', 'summary', 'game'}
+    """
+    corpus_size, positions = load_corpus(corpus_path)
+    if names:
+        positions = [position for position in positions if position['name'] in names]
+    board_sizes = list(board_sizes or [corpus_size])
+    if min(board_sizes) < corpus_size:
+        raise ValueError('棋盘不能小于局面集的棋盘大小 %d' % corpus_size)
+    entries = []
+    for board_size in board_sizes:
+        offset = (board_size - corpus_size) // 2
+        for difficulty in difficulties:
+            for position in positions:
+                entry = run_position(shift_position(position, offset), board_size, difficulty,
+                                     time_limit_ms, engine, workers, measure_memory, repeat)
+                entries.append(entry)
+                if log is not None:
+                    log(entry)
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': HAS_NUMPY,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'corpus': os.path.basename(corpus_path),
+            'board_sizes': board_sizes,
+            'difficulties': list(difficulties),
+            'time_limit_ms': time_limit_ms,
+            'engine': engine,
+            'workers': workers,
+            'repeat': repeat
+        },
+        'positions': entries,
+        'summary': summarize(entries),
+        'game': {str(board_size): bench_game(board_size) for board_size in board_sizes}
+    }
+
+
+def compare(baseline, current):
+    """
+    对比两次基准测试结果
+    :return: 差异说明的文本行列表
+    """
+    lines = []
+    old_entries = {(entry['name'], entry.get('board_size', 15), entry['difficulty']): entry
+                   for entry in baseline['positions']}
+    for entry in current['positions']:
+        key = (entry['name'], entry['board_size'], entry['difficulty'])
+        label = '%-22s %3d路 难度%d' % key
+        old = old_entries.get(key)
+        if old is None:
+            lines.append('新增  %s' % label)
+            continue
+        notes = []
+        if old['time_ms'] > 0:
+            change = entry['time_ms'] / old['time_ms'] - 1
+            if abs(change) >= TIME_CHANGE_THRESHOLD:
+                notes.append('用时 %.1f -> %.1f ms (%+.0f%%)' % (old['time_ms'], entry['time_ms'], change * 100))
+        if entry['nodes'] != old['nodes']:
+            notes.append('节点 %d -> %d' % (old['nodes'], entry['nodes']))
+        if entry['move'] != old['move']:
+            notes.append('落子 %s -> %s' % (old['move'], entry['move']))
+        if entry['agrees'] != old['agrees']:
+            notes.append('期望落子 %s -> %s' % (old['agrees'], entry['agrees']))
+        if notes:
+            lines.append('%s  %s' % (label, '；'.join(notes)))
+    for key, item in current['summary'].items():
+        old = baseline['summary'].get(key)
+        if old is not None and old['total_time_ms'] > 0:
+            lines.append('%d路 难度%d 总用时 %.1f -> %.1f ms (%+.0f%%)，一致 %d/%d -> %d/%d' % (
+                item['board_size'], item['difficulty'], old['total_time_ms'], item['total_time_ms'],
+                (item['total_time_ms'] / old['total_time_ms'] - 1) * 100,
+                old['agree'], old['checked'], item['agree'], item['checked']))
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description='五子棋AI基准测试')
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS, help='局面集文件')
+    parser.add_argument('--difficulties', default='1,2,3,4,5', help='逗号分隔的难度列表')
+    parser.add_argument('--time-limit-ms', type=float, default=None,
+                        help='每步思考时间上限；不指定时按固定深度搜索')
+    parser.add_argument('--engine', choices=('minimax', 'pvs'), default=None, help='搜索引擎')
+    parser.add_argument('--workers', type=int, default=1, help='根节点并行搜索的工作进程数')
+    parser.add_argument('--board-sizes', default=None,
+                        help='逗号分隔的棋盘大小，局面平移到棋盘中央；默认只用局面集的棋盘大小')
+    parser.add_argument('--positions', default=None, help='逗号分隔的局面名，只测这些局面')
+    parser.add_argument('--repeat', type=int, default=3, help='每个局面重复测量的次数，用时取中位数')
+    parser.add_argument('--no-memory', action='store_true', help='不测内存峰值（节省一半时间）')
+    parser.add_argument('--output', default=None, help='结果JSON文件路径，默认输出到标准输出')
+    parser.add_argument('--compare', default=None, help='与之前的结果JSON对比')
+    args = parser.parse_args()
+
+    def log(entry):
+        print('%-24s %3d路 难度%d  落子 %-10s %-6s 深度 %d  %8.1f ms  %7d 节点/秒%s' % (
+            entry['name'], entry['board_size'], entry['difficulty'], entry['move'], entry['source'], entry['depth'],
+            entry['time_ms'], entry['nps'],
+            '' if entry['agrees'] is None else ('  ✓' if entry['agrees'] else '  ✗ 期望落子')),
+            file=sys.stderr)
+
+    difficulties = [int(item) for item in args.difficulties.split(',')]
+    names = set(args.positions.split(',')) if args.positions else None
+    board_sizes = [int(item) for item in args.board_sizes.split(',')] if args.board_sizes else None
+    results = run_benchmark(args.corpus, difficulties, args.time_limit_ms, args.engine,
+                            args.workers, not args.no_memory, names, log, args.repeat, board_sizes)
+
+    text = json.dumps(results, ensure_ascii=False, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    elif not args.compare:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        for line in compare(baseline, results):
+            print(line)
+
+
+if __name__ == '__main__':
+    main()
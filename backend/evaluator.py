@@ -0,0 +1,119 @@
+"""
+增量局面评估器
+把棋盘拆成横、竖、两条对角线四个方向上的所有直线，分别缓存每条线的棋型分数。
+落子或撤销时只重新计算经过该点的4条线，避免每个叶子节点都扫描整个棋盘。
+计算结果与逐格扫描全盘的参考实现一致（见 test_evaluator.py）。
+"""
+
+from patterns import WINDOW_SCORES, get_line_geometry, trim_line
+
+# 直线分数缓存：{线上棋子bytes: 分数分量}，搜索中同一条线的形态会反复出现
+_line_score_cache = {}
+LINE_CACHE_LIMIT = 1 << 18
+
+
+def score_line(values):
+    """
+    计算一条直线的棋型分量
+    :param values: 线上各格的棋子（0空，1黑，2白），bytes或列表
+    :return: (黑方棋型分, 白方棋型分, 黑方威胁数, 白方威胁数)
+    """
+    length = len(values)
+    pattern = [0, 0, 0]
+    threats = [0, 0, 0]
+
+    # 棋型分：每个长度3-5且只含一方棋子的窗口，按窗口内棋子数计分并乘以棋子数
+    # （全盘扫描时每颗棋子都会把包含它的窗口计一次）
+    for window in (3, 4, 5):
+        for start in range(length - window + 1):
+            segment = values[start:start + window]
+            black = segment.count(1)
+            white = segment.count(2)
+            if black and not white:
+                pattern[1] += black * WINDOW_SCORES.get((window, black), 0)
+            elif white and not black:
+                pattern[2] += white * WINDOW_SCORES.get((window, white), 0)
+
+    # 威胁数：在每个空位试放一子，形成四连以上或两端为空的三连记为一次威胁
+    for pos in range(length):
+        if values[pos] != 0:
+            continue
+        for player in (1, 2):
+            forward = pos + 1
+            while forward < length and values[forward] == player:
+                forward += 1
+            backward = pos - 1
+            while backward >= 0 and values[backward] == player:
+                backward -= 1
+            count = forward - backward - 1
+            if count >= 4:
+                threats[player] += 1
+            elif count == 3:
+                if (pos + 4 < length and values[pos + 4] == 0 and
+                        pos - 1 >= 0 and values[pos - 1] == 0):
+                    threats[player] += 1
+
+    return pattern[1], pattern[2], threats[1], threats[2]
+
+
+def lookup_line(key):
+    """
+    查表获取一条直线的棋型分量，未命中时计算并写入缓存
+    直线先裁掉两端离棋子较远的空位（不影响分数），大棋盘上的长直线也只按棋子分布的范围计算
+    :param key: 线上棋子的bytes
+    """
+    key = trim_line(key)[0]
+    scores = _line_score_cache.get(key)
+    if scores is None:
+        if len(_line_score_cache) >= LINE_CACHE_LIMIT:
+            _line_score_cache.clear()
+        scores = score_line(key)
+        _line_score_cache[key] = scores
+    return scores
+
+
+class IncrementalEvaluator:
+    def __init__(self, game):
+        """
+        绑定到一个棋盘并做一次全盘初始化
+        之后每次落子/撤销后调用 update(idx) 保持分数同步
+        :param game: GomokuGame实例
+        """
+        self.game = game
+        self.lines, self.cell_lines = get_line_geometry(game.board_size)
+        self.line_scores = [(0, 0, 0, 0)] * len(self.lines)
+        self.totals = [0, 0, 0, 0]
+        self.refresh()
+
+    def refresh(self):
+        """全盘重新计算所有直线的分数"""
+        cells = self.game.cells
+        totals = [0, 0, 0, 0]
+        for line_id, line in enumerate(self.lines):
+            scores = lookup_line(bytes(cells[line]))
+            self.line_scores[line_id] = scores
+            for k in range(4):
+                totals[k] += scores[k]
+        self.totals = totals
+
+    def update(self, idx):
+        """
+        某格子状态改变后（落子或撤销）重新计算经过它的4条线
+        :param idx: 改变的格子一维索引
+        """
+        cells = self.game.cells
+        totals = self.totals
+        for line_id in self.cell_lines[idx]:
+            old = self.line_scores[line_id]
+            new = lookup_line(bytes(cells[self.lines[line_id]]))
+            self.line_scores[line_id] = new
+            for k in range(4):
+                totals[k] += new[k] - old[k]
+
+    def pattern_score(self, player):
+        """某玩家的棋型总分：己方每颗棋子所在的、只含己方棋子的3-5格窗口得分之和"""
+        return self.totals[player - 1]
+
+    def threat_count(self, player):
+        """某玩家的立即威胁数：空位试放一子后各方向连成4子以上，或连成两端皆空的3子的次数"""
+        return self.totals[player + 1]
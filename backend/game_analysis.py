@@ -0,0 +1,203 @@
+"""
+对局复盘分析
+批量回放已结束的对局，用 GomokuAI 搜索每一步之前的局面，给出最佳落子、局面分数以及实际落子是否为失误。
+同一对局的所有局面共用一个AI实例（置换表、历史表在相邻局面之间保持温热），多个对局可在进程池中并行分析。
+结果按局面逐条产出，适合以NDJSON逐行输出：
+
+    python game_analysis.py games.json --difficulty 3 --workers 4 > analysis.ndjson
+
+输入为对局列表，每个对局是落子序列 [[row, col], ...]，或 {'id', 'moves', 'board_size'}。
+"""
+
+import argparse
+import json
+import multiprocessing
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from game_logic import GomokuGame
+from ai_player import GomokuAI, WIN_SCORE
+
+# 实际落子比最佳落子差多少分（以落子方为视角）记为失误
+BLUNDER_THRESHOLD = 3000
+
+# 并行分析时每个工作进程最多排队的对局数：只提交有限的一批，调用方停止读取时取消其余对局
+ANALYSIS_QUEUE_PER_WORKER = 2
+
+# 复盘分析专用的进程池：与根节点并行搜索的进程池分开，批量分析不会让实时对局的搜索任务排队
+_analysis_pool = None
+_analysis_pool_lock = threading.Lock()
+
+
+def get_analysis_pool(workers):
+    """
+    获取复盘分析专用的进程池，第一次调用时按workers创建，之后大小不变
+    使用spawn方式启动工作进程，避免在多线程的Web服务器中fork
+    """
+    global _analysis_pool
+    with _analysis_pool_lock:
+        if _analysis_pool is None:
+            context = multiprocessing.get_context('spawn')
+            _analysis_pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+        return _analysis_pool
+
+
+def clamp_score(score):
+    """把搜索分数截断到 ±WIN_SCORE 并保留一位小数"""
+    return round(max(-WIN_SCORE, min(WIN_SCORE, score)), 1)
+
+
+def normalize_game(game, index):
+    """
+    统一对局的输入格式
+    :return: (对局ID, 落子序列, 棋盘大小)
+    """
+    if isinstance(game, dict):
+        return game.get('id', index), game.get('moves') or [], game.get('board_size', 15)
+    return index, game, 15
+
+
+def analyze_game(moves, board_size=15, difficulty=3, time_limit_ms=None, engine=None,
+                 blunder_threshold=BLUNDER_THRESHOLD, game_id=None):
+    """
+    逐步分析一局棋
+    每个局面以行棋方的视角搜索一次；实际落子不是最佳落子时，再从同一局面按同一深度单独搜索实际落子，
+    两个分数的搜索视野相同，差值就是这步的损失；最佳落子来自威胁搜索（VCF/VCT）或局面缓存时，最佳落子也按同一深度重新打分。
+    因此一局n手最多搜索3n次。
+    未指定time_limit_ms时按固定深度搜索，结果可复现；限时搜索时，实际落子按该局面已完成的深度打分，这次打分本身不限时
+    :param moves: 落子序列 [(row, col), ...]，从黑方开始交替
+    :param blunder_threshold: 实际落子比最佳落子差多少分记为失误
+    :param game_id: 写入每条结果的对局ID
+    :return: 生成器，依次产出每一步的结果
+             {'type': 'position', 'game', 'ply', 'player', 'move', 'best_move', 'score', 'played_score',
+              'loss', 'blunder', 'depth', 'source'}，
+             最后产出 {'type': 'summary', 'game', 'moves', 'blunders': {'1': 黑方失误数, '2': 白方失误数},
+             'winner', 'time_ms'}；落子无效时产出 {'type': 'error', 'game', 'ply', 'message'} 后结束
+    """
+    start = time.perf_counter()
+    game = GomokuGame(board_size)
+    # 同一局共用一个AI：置换表在相邻局面间复用
+    ai = GomokuAI(difficulty, engine=engine, seed=0 if time_limit_ms is None else None)
+    blunders = {'1': 0, '2': 0}
+    for ply, (row, col) in enumerate(moves):
+        player = game.current_player
+        if not game.is_valid_move(row, col):
+            yield {'type': 'error', 'game': game_id, 'ply': ply, 'message': '无效的落子: (%s, %s)' % (row, col)}
+            return
+
+        current = ai.search_as(game, player, time_limit_ms, use_book=False)
+        best_move = list(current['move']) if current['move'] is not None else None
+        best_score = clamp_score(current['score'])
+        if best_move == [row, col]:
+            played_score = best_score
+        else:
+            # 威胁搜索找到的杀棋深度可能超过常规搜索深度，实际落子最多按常规搜索深度打分
+            depth = max(1, min(current['depth'], ai.max_depth))
+            played_score = clamp_score(ai.score_move_as(game, player, (row, col), depth)['score'])
+            if current['source'] != 'search':
+                # 最佳落子来自威胁搜索或缓存，分数不是同一视野的常规搜索结果：按同一深度重新打分后再比较
+                best_score = clamp_score(ai.score_move_as(game, player, tuple(best_move), depth)['score'])
+        loss = round(max(0, best_score - played_score), 1)
+        blunder = loss >= blunder_threshold
+        if blunder:
+            blunders[str(player)] += 1
+        game.make_move(row, col)
+        yield {
+            'type': 'position',
+            'game': game_id,
+            'ply': ply,
+            'player': player,
+            'move': [row, col],
+            'best_move': best_move,
+            'score': best_score,
+            'played_score': played_score,
+            'loss': loss,
+            'blunder': blunder,
+            'depth': current['depth'],
+            'source': current['source']
+        }
+        if game.game_over:
+            break
+
+    yield {
+        'type': 'summary',
+        'game': game_id,
+        'moves': len(game.move_stack),
+        'blunders': blunders,
+        'winner': game.winner,
+        'time_ms': round((time.perf_counter() - start) * 1000, 2)
+    }
+
+
+def analyze_game_task(task):
+    """进程池任务：分析一局棋，返回全部结果的列表"""
+    game, index, difficulty, time_limit_ms, engine, blunder_threshold = task
+    game_id, moves, board_size = normalize_game(game, index)
+    return list(analyze_game(moves, board_size, difficulty, time_limit_ms, engine,
+                             blunder_threshold, game_id))
+
+
+def analyze_games(games, difficulty=3, time_limit_ms=None, engine=None,
+                  blunder_threshold=BLUNDER_THRESHOLD, workers=1):
+    """
+    批量分析多局棋
+    :param games: 对局列表，每项为落子序列或 {'id', 'moves', 'board_size'}
+    :param workers: 并行分析的工作进程数（复盘分析专用的进程池），1表示在当前进程内依次分析
+    :return: 生成器，按对局顺序产出 analyze_game 的结果；串行时逐步产出，并行时每局分析完后产出该局全部结果。
+             并行时同时排队的对局不超过 workers * ANALYSIS_QUEUE_PER_WORKER，
+             生成器被关闭（如客户端断开）时取消尚未开始的对局
+    """
+    if workers > 1:
+        pool = get_analysis_pool(workers)
+        tasks = ((game, index, difficulty, time_limit_ms, engine, blunder_threshold)
+                 for index, game in enumerate(games))
+        limit = workers * ANALYSIS_QUEUE_PER_WORKER
+        pending = deque()
+        try:
+            for task in tasks:
+                pending.append(pool.submit(analyze_game_task, task))
+                if len(pending) < limit:
+                    continue
+                for record in pending.popleft().result():
+                    yield record
+            while pending:
+                for record in pending.popleft().result():
+                    yield record
+        finally:
+            for future in pending:
+                future.cancel()
+        return
+    for index, game in enumerate(games):
+        game_id, moves, board_size = normalize_game(game, index)
+        for record in analyze_game(moves, board_size, difficulty, time_limit_ms, engine,
+                                   blunder_threshold, game_id):
+            yield record
+
+
+def main():
+    parser = argparse.ArgumentParser(description='五子棋对局复盘分析，结果以NDJSON输出到标准输出')
+    parser.add_argument('games', help='对局文件：JSON列表，或每行一个对局的NDJSON')
+    parser.add_argument('--difficulty', type=int, default=3, help='分析使用的难度（决定搜索深度）')
+    parser.add_argument('--time-limit-ms', type=float, default=None, help='每个局面的思考时间上限；不指定时按固定深度搜索')
+    parser.add_argument('--engine', choices=('minimax', 'pvs'), default=None, help='搜索引擎')
+    parser.add_argument('--blunder-threshold', type=int, default=BLUNDER_THRESHOLD, help='失误的分数损失阈值')
+    parser.add_argument('--workers', type=int, default=1, help='并行分析的工作进程数')
+    args = parser.parse_args()
+
+    with open(args.games, encoding='utf-8') as f:
+        text = f.read()
+    try:
+        games = json.loads(text)
+    except ValueError:
+        games = [json.loads(line) for line in text.splitlines() if line.strip()]
+
+    for record in analyze_games(games, args.difficulty, args.time_limit_ms, args.engine,
+                                args.blunder_threshold, args.workers):
+        sys.stdout.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -2,6 +2,110 @@
 五子棋游戏核心逻辑
 """
 
+import base64
+import random
+import struct
+
+# Zobrist随机数表缓存：{board_size: [None, 黑子键表, 白子键表]}
+_zobrist_tables = {}
+
+# 邻域表缓存：{board_size: 每个格子的 ((邻居索引, 权重), ...)}
+_neighborhoods = {}
+
+# 直线位掩码表缓存：{board_size: 每个格子的 ((直线编号, 位, 窗口移位), ...)}，四个方向各一项
+_line_slots = {}
+
+# 五连判断表：以落子点为中心、沿一条直线的9位窗口（中心为第4位），
+# 含有经过中心的连续5颗同色棋子时为1
+WIN_WINDOWS = bytes(int(any((code >> start) & 0x1F == 0x1F for start in range(5))) for code in range(512))
+# 直线位掩码中每个格子的位整体左移的位数，保证取窗口时不会出现负移位
+LINE_PADDING = 4
+
+# 邻域计数中相邻一格（3x3）棋子的权重；距离两格的外圈棋子权重为1，
+# 外圈最多16颗，因此 neighbor_counts[idx] >> 5 即为相邻棋子数
+NEAR_WEIGHT = 32
+
+# 紧凑序列化：头部为 (格式版本, 棋盘大小, 当前玩家, 是否结束, 胜者, 棋子数)，之后每颗棋子2字节
+SERIAL_VERSION = 1
+SERIAL_HEADER = struct.Struct('>BBBBBH')
+# 棋子编码：最高位为颜色（1为白子），次高位表示没有落子记录的摆放棋子，低14位为格子索引
+STONE_WHITE = 0x8000
+STONE_SETUP = 0x4000
+STONE_INDEX_MASK = 0x3FFF
+
+# 支持的棋盘大小：最小要能连成五子，最大受序列化中14位格子索引限制（127*127 < 2**14）。
+# 搜索只处理棋子附近的区域，大棋盘不会让AI变慢，127路可以当作“无限”棋盘使用
+MIN_BOARD_SIZE = 5
+MAX_BOARD_SIZE = 127
+
+
+def get_zobrist_keys(board_size):
+    """
+    获取指定棋盘大小的Zobrist键表
+    使用固定种子生成，保证不同进程间同一局面的哈希值一致
+    :param board_size: 棋盘大小
+    :return: [None, 玩家1键表, 玩家2键表]，键表按一维索引取值
+    """
+    keys = _zobrist_tables.get(board_size)
+    if keys is None:
+        rng = random.Random(board_size * 7919 + 15)
+        cell_count = board_size * board_size
+        keys = [None,
+                [rng.getrandbits(64) for _ in range(cell_count)],
+                [rng.getrandbits(64) for _ in range(cell_count)]]
+        _zobrist_tables[board_size] = keys
+    return keys
+
+
+def get_neighborhoods(board_size):
+    """
+    获取指定棋盘大小的5x5邻域表
+    :param board_size: 棋盘大小
+    :return: neighborhoods[idx] 为 ((邻居一维索引, 权重), ...)
+    """
+    table = _neighborhoods.get(board_size)
+    if table is None:
+        table = []
+        for row in range(board_size):
+            for col in range(board_size):
+                hood = []
+                for dr in range(-2, 3):
+                    for dc in range(-2, 3):
+                        r, c = row + dr, col + dc
+                        if (dr or dc) and 0 <= r < board_size and 0 <= c < board_size:
+                            weight = NEAR_WEIGHT if abs(dr) <= 1 and abs(dc) <= 1 else 1
+                            hood.append((r * board_size + c, weight))
+                table.append(tuple(hood))
+        _neighborhoods[board_size] = table
+    return table
+
+
+def get_line_slots(board_size):
+    """
+    获取指定棋盘大小的直线位掩码表
+    每条横线、竖线、两个方向的斜线各有一个编号；格子在直线上的位置对应掩码中的一位
+    :param board_size: 棋盘大小
+    :return: (直线总数, slots)，slots[idx] 为 ((直线编号, 位, 窗口移位), ...)，依次为水平、垂直、主对角线、副对角线；
+             掩码右移“窗口移位”后的低9位即以该格为中心的窗口
+    """
+    table = _line_slots.get(board_size)
+    if table is None:
+        size = board_size
+        diagonals = 2 * size - 1
+        slots = []
+        for row in range(size):
+            for col in range(size):
+                slots.append((
+                    (row, 1 << (col + LINE_PADDING), col),
+                    (size + col, 1 << (row + LINE_PADDING), row),
+                    (2 * size + col - row + size - 1, 1 << (row + LINE_PADDING), row),
+                    (2 * size + diagonals + row + col, 1 << (row + LINE_PADDING), row)
+                ))
+        table = (2 * size + 2 * diagonals, tuple(slots))
+        _line_slots[board_size] = table
+    return table
+
+
 class GomokuGame:
     def __init__(self, board_size=15):
         """
@@ -9,18 +113,80 @@ class GomokuGame:
         :param board_size: 棋盘大小，默认15x15
         """
         self.board_size = board_size
-        self.board = [[0 for _ in range(board_size)] for _ in range(board_size)]
+        # 棋盘使用一维bytearray存储，索引为 row * board_size + col
+        self.cells = bytearray(board_size * board_size)
+        self.zobrist_keys = get_zobrist_keys(board_size)
+        self.hash = 0  # 当前局面的Zobrist哈希，随落子/撤销增量更新
         self.current_player = 1  # 1为人类玩家(黑子)，2为AI玩家(白子)
         self.game_over = False
         self.winner = 0
-        
+        # 落子栈：每项为 (索引, 落子前current_player, 落子前game_over, 落子前winner)
+        self.move_stack = []
+        # 邻域计数与候选集合，随落子/撤销增量维护
+        self.neighborhoods = get_neighborhoods(board_size)
+        self.neighbor_counts = [0] * (board_size * board_size)
+        self.candidates = set()  # 周围两格内有棋子的空位
+        # 棋子数与双方每条直线的位掩码，随落子/撤销增量维护，胜负和平局判断只需常数时间
+        self.stones = 0
+        line_count, self.line_slots = get_line_slots(board_size)
+        self.lines = [None, [0] * line_count, [0] * line_count]
+
     def reset_game(self):
         """重置游戏"""
-        self.board = [[0 for _ in range(self.board_size)] for _ in range(self.board_size)]
+        self.cells = bytearray(self.board_size * self.board_size)
+        self.hash = 0
         self.current_player = 1
         self.game_over = False
         self.winner = 0
-        
+        self.move_stack = []
+        self.neighbor_counts = [0] * (self.board_size * self.board_size)
+        self.candidates = set()
+        self.stones = 0
+        self.lines = [None, [0] * len(self.lines[1]), [0] * len(self.lines[1])]
+
+    @property
+    def board(self):
+        """二维列表形式的棋盘（只读快照，用于序列化和兼容旧接口）"""
+        size = self.board_size
+        cells = self.cells
+        return [list(cells[i * size:(i + 1) * size]) for i in range(size)]
+
+    @board.setter
+    def board(self, rows):
+        """从二维列表载入棋盘"""
+        size = self.board_size
+        self.cells = bytearray(size * size)
+        for i, row in enumerate(rows):
+            self.cells[i * size:(i + 1) * size] = bytes(row)
+        self.move_stack = []
+        self.hash = 0
+        self.neighbor_counts = [0] * (size * size)
+        self.candidates = set()
+        self.stones = 0
+        self.lines = [None, [0] * len(self.lines[1]), [0] * len(self.lines[1])]
+        for idx, piece in enumerate(self.cells):
+            if piece:
+                self.hash ^= self.zobrist_keys[piece][idx]
+                self.add_neighbors(idx)
+                self.add_line_bits(idx, piece)
+
+    def place_stone(self, idx, player):
+        """直接摆放一颗棋子（不记录落子、不判断胜负），用于载入局面"""
+        self.cells[idx] = player
+        self.hash ^= self.zobrist_keys[player][idx]
+        self.add_neighbors(idx)
+        self.add_line_bits(idx, player)
+
+    def index(self, row, col):
+        """二维坐标转一维索引"""
+        return row * self.board_size + col
+
+    def get(self, row, col):
+        """获取指定位置的棋子，越界返回-1"""
+        if 0 <= row < self.board_size and 0 <= col < self.board_size:
+            return self.cells[row * self.board_size + col]
+        return -1
+
     def is_valid_move(self, row, col):
         """
         检查落子是否有效
@@ -28,11 +194,11 @@ class GomokuGame:
         :param col: 列坐标
         :return: 是否有效
         """
-        return (0 <= row < self.board_size and 
-                0 <= col < self.board_size and 
-                self.board[row][col] == 0 and 
+        return (0 <= row < self.board_size and
+                0 <= col < self.board_size and
+                self.cells[row * self.board_size + col] == 0 and
                 not self.game_over)
-    
+
     def make_move(self, row, col, player=None):
         """
         落子
@@ -43,14 +209,21 @@ class GomokuGame:
         """
         if player is None:
             player = self.current_player
-            
+
         if not self.is_valid_move(row, col):
             return False
-            
-        self.board[row][col] = player
-        
+
+        idx = row * self.board_size + col
+        self.move_stack.append((idx, self.current_player, self.game_over, self.winner))
+        # 落子前判断是否成五（只需查4条直线的位掩码）
+        wins = self.makes_five(idx, player)
+        self.cells[idx] = player
+        self.hash ^= self.zobrist_keys[player][idx]
+        self.add_neighbors(idx)
+        self.add_line_bits(idx, player)
+
         # 检查是否获胜
-        if self.check_winner(row, col, player):
+        if wins:
             self.game_over = True
             self.winner = player
         # 检查是否平局
@@ -60,9 +233,82 @@ class GomokuGame:
         else:
             # 切换玩家
             self.current_player = 3 - self.current_player
-            
+
         return True
-    
+
+    def push_move(self, row, col, player=None):
+        """
+        可撤销的落子，供搜索在同一个棋盘上前进/回退使用
+        :return: 是否成功落子
+        """
+        return self.make_move(row, col, player)
+
+    def pop_move(self):
+        """
+        撤销最近一次落子，恢复current_player、game_over和winner
+        :return: 被撤销的落子位置 (row, col)，没有可撤销的落子时返回None
+        """
+        if not self.move_stack:
+            return None
+        idx, self.current_player, self.game_over, self.winner = self.move_stack.pop()
+        player = self.cells[idx]
+        self.hash ^= self.zobrist_keys[player][idx]
+        self.cells[idx] = 0
+        self.remove_neighbors(idx)
+        self.remove_line_bits(idx, player)
+        return divmod(idx, self.board_size)
+
+    def add_neighbors(self, idx):
+        """idx处放下棋子后更新邻域计数和候选集合"""
+        counts = self.neighbor_counts
+        cells = self.cells
+        candidates = self.candidates
+        for nb, weight in self.neighborhoods[idx]:
+            counts[nb] += weight
+            if cells[nb] == 0:
+                candidates.add(nb)
+        candidates.discard(idx)
+
+    def remove_neighbors(self, idx):
+        """idx处棋子移走后更新邻域计数和候选集合"""
+        counts = self.neighbor_counts
+        candidates = self.candidates
+        for nb, weight in self.neighborhoods[idx]:
+            counts[nb] -= weight
+            if counts[nb] == 0:
+                candidates.discard(nb)
+        if counts[idx]:
+            candidates.add(idx)
+
+    def count_near(self, idx):
+        """idx周围一格内（3x3）的棋子数"""
+        return self.neighbor_counts[idx] // NEAR_WEIGHT
+
+    def add_line_bits(self, idx, player):
+        """idx处放下player的棋子后更新棋子数和直线位掩码"""
+        lines = self.lines[player]
+        for line, bit, _ in self.line_slots[idx]:
+            lines[line] |= bit
+        self.stones += 1
+
+    def remove_line_bits(self, idx, player):
+        """idx处player的棋子移走后更新棋子数和直线位掩码"""
+        lines = self.lines[player]
+        for line, bit, _ in self.line_slots[idx]:
+            lines[line] &= ~bit
+        self.stones -= 1
+
+    def makes_five(self, idx, player):
+        """
+        player的棋子放在idx处是否与已有棋子连成五子（idx处是否已有棋子不影响结果）
+        每个方向取以idx为中心的9位窗口查 WIN_WINDOWS，共4次查表
+        """
+        lines = self.lines[player]
+        for line, bit, shift in self.line_slots[idx]:
+            if WIN_WINDOWS[((lines[line] | bit) >> shift) & 0x1FF]:
+                return True
+        return False
+
     def check_winner(self, row, col, player):
         """
         检查指定位置的落子是否形成五子连珠
@@ -71,53 +317,69 @@ class GomokuGame:
         :param player: 玩家编号
         :return: 是否获胜
         """
-        directions = [
-            (0, 1),   # 水平
-            (1, 0),   # 垂直
-            (1, 1),   # 主对角线
-            (1, -1)   # 副对角线
-        ]
-        
-        for dx, dy in directions:
-            count = 1  # 包含当前落子
-            
-            # 向一个方向检查
-            x, y = row + dx, col + dy
-            while (0 <= x < self.board_size and 
-                   0 <= y < self.board_size and 
-                   self.board[x][y] == player):
-                count += 1
-                x, y = x + dx, y + dy
-                
-            # 向相反方向检查
-            x, y = row - dx, col - dy
-            while (0 <= x < self.board_size and 
-                   0 <= y < self.board_size and 
-                   self.board[x][y] == player):
-                count += 1
-                x, y = x - dx, y - dy
-                
-            if count >= 5:
-                return True
-                
-        return False
-    
+        return self.makes_five(row * self.board_size + col, player)
+
+    def is_winning_move(self, row, col, player=None):
+        """
+        检查落子是否直接获胜，不改动棋盘（搜索中判断一步杀使用）
+        :param player: 玩家编号，默认为当前玩家
+        :return: 落子有效且形成五子连珠时返回True
+        """
+        if player is None:
+            player = self.current_player
+        return self.is_valid_move(row, col) and self.makes_five(row * self.board_size + col, player)
+
     def is_board_full(self):
         """检查棋盘是否已满"""
-        for row in self.board:
-            if 0 in row:
-                return False
-        return True
-    
+        return self.stones == len(self.cells)
+
+    def occupied_region(self, margin=0):
+        """
+        棋子分布的矩形范围，由各行、各列的位掩码得出，不扫描整个棋盘
+        :param margin: 向外扩展的格数（不超出棋盘）
+        :return: (top, left, bottom, right)（含两端），棋盘上没有棋子时返回None
+        """
+        if not self.stones:
+            return None
+        size = self.board_size
+        black, white = self.lines[1], self.lines[2]
+        # 横线掩码的位是列号，竖线掩码的位是行号
+        col_bits = 0
+        row_bits = 0
+        for k in range(size):
+            col_bits |= black[k] | white[k]
+            row_bits |= black[size + k] | white[size + k]
+        top = (row_bits & -row_bits).bit_length() - 1 - LINE_PADDING
+        left = (col_bits & -col_bits).bit_length() - 1 - LINE_PADDING
+        bottom = row_bits.bit_length() - 1 - LINE_PADDING
+        right = col_bits.bit_length() - 1 - LINE_PADDING
+        return (max(0, top - margin), max(0, left - margin),
+                min(size - 1, bottom + margin), min(size - 1, right + margin))
+
+    def stone_list(self):
+        """
+        棋盘上全部棋子，由各行的位掩码得出，不扫描整个棋盘
+        :return: [(一维索引, 玩家编号), ...]，按索引升序
+        """
+        size = self.board_size
+        stones = []
+        for row in range(size):
+            base = row * size - LINE_PADDING
+            for player in (1, 2):
+                bits = self.lines[player][row]
+                while bits:
+                    low = bits & -bits
+                    stones.append((base + low.bit_length() - 1, player))
+                    bits ^= low
+        stones.sort()
+        return stones
+
     def get_valid_moves(self):
         """获取所有有效的落子位置"""
-        moves = []
-        for i in range(self.board_size):
-            for j in range(self.board_size):
-                if self.board[i][j] == 0:
-                    moves.append((i, j))
-        return moves
-    
+        size = self.board_size
+        cells = self.cells
+        return [divmod(idx, size) for idx in range(len(cells)) if cells[idx] == 0]
+
     def get_board_state(self):
         """获取当前棋盘状态"""
         return {
@@ -127,12 +389,71 @@ class GomokuGame:
             'winner': self.winner,
             'board_size': self.board_size
         }
-    
+
+    def to_bytes(self):
+        """
+        紧凑二进制序列化：头部加按落子顺序排列的棋子（每颗2字节）
+        通过board属性载入、没有落子记录的棋子作为摆放棋子排在最前
+        :return: bytes
+        """
+        cells = self.cells
+        played = [entry[0] for entry in self.move_stack]
+        in_stack = set(played)
+        words = [idx | STONE_SETUP | (STONE_WHITE if cells[idx] == 2 else 0)
+                 for idx in range(len(cells)) if cells[idx] and idx not in in_stack]
+        words += [idx | (STONE_WHITE if cells[idx] == 2 else 0) for idx in played]
+        header = SERIAL_HEADER.pack(SERIAL_VERSION, self.board_size, self.current_player,
+                                    int(self.game_over), self.winner, len(words))
+        return header + struct.pack('>%dH' % len(words), *words)
+
+    def to_base64(self):
+        """to_bytes 的URL安全base64文本形式"""
+        return base64.urlsafe_b64encode(self.to_bytes()).decode('ascii')
+
     def copy(self):
         """创建游戏状态的副本"""
-        new_game = GomokuGame(self.board_size)
-        new_game.board = [row[:] for row in self.board]
+        new_game = GomokuGame.__new__(GomokuGame)
+        new_game.board_size = self.board_size
+        new_game.cells = self.cells[:]
+        new_game.zobrist_keys = self.zobrist_keys
+        new_game.hash = self.hash
         new_game.current_player = self.current_player
         new_game.game_over = self.game_over
         new_game.winner = self.winner
-        return new_game
\ No newline at end of file
+        new_game.move_stack = self.move_stack[:]
+        new_game.neighborhoods = self.neighborhoods
+        new_game.neighbor_counts = self.neighbor_counts[:]
+        new_game.candidates = set(self.candidates)
+        new_game.stones = self.stones
+        new_game.line_slots = self.line_slots
+        new_game.lines = [None, self.lines[1][:], self.lines[2][:]]
+        return new_game
+
+
+def game_from_bytes(data):
+    """
+    从 GomokuGame.to_bytes 的结果恢复棋局，落子记录按原顺序重放（可继续撤销）
+    :param data: bytes
+    :return: GomokuGame实例
+    """
+    version, board_size, current_player, game_over, winner, count = SERIAL_HEADER.unpack_from(data)
+    if version != SERIAL_VERSION:
+        raise ValueError('不支持的棋局格式版本: %d' % version)
+    game = GomokuGame(board_size)
+    for word in struct.unpack_from('>%dH' % count, data, SERIAL_HEADER.size):
+        idx = word & STONE_INDEX_MASK
+        player = 2 if word & STONE_WHITE else 1
+        if word & STONE_SETUP:
+            game.place_stone(idx, player)
+        else:
+            game.current_player = player
+            game.make_move(idx // board_size, idx % board_size, player)
+    game.current_player = current_player
+    game.game_over = bool(game_over)
+    game.winner = winner
+    return game
+
+
+def game_from_base64(text):
+    """从 GomokuGame.to_base64 的结果恢复棋局"""
+    return game_from_bytes(base64.urlsafe_b64decode(text))
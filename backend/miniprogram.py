@@ -3,20 +3,149 @@
 使用Flask提供API接口供微信小程序调用
 """
 
-from flask import Flask, request, jsonify, render_template, send_from_directory
+from flask import Flask, Response, request, jsonify, render_template, send_from_directory, stream_with_context
 from flask_cors import CORS
 import json
 import uuid
 import time
 import os
-from game_logic import GomokuGame
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from game_logic import GomokuGame, game_from_base64, MIN_BOARD_SIZE, MAX_BOARD_SIZE
 from ai_player import GomokuAI
+from game_analysis import analyze_games, BLUNDER_THRESHOLD
+from parallel_search import default_workers, configure_pool, warm_pool
+from opening_book import load_opening_book
+from position_cache import get_position_cache
+from search_stats import SearchMetrics
+from session_store import MemorySessionStore, SQLiteSessionStore
 
 app = Flask(__name__, static_folder='../website')
 CORS(app)  # 允许跨域请求
 
-# 存储游戏会话的字典
-game_sessions = {}
+# 会话存储配置：后端 memory/sqlite、最大会话数、会话过期时间（秒）、后台清理间隔（秒）
+SESSION_BACKEND = os.environ.get('SESSION_BACKEND', 'memory')
+SESSION_DB_PATH = os.environ.get('SESSION_DB_PATH', 'sessions.db')
+MAX_SESSIONS = int(os.environ.get('MAX_SESSIONS', 1000))
+SESSION_TTL = int(os.environ.get('SESSION_TTL', 3600))
+SESSION_REAP_INTERVAL = 60
+
+# ai_speed 0-4 对应的AI思考时间上限（秒）：极速到深思
+AI_SPEED_TIMES = [0.2, 0.8, 1.5, 2.5, 4.0]
+# 提示无法复用AI上一次搜索的结果时，重新搜索的时间上限（秒）
+HINT_TIME_LIMIT = 1.5
+
+# 根节点并行搜索的工作进程数（环境变量 AI_WORKERS，默认CPU核数）及启用并行搜索的最低难度
+AI_WORKERS = int(os.environ.get('AI_WORKERS', default_workers()))
+PARALLEL_MIN_DIFFICULTY = 5
+
+# 批量复盘分析：每个请求最多的对局数，以及并行分析对局的工作进程数（复盘分析专用的进程池，不占用根节点并行搜索的进程池）
+MAX_ANALYSIS_GAMES = int(os.environ.get('MAX_ANALYSIS_GAMES', 1000))
+ANALYSIS_WORKERS = int(os.environ.get('ANALYSIS_WORKERS', AI_WORKERS))
+# 根节点并行搜索进程池的大小在启动时按配置确定，之后不再变化
+configure_pool(AI_WORKERS)
+
+# 开局库文件（环境变量 OPENING_BOOK，由 opening_book.py 离线生成，不存在时不使用）及使用开局库的最低难度
+OPENING_BOOK_PATH = os.environ.get('OPENING_BOOK', 'opening_book.bin')
+BOOK_MIN_DIFFICULTY = 3
+opening_book = load_opening_book(OPENING_BOOK_PATH)
+
+# 所有对局共享的局面缓存容量（环境变量 POSITION_CACHE_SIZE，设为0关闭）
+POSITION_CACHE_SIZE = int(os.environ.get('POSITION_CACHE_SIZE', 10000))
+position_cache = get_position_cache(POSITION_CACHE_SIZE) if POSITION_CACHE_SIZE > 0 else None
+
+# 后台AI搜索线程数：同时进行的AI搜索上限，与Web请求线程分开（环境变量 AI_SEARCH_THREADS）
+AI_SEARCH_THREADS = int(os.environ.get('AI_SEARCH_THREADS', 4))
+ai_executor = ThreadPoolExecutor(max_workers=AI_SEARCH_THREADS, thread_name_prefix='ai-search')
+
+# 后台预读：AI落子后在玩家思考期间提前搜索玩家可能的应手（环境变量 AI_PONDER=1 时默认开启，
+# 创建游戏时也可用 ponder 参数指定）；预读线程数限制预读占用的CPU（环境变量 PONDER_THREADS）
+AI_PONDER = os.environ.get('AI_PONDER', '0') == '1'
+PONDER_THREADS = int(os.environ.get('PONDER_THREADS', 1))
+ponder_executor = ThreadPoolExecutor(max_workers=PONDER_THREADS, thread_name_prefix='ai-ponder')
+
+# 按难度汇总的AI搜索指标（/api/stats）；设置环境变量 AI_PROFILE_DIR 时用cProfile剖析每次AI落子，
+# 剖析结果按 <game_id>-<手数>.prof 保存到该目录
+search_metrics = SearchMetrics()
+AI_PROFILE_DIR = os.environ.get('AI_PROFILE_DIR')
+if AI_PROFILE_DIR:
+    os.makedirs(AI_PROFILE_DIR, exist_ok=True)
+
+# AI落子任务：{job_id: {'game_id', 'future', 'created_at'}}
+ai_jobs = {}
+ai_jobs_lock = threading.Lock()
+AI_JOB_TTL = 600  # 已完成的任务保留秒数
+AI_STATUS_MAX_WAIT = 30  # /api/ai_move_status 长轮询最多等待秒数
+# 每步AI思考时间的硬上限（毫秒，环境变量 AI_MAX_TIME_MS）：客户端传入seed时搜索按固定深度进行，
+# 仍受此上限约束，避免高难度的固定深度搜索长时间占用服务端工作线程
+AI_MAX_TIME_MS = float(os.environ.get('AI_MAX_TIME_MS', 10000))
+
+def create_ai(difficulty, engine=None, seed=None):
+    """按难度创建AI：高难度使用并行搜索，中高难度使用开局库，所有AI共享局面缓存"""
+    workers = AI_WORKERS if difficulty >= PARALLEL_MIN_DIFFICULTY else 1
+    book = opening_book if difficulty >= BOOK_MIN_DIFFICULTY else None
+    return GomokuAI(difficulty, engine=engine, workers=workers, seed=seed, opening_book=book,
+                    position_cache=position_cache, collect_stats=True, profile=bool(AI_PROFILE_DIR),
+                    max_time_ms=AI_MAX_TIME_MS)
+
+def create_session(game, ai, created_at='', hint_used=False, last_ai_job=None, ponder=False):
+    """创建会话字典"""
+    return {
+        'ponder': ponder,  # 是否在玩家思考期间后台预读
+        'ponder_stop': None,  # 中止当前预读的事件
+        'game': game,
+        'ai': ai,
+        'created_at': created_at,
+        'hint_used': hint_used,  # 追踪提示是否已使用
+        'lock': threading.Lock(),  # 保护棋盘状态（后台AI任务与请求线程共用）
+        'search_lock': threading.Lock(),  # 同一个AI实例同时只能进行一次搜索
+        'pending_job': None,  # 正在计算的AI落子任务
+        'last_ai_job': last_ai_job  # 最近完成的AI落子任务 {'job_id', 'result'}，供其他工作进程查询
+    }
+
+def serialize_session(session):
+    """会话快照（用于持久化和多进程共享）：紧凑编码的棋局、AI设置和提示使用情况"""
+    ai = session['ai']
+    return {
+        'game': session['game'].to_base64(),
+        'difficulty': ai.difficulty,
+        'engine': ai.engine,
+        'seed': ai.seed,
+        'created_at': session['created_at'],
+        'hint_used': session['hint_used'],
+        'last_ai_job': session['last_ai_job'],
+        'ponder': session['ponder']
+    }
+
+def restore_session(data, previous=None):
+    """
+    从快照恢复会话
+    :param previous: 本进程缓存的旧会话，AI设置相同时沿用其AI实例（保留置换表等缓存）
+    """
+    if 'game' in data:
+        game = game_from_base64(data['game'])
+    else:
+        # 旧版快照：二维棋盘
+        state = data['board_state']
+        game = GomokuGame(state['board_size'])
+        game.board = state['board']
+        game.current_player = state['current_player']
+        game.game_over = state['game_over']
+        game.winner = state['winner']
+    
+    difficulty = data['difficulty']
+    ai = previous['ai'] if previous is not None else None
+    if ai is None or (ai.difficulty, ai.engine, ai.seed) != (difficulty, data['engine'], data['seed']):
+        ai = create_ai(difficulty, data['engine'], data['seed'])
+    return create_session(game, ai, data['created_at'], data['hint_used'], data.get('last_ai_job'),
+                          data.get('ponder', False))
+
+if SESSION_BACKEND == 'sqlite':
+    game_sessions = SQLiteSessionStore(SESSION_DB_PATH, serialize_session, restore_session,
+                                       MAX_SESSIONS, SESSION_TTL)
+else:
+    game_sessions = MemorySessionStore(MAX_SESSIONS, SESSION_TTL)
+game_sessions.start_reaper(SESSION_REAP_INTERVAL)
 
 # 网页版路由
 @app.route('/')
@@ -36,21 +165,27 @@ def new_game():
         data = request.get_json() or {}
         difficulty = data.get('difficulty', 3)  # 默认中等难度
         board_size = data.get('board_size', 15)  # 默认15x15棋盘
+        engine = data.get('engine')  # 搜索引擎 minimax/pvs，默认按难度选择
+        seed = data.get('seed')  # 随机种子，指定后AI落子可复现
+        ponder = bool(data.get('ponder', AI_PONDER))  # 玩家思考期间后台预读
+        
+        if not isinstance(board_size, int) or not MIN_BOARD_SIZE <= board_size <= MAX_BOARD_SIZE:
+            return jsonify({
+                'success': False,
+                'error': 'Invalid board_size',
+                'message': '棋盘大小必须在%d到%d之间' % (MIN_BOARD_SIZE, MAX_BOARD_SIZE)
+            }), 400
         
         # 创建游戏实例
         game = GomokuGame(board_size)
-        ai = GomokuAI(difficulty)
+        ai = create_ai(difficulty, engine, seed)
         
         # 生成游戏ID
         game_id = str(uuid.uuid4())
         
         # 存储游戏会话
-        game_sessions[game_id] = {
-            'game': game,
-            'ai': ai,
-            'created_at': json.dumps(data.get('timestamp', '')),
-            'hint_used': False  # 追踪提示是否已使用
-        }
+        game_sessions.put(game_id, create_session(game, ai, json.dumps(data.get('timestamp', '')),
+                                                  ponder=ponder))
         
         return jsonify({
             'success': True,
@@ -75,7 +210,8 @@ def make_move():
         row = data.get('row')
         col = data.get('col')
         
-        if not game_id or game_id not in game_sessions:
+        session = game_sessions.get(game_id) if game_id else None
+        if session is None:
             return jsonify({
                 'success': False,
                 'error': 'Invalid game_id',
@@ -89,50 +225,195 @@ def make_move():
                 'message': '缺少落子坐标'
             }), 400
         
-        session = game_sessions[game_id]
         game = session['game']
-        ai = session['ai']
         
-        # 检查是否轮到玩家
-        if game.current_player != 1:
-            return jsonify({
-                'success': False,
-                'error': 'Not player turn',
-                'message': '现在不是玩家回合'
-            }), 400
+        with session['lock']:
+            # 检查是否轮到玩家
+            if game.current_player != 1:
+                return jsonify({
+                    'success': False,
+                    'error': 'Not player turn',
+                    'message': '现在不是玩家回合'
+                }), 400
+            
+            # 玩家落子
+            if not game.make_move(row, col, 1):
+                return jsonify({
+                    'success': False,
+                    'error': 'Invalid move',
+                    'message': '无效的落子位置'
+                }), 400
+            stop_pondering(session)
+            
+            response_data = {
+                'success': True,
+                'board_state': game.get_board_state(),
+                'player_move': {'row': row, 'col': col},
+                'ai_move': None,
+                'message': '落子成功'
+            }
+            
+            # 如果游戏未结束且轮到AI，把AI搜索交给后台线程
+            job_id = None
+            if not game.game_over and game.current_player == 2:
+                # AI思考时间：可配置的速度，作为迭代加深搜索的时间上限
+                speed_setting = data.get('ai_speed', 2)  # 默认普通速度
+                thinking_time = AI_SPEED_TIMES[max(0, min(speed_setting, 4))]
+                job_id = submit_ai_move(game_id, session, thinking_time)
+            else:
+                game_sessions.save(game_id, session)
+        
+        if job_id is not None:
+            if data.get('async'):
+                # 异步模式：立即返回，客户端通过 /api/ai_move_status 获取AI落子
+                response_data['ai_job_id'] = job_id
+                response_data['ai_status'] = 'pending'
+            else:
+                job_result = ai_jobs[job_id]['future'].result()
+                if job_result is not None:
+                    response_data.update(job_result)
+        
+        return jsonify(response_data)
         
-        # 玩家落子
-        if not game.make_move(row, col, 1):
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': '落子操作失败'
+        }), 500
+
+def submit_ai_move(game_id, session, thinking_time):
+    """
+    把AI落子提交到后台线程池（调用方需持有 session['lock']）
+    :return: 任务ID
+    """
+    job_id = str(uuid.uuid4())
+    session['pending_job'] = job_id
+    search_game = session['game'].copy()
+    future = ai_executor.submit(run_ai_move, game_id, session, job_id, search_game, thinking_time)
+    
+    now = time.time()
+    with ai_jobs_lock:
+        # 顺便清理早已完成的旧任务
+        expired = [old_id for old_id, job in ai_jobs.items()
+                   if job['future'].done() and now - job['created_at'] > AI_JOB_TTL]
+        for old_id in expired:
+            del ai_jobs[old_id]
+        ai_jobs[job_id] = {'game_id': game_id, 'future': future, 'created_at': now}
+    return job_id
+
+def submit_ponder(session, thinking_time):
+    """AI落子后把预读提交到后台线程池（调用方需持有 session['lock']）"""
+    stop_event = threading.Event()
+    session['ponder_stop'] = stop_event
+    ponder_executor.submit(run_ponder, session, session['game'].copy(), thinking_time, stop_event)
+
+def run_ponder(session, ponder_game, thinking_time, stop_event):
+    """后台线程执行预读，每个预测的应手最多搜索 thinking_time 秒"""
+    with session['search_lock']:
+        if not stop_event.is_set():
+            session['ai'].ponder(ponder_game, thinking_time * 1000, stop_event=stop_event)
+
+def stop_pondering(session):
+    """中止会话正在进行或排队中的预读（调用方需持有 session['lock']）"""
+    if session['ponder_stop'] is not None:
+        session['ponder_stop'].set()
+        session['ponder_stop'] = None
+
+def run_ai_move(game_id, session, job_id, search_game, thinking_time):
+    """
+    后台线程执行AI搜索并落子
+    :param search_game: 提交任务时的棋盘副本
+    :return: AI落子相关的响应字段；期间游戏被重置等导致任务作废时返回None
+    """
+    ai = session['ai']
+    with session['search_lock']:
+        result = ai.search(search_game, time_limit_ms=thinking_time * 1000)
+        if AI_PROFILE_DIR and ai.last_profile is not None:
+            profile_name = '%s-%d.prof' % (game_id, len(search_game.move_stack) + 1)
+            ai.last_profile.dump_stats(os.path.join(AI_PROFILE_DIR, profile_name))
+    search_metrics.record(ai.difficulty, result)
+    
+    with session['lock']:
+        if session['pending_job'] != job_id:
+            return None
+        session['pending_job'] = None
+        game = session['game']
+        ai_move = result['move']
+        if not ai_move:
+            return None
+        ai_row, ai_col = ai_move
+        game.make_move(ai_row, ai_col, 2)
+        job_result = {
+            'ai_move': {'row': ai_row, 'col': ai_col},
+            'ai_thinking_time': round(result['time_ms'] / 1000, 2),  # 实际思考时间
+            'ai_search_depth': result['depth'],  # 完成的搜索深度
+            'board_state': game.get_board_state()
+        }
+        session['last_ai_job'] = {'job_id': job_id, 'result': job_result}
+        if session['ponder'] and not game.game_over:
+            submit_ponder(session, thinking_time)
+        game_sessions.save(game_id, session)
+        return job_result
+
+@app.route('/api/ai_move_status', methods=['GET'])
+def ai_move_status():
+    """查询异步AI落子任务，wait参数（秒）指定最多等待多久（长轮询）"""
+    try:
+        job_id = request.args.get('job_id')
+        job = ai_jobs.get(job_id) if job_id else None
+
+        if job is None and job_id:
+            # 任务可能由其他工作进程执行：从共享会话中查询结果
+            game_id = request.args.get('game_id')
+            session = game_sessions.get(game_id) if game_id else None
+            if session is not None:
+                with session['lock']:
+                    last_job = session['last_ai_job']
+                response_data = {
+                    'success': True,
+                    'job_id': job_id,
+                    'game_id': game_id
+                }
+                if last_job is not None and last_job['job_id'] == job_id:
+                    response_data['status'] = 'done'
+                    response_data['message'] = 'AI落子完成'
+                    response_data.update(last_job['result'])
+                else:
+                    response_data['status'] = 'pending'
+                    response_data['message'] = 'AI思考中'
+                return jsonify(response_data)
+
+        if job is None:
             return jsonify({
                 'success': False,
-                'error': 'Invalid move',
-                'message': '无效的落子位置'
+                'error': 'Invalid job_id',
+                'message': 'AI任务不存在'
             }), 400
         
+        future = job['future']
+        wait_seconds = min(max(request.args.get('wait', 0, type=float), 0), AI_STATUS_MAX_WAIT)
+        if wait_seconds > 0 and not future.done():
+            wait([future], timeout=wait_seconds)
+        
         response_data = {
             'success': True,
-            'board_state': game.get_board_state(),
-            'player_move': {'row': row, 'col': col},
-            'ai_move': None,
-            'message': '落子成功'
+            'job_id': job_id,
+            'game_id': job['game_id']
         }
-        
-        # 如果游戏未结束且轮到AI，让AI落子
-        if not game.game_over and game.current_player == 2:
-            import time
-            # AI思考时间：可配置的速度
-            speed_setting = data.get('ai_speed', 2)  # 默认普通速度
-            speed_times = [0.2, 0.8, 1.5, 2.5, 4.0]  # 对应极速到深思
-            thinking_time = speed_times[min(speed_setting, 4)]
-            time.sleep(thinking_time)
-            
-            ai_move = ai.get_best_move(game)
-            if ai_move:
-                ai_row, ai_col = ai_move
-                game.make_move(ai_row, ai_col, 2)
-                response_data['ai_move'] = {'row': ai_row, 'col': ai_col}
-                response_data['ai_thinking_time'] = thinking_time  # 返回思考时间
-                response_data['board_state'] = game.get_board_state()
+        if not future.done():
+            response_data['status'] = 'pending'
+            response_data['message'] = 'AI思考中'
+        elif future.exception() is not None:
+            response_data['status'] = 'failed'
+            response_data['message'] = 'AI落子失败'
+        elif future.result() is None:
+            response_data['status'] = 'cancelled'
+            response_data['message'] = 'AI任务已作废'
+        else:
+            response_data['status'] = 'done'
+            response_data['message'] = 'AI落子完成'
+            response_data.update(future.result())
         
         return jsonify(response_data)
         
@@ -140,7 +421,7 @@ def make_move():
         return jsonify({
             'success': False,
             'error': str(e),
-            'message': '落子操作失败'
+            'message': '查询AI任务失败'
         }), 500
 
 @app.route('/api/get_board_state', methods=['GET'])
@@ -149,14 +430,15 @@ def get_board_state():
     try:
         game_id = request.args.get('game_id')
         
-        if not game_id or game_id not in game_sessions:
+        session = game_sessions.get(game_id) if game_id else None
+        if session is None:
             return jsonify({
                 'success': False,
                 'error': 'Invalid game_id',
                 'message': '游戏会话不存在'
             }), 400
         
-        game = game_sessions[game_id]['game']
+        game = session['game']
         
         return jsonify({
             'success': True,
@@ -178,18 +460,22 @@ def reset_game():
         data = request.get_json()
         game_id = data.get('game_id')
         
-        if not game_id or game_id not in game_sessions:
+        session = game_sessions.get(game_id) if game_id else None
+        if session is None:
             return jsonify({
                 'success': False,
                 'error': 'Invalid game_id',
                 'message': '游戏会话不存在'
             }), 400
         
-        game = game_sessions[game_id]['game']
-        game.reset_game()
-        
-        # 重置提示使用状态
-        game_sessions[game_id]['hint_used'] = False
+        game = session['game']
+        with session['lock']:
+            game.reset_game()
+            session['pending_job'] = None  # 正在计算的AI落子作废
+            stop_pondering(session)
+            # 重置提示使用状态
+            session['hint_used'] = False
+            game_sessions.save(game_id, session)
         
         return jsonify({
             'success': True,
@@ -211,49 +497,61 @@ def ai_hint():
     try:
         game_id = request.args.get('game_id')
         
-        if not game_id or game_id not in game_sessions:
+        session = game_sessions.get(game_id) if game_id else None
+        if session is None:
             return jsonify({
                 'success': False,
                 'error': 'Invalid game_id',
                 'message': '游戏会话不存在'
             }), 400
         
-        session = game_sessions[game_id]
         game = session['game']
         ai = session['ai']
         
-        # 检查提示是否已使用
-        if session.get('hint_used', False):
-            return jsonify({
-                'success': False,
-                'error': 'hint_already_used',
-                'message': '每局游戏只能使用一次提示'
-            }), 400
-        
-        # 检查是否轮到玩家下棋
-        if game.current_player != 1:  # 1是玩家
-            return jsonify({
-                'success': False,
-                'error': 'not_player_turn',
-                'message': '不是玩家回合，无法使用提示'
-            }), 400
-        
-        # 检查游戏是否已结束
-        if game.game_over:
-            return jsonify({
-                'success': False,
-                'error': 'game_over',
-                'message': '游戏已结束，无法使用提示'
-            }), 400
+        # 检查并标记提示都在会话锁内完成：同一局的并发请求只有一个能通过检查并开始分析
+        with session['lock']:
+            # 检查提示是否已使用
+            if session.get('hint_used', False):
+                return jsonify({
+                    'success': False,
+                    'error': 'hint_already_used',
+                    'message': '每局游戏只能使用一次提示'
+                }), 400
+            
+            # 检查是否轮到玩家下棋
+            if game.current_player != 1:  # 1是玩家
+                return jsonify({
+                    'success': False,
+                    'error': 'not_player_turn',
+                    'message': '不是玩家回合，无法使用提示'
+                }), 400
+            
+            # 检查游戏是否已结束
+            if game.game_over:
+                return jsonify({
+                    'success': False,
+                    'error': 'game_over',
+                    'message': '游戏已结束，无法使用提示'
+                }), 400
+            
+            session['hint_used'] = True
+            game_sessions.save(game_id, session)
+            # 创建游戏副本让AI为玩家分析；预读会占用搜索锁，先中止（已完成的预读结果保留）
+            game_copy = game.copy()
+            stop_pondering(session)
         
-        # 创建游戏副本让AI分析
-        game_copy = game.copy()
-        hint_move = ai.get_best_move(game_copy)
+        hint_move = None
+        try:
+            with session['search_lock']:
+                hint_move = ai.analyze(game_copy, 1, HINT_TIME_LIMIT * 1000)['move']
+        finally:
+            if not hint_move:
+                # 没有给出提示（无可用落子或分析出错），退还本局的提示次数
+                with session['lock']:
+                    session['hint_used'] = False
+                    game_sessions.save(game_id, session)
         
         if hint_move:
-            # 标记提示已使用
-            session['hint_used'] = True
-            
             return jsonify({
                 'success': True,
                 'hint_move': {'row': hint_move[0], 'col': hint_move[1]},
@@ -274,29 +572,99 @@ def ai_hint():
             'message': '获取AI提示失败'
         }), 500
 
+@app.route('/api/analyze_games', methods=['POST'])
+def analyze_games_api():
+    """批量复盘分析：逐局面给出最佳落子、分数和失误标记，以NDJSON流式返回"""
+    try:
+        data = request.get_json() or {}
+        games = data.get('games')
+        
+        if not isinstance(games, list) or not games:
+            return jsonify({
+                'success': False,
+                'error': 'Missing games',
+                'message': '缺少对局列表'
+            }), 400
+        
+        if len(games) > MAX_ANALYSIS_GAMES:
+            return jsonify({
+                'success': False,
+                'error': 'Too many games',
+                'message': '单次最多分析%d局' % MAX_ANALYSIS_GAMES
+            }), 400
+        
+        for game in games:
+            moves = game.get('moves') if isinstance(game, dict) else game
+            if not isinstance(moves, list) or not all(
+                    isinstance(move, (list, tuple)) and len(move) == 2 for move in moves):
+                return jsonify({
+                    'success': False,
+                    'error': 'Invalid moves',
+                    'message': '落子序列格式错误'
+                }), 400
+            board_size = game.get('board_size', 15) if isinstance(game, dict) else 15
+            if not isinstance(board_size, int) or not MIN_BOARD_SIZE <= board_size <= MAX_BOARD_SIZE:
+                return jsonify({
+                    'success': False,
+                    'error': 'Invalid board_size',
+                    'message': '棋盘大小必须在%d到%d之间' % (MIN_BOARD_SIZE, MAX_BOARD_SIZE)
+                }), 400
+        
+        difficulty = data.get('difficulty', 3)
+        time_limit_ms = data.get('time_limit_ms')  # 每个局面的思考时间上限，默认按固定深度搜索
+        engine = data.get('engine')
+        blunder_threshold = data.get('blunder_threshold', BLUNDER_THRESHOLD)
+        
+        def generate():
+            try:
+                for record in analyze_games(games, difficulty, time_limit_ms, engine,
+                                            blunder_threshold, ANALYSIS_WORKERS):
+                    yield json.dumps(record, ensure_ascii=False) + '\n'
+            except Exception as e:
+                # 响应已经开始，只能以一行错误结束
+                yield json.dumps({'type': 'error', 'error': str(e), 'message': '复盘分析失败'},
+                                 ensure_ascii=False) + '\n'
+        
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': '复盘分析失败'
+        }), 500
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """健康检查接口"""
     return jsonify({
         'success': True,
         'message': '服务器运行正常',
-        'active_games': len(game_sessions)
+        'active_games': len(game_sessions),
+        'sessions': game_sessions.stats(),
+        'opening_book': opening_book.stats() if opening_book is not None else None,
+        'position_cache': position_cache.stats() if position_cache is not None else None
     })
 
-# 清理过期游戏会话的后台任务
+@app.route('/api/stats', methods=['GET'])
+def search_stats():
+    """AI搜索指标：按难度汇总的落子延迟直方图、结果来源、搜索深度、节点数和置换表命中率"""
+    try:
+        stats = search_metrics.snapshot()
+        stats['success'] = True
+        return jsonify(stats)
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': '获取统计信息失败'
+        }), 500
+
+# 清理过期游戏会话（后台清理线程会定期调用，也可以手动触发）
 def cleanup_expired_sessions():
-    """清理超过1小时的游戏会话"""
-    import time
-    current_time = time.time()
-    expired_sessions = []
-    
-    for game_id, session in game_sessions.items():
-        # 这里可以添加基于时间的清理逻辑
-        # 简单起见，当前不实现自动清理
-        pass
-    
-    for game_id in expired_sessions:
-        del game_sessions[game_id]
+    """清理超过 SESSION_TTL 秒未访问的游戏会话，返回清理数量"""
+    return game_sessions.reap()
 
 if __name__ == '__main__':
     print("五子棋微信小程序后端服务器启动中...")
@@ -306,6 +674,9 @@ if __name__ == '__main__':
     print("- GET /api/get_board_state - 获取棋盘状态")
     print("- POST /api/reset_game - 重置游戏")
     print("- GET /api/ai_hint - 获取AI提示")
+    print("- GET /api/ai_move_status - 查询异步AI落子")
+    print("- POST /api/analyze_games - 批量复盘分析 (NDJSON)")
+    print("- GET /api/stats - AI搜索统计")
     print("- GET /api/health - 健康检查")
     
     # 支持Railway等云平台的PORT环境变量
@@ -313,4 +684,8 @@ if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5001))
     debug = os.environ.get('FLASK_ENV') != 'production'
     
+    # 预先启动并行搜索的工作进程
+    if AI_WORKERS > 1:
+        warm_pool(AI_WORKERS)
+    
     app.run(debug=debug, host='0.0.0.0', port=port)
\ No newline at end of file
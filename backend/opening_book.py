@@ -0,0 +1,219 @@
+"""
+开局库
+离线用深度搜索生成开局阶段每个局面的最佳落子，按规范哈希（见 symmetry.py）排序写入紧凑的二进制文件；
+服务启动时以内存映射方式打开，查询只需一次二分查找，不做任何搜索。
+
+文件格式（大端）：
+    头部  魔数 b'GMOB', 格式版本, 棋盘大小, 最大步数, 保留字节, 条目数
+    条目  规范哈希(8字节), 规范形态上的落子索引(2字节), 搜索分数(4字节)，按哈希升序排列
+
+生成开局库：
+    python opening_book.py --output opening_book.bin --plies 8 --difficulty 5 --width 3
+"""
+
+import argparse
+import bisect
+import mmap
+import os
+import struct
+import time
+
+from game_logic import GomokuGame
+from symmetry import canonical_key, to_canonical, from_canonical
+
+BOOK_MAGIC = b'GMOB'
+BOOK_VERSION = 1
+BOOK_HEADER = struct.Struct('>4sBBBxI')
+BOOK_ENTRY = struct.Struct('>QHi')
+
+# 分数写入4字节有符号整数前的截断范围
+SCORE_LIMIT = 2 ** 31 - 1
+
+
+class OpeningBook:
+    """内存映射的只读开局库"""
+
+    def __init__(self, path):
+        """
+        打开开局库文件
+        :param path: 开局库文件路径
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.data) < BOOK_HEADER.size:
+            raise ValueError('开局库文件不完整: %s' % path)
+        magic, version, self.board_size, self.max_plies, self.count = BOOK_HEADER.unpack_from(self.data)
+        if magic != BOOK_MAGIC or version != BOOK_VERSION:
+            raise ValueError('不支持的开局库文件: %s' % path)
+        if len(self.data) < BOOK_HEADER.size + self.count * BOOK_ENTRY.size:
+            raise ValueError('开局库文件不完整: %s' % path)
+        self.keys = BookKeys(self.data, self.count)
+        self.probes = 0
+        self.hits = 0
+
+    def __len__(self):
+        return self.count
+
+    def lookup(self, key):
+        """
+        按规范哈希查询
+        :return: (规范形态上的落子索引, 分数)，未收录返回None
+        """
+        pos = bisect.bisect_left(self.keys, key)
+        if pos == self.count or self.keys[pos] != key:
+            return None
+        _, move, score = BOOK_ENTRY.unpack_from(self.data, BOOK_HEADER.size + pos * BOOK_ENTRY.size)
+        return move, score
+
+    def probe(self, game):
+        """
+        查询当前局面的开局库落子
+        :param game: GomokuGame实例
+        :return: ((row, col), 分数)，棋盘大小不符、超出收录步数或未收录时返回None
+        """
+        if game.board_size != self.board_size or game.game_over:
+            return None
+        if game.stones >= self.max_plies:
+            return None
+        self.probes += 1
+        key, symmetry = canonical_key(game)
+        entry = self.lookup(key)
+        if entry is None:
+            return None
+        idx = from_canonical(entry[0], self.board_size, symmetry)
+        if game.cells[idx]:
+            return None
+        self.hits += 1
+        return divmod(idx, self.board_size), entry[1]
+
+    def stats(self):
+        """开局库条目数与命中统计"""
+        return {
+            'entries': self.count,
+            'max_plies': self.max_plies,
+            'probes': self.probes,
+            'hits': self.hits
+        }
+
+    def close(self):
+        self.data.close()
+
+
+class BookKeys:
+    """开局库条目哈希的只读序列视图，供bisect二分查找"""
+
+    def __init__(self, data, count):
+        self.data = data
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, pos):
+        return struct.unpack_from('>Q', self.data, BOOK_HEADER.size + pos * BOOK_ENTRY.size)[0]
+
+
+def load_opening_book(path):
+    """
+    打开开局库
+    :return: OpeningBook实例，文件不存在时返回None
+    """
+    if not path or not os.path.exists(path):
+        return None
+    return OpeningBook(path)
+
+
+def write_book(path, board_size, max_plies, entries):
+    """
+    写入开局库文件
+    :param entries: {规范哈希: (规范形态上的落子索引, 分数)}
+    """
+    with open(path, 'wb') as f:
+        f.write(BOOK_HEADER.pack(BOOK_MAGIC, BOOK_VERSION, board_size, max_plies, len(entries)))
+        for key in sorted(entries):
+            move, score = entries[key]
+            score = max(-SCORE_LIMIT, min(SCORE_LIMIT, int(score)))
+            f.write(BOOK_ENTRY.pack(key, move, score))
+
+
+def first_moves(board_size, radius=2):
+    """黑方第一手的展开范围：中心周围radius格内的点（对称的点在展开时去重）"""
+    center = board_size // 2
+    return [(center + dr, center + dc)
+            for dr in range(-radius, radius + 1) for dc in range(-radius, radius + 1)]
+
+
+def build_book(board_size=15, max_plies=8, difficulty=5, width=3, workers=1, log=None):
+    """
+    生成开局库条目
+    从空棋盘出发：黑方（对手）展开AI候选排序中的前width个落子，白方（AI）走深度搜索的最佳落子，
+    直到棋盘上有max_plies颗棋子。对称的局面只搜索一次。
+    :param difficulty: 搜索使用的难度（决定搜索深度），按固定深度搜索，不限时间
+    :param width: 每个黑方局面展开的落子数
+    :param workers: 根节点并行搜索的工作进程数
+    :param log: 可选的回调 log(已收录条目数, 局面, 搜索结果)
+    :return: {规范哈希: (规范形态上的落子索引, 分数)}
+    """
+    # 在函数内导入：ai_player 较重，只有生成开局库时才需要
+    from ai_player import GomokuAI
+
+    ai = GomokuAI(difficulty, workers=workers, seed=0)
+    entries = {}
+    seen = set()
+    frontier = [GomokuGame(board_size)]
+    while frontier:
+        game = frontier.pop()
+        key, symmetry = canonical_key(game)
+        if key in seen:
+            continue
+        seen.add(key)
+        stones = game.stones
+        if game.game_over or stones >= max_plies:
+            continue
+
+        if game.current_player == ai.ai_player:
+            result = ai.search(game, use_book=False)
+            if result['move'] is None:
+                continue
+            row, col = result['move']
+            entries[key] = (to_canonical(game.index(row, col), board_size, symmetry), result['score'])
+            if log is not None:
+                log(len(entries), game, result)
+            replies = [result['move']]
+        elif stones == 0:
+            replies = first_moves(board_size)
+        else:
+            replies = ai.get_candidate_moves(game)[:width]
+
+        for row, col in replies:
+            child = game.copy()
+            if child.make_move(row, col):
+                frontier.append(child)
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生成五子棋开局库')
+    parser.add_argument('--output', default='opening_book.bin', help='开局库文件路径')
+    parser.add_argument('--board-size', type=int, default=15, help='棋盘大小')
+    parser.add_argument('--plies', type=int, default=8, help='收录到棋盘上有多少颗棋子为止')
+    parser.add_argument('--difficulty', type=int, default=5, help='搜索难度（决定搜索深度）')
+    parser.add_argument('--width', type=int, default=3, help='每个对手局面展开的落子数')
+    parser.add_argument('--workers', type=int, default=1, help='根节点并行搜索的工作进程数')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+
+    def log(count, game, result):
+        print('%5d  棋子数 %2d  落子 %-8s 分数 %7d  深度 %d  %.1fs' % (
+            count, game.stones, result['move'],
+            result['score'], result['depth'], time.perf_counter() - start))
+
+    entries = build_book(args.board_size, args.plies, args.difficulty, args.width, args.workers, log)
+    write_book(args.output, args.board_size, args.plies, entries)
+    print('已写入 %s：%d 个局面，用时 %.1f 秒' % (args.output, len(entries), time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+根节点并行搜索的进程池
+GomokuAI 把根节点的每个候选落子作为一个任务分给工作进程，各自搜索剩余深度后由主进程汇总。
+进程池在请求之间复用；每个工作进程按 (难度, 引擎) 缓存GomokuAI实例，
+置换表和历史表在多次请求之间保持温热。
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from game_logic import GomokuGame
+
+# 进程共享的进程池及其工作进程数
+_pool = None
+_pool_workers = 0
+# 保护进程池的创建和关闭：后台AI搜索线程、预读线程和复盘分析会同时取用进程池
+_pool_lock = threading.Lock()
+
+# 工作进程内缓存的AI实例：{(难度, 引擎): GomokuAI}
+_worker_ais = {}
+
+
+def default_workers():
+    """默认工作进程数：本机CPU核数"""
+    return os.cpu_count() or 1
+
+
+def configure_pool(workers):
+    """
+    设置共享进程池的工作进程数（服务启动时按配置调用一次）
+    进程池已经创建时不改变其大小
+    """
+    global _pool_workers
+    with _pool_lock:
+        if _pool is None:
+            _pool_workers = max(1, workers)
+
+
+def get_pool(workers=None):
+    """
+    获取共享进程池，第一次调用时创建
+    进程池大小创建后固定：使用 configure_pool 设置的工作进程数，未设置时取第一次调用的workers；
+    之后需要更多工作进程时不重建（多出的任务排队），避免关闭其他线程正在使用的进程池。
+    使用spawn方式启动工作进程，避免在多线程的Web服务器中fork
+    :param workers: 需要的工作进程数
+    """
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None:
+            if not _pool_workers:
+                _pool_workers = max(1, workers or default_workers())
+            context = multiprocessing.get_context('spawn')
+            _pool = ProcessPoolExecutor(max_workers=_pool_workers, mp_context=context,
+                                        initializer=init_worker)
+        return _pool
+
+
+def warm_pool(workers):
+    """提前启动全部工作进程并完成初始化，避免第一次搜索把思考时间花在启动进程上"""
+    pool = get_pool(workers)
+    list(pool.map(worker_pid, range(_pool_workers)))
+
+
+def shutdown_pool(pool=None):
+    """
+    关闭共享进程池（进程池损坏或服务退出时调用），下次 get_pool 时按同样大小重新创建
+    :param pool: 调用方出错时使用的进程池；它已被其他线程换掉时不关闭新的进程池
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None or (pool is not None and pool is not _pool):
+            return
+        old, _pool = _pool, None
+    old.shutdown(wait=False, cancel_futures=True)
+
+
+def init_worker():
+    """工作进程启动时导入搜索模块（构建棋型查找表等）"""
+    import ai_player  # noqa: F401
+
+
+def worker_pid(_):
+    """空任务：返回工作进程号"""
+    return os.getpid()
+
+
+def timed_out_root_result(move):
+    """没有在截止时间前搜完的根节点落子"""
+    return {'move': move, 'score': 0, 'pv': [], 'nodes': 0, 'timed_out': True, 'counters': None}
+
+
+def score_root_task(task):
+    """
+    工作进程执行的任务：搜索根节点的一个候选落子
+    :param task: (难度, 引擎, 棋盘二维列表, 当前玩家, AI执子方, 落子, 搜索深度,
+                  截止时间（time.time() 时间戳，None表示不限时）, AI视角下界, 是否清空缓存)
+    :return: GomokuAI.score_root_move 的结果；开始执行时已过截止时间则直接返回超时
+    """
+    # 在函数内导入：ai_player 在模块级导入本模块
+    from ai_player import GomokuAI
+
+    difficulty, engine, board, current_player, ai_player, move, depth, deadline, alpha, fresh = task
+    time_limit_ms = None
+    if deadline is not None:
+        # 任务可能在队列中等待过，只能用截止时间前剩下的时间
+        time_limit_ms = (deadline - time.time()) * 1000
+        if time_limit_ms <= 0:
+            return timed_out_root_result(move)
+    ai = _worker_ais.get((difficulty, engine))
+    if ai is None:
+        ai = GomokuAI(difficulty, engine=engine)
+        _worker_ais[(difficulty, engine)] = ai
+    # 为对方分析（提示）时交换执子方；minimax的置换表键区分执子方，不会混用
+    ai.ai_player, ai.human_player = ai_player, 3 - ai_player
+    if fresh:
+        # 固定种子时不使用之前任务留下的缓存，结果只取决于局面和深度
+        ai.tt.clear()
+        ai.history = {}
+
+    game = GomokuGame(len(board))
+    game.board = board
+    game.current_player = current_player
+    return ai.score_root_move(game, move, depth, time_limit_ms, alpha)
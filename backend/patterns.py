@@ -0,0 +1,278 @@
+"""
+棋型查找表
+以某一落点为中心、沿一个方向取9格窗口（两侧各4格），按落子方视角编码为三进制整数：
+0 空位，1 己方棋子，2 阻挡（对方棋子或棋盘外）。
+预先计算全部窗口的棋型类别和分数，搜索中判断棋型只需一次编码和一次查表。
+"""
+
+# 棋型类别（数值越大威胁越大）
+NONE = 0
+TWO = 1          # 眠二
+OPEN_TWO = 2     # 活二
+THREE = 3        # 眠三
+OPEN_THREE = 4   # 活三
+FOUR = 5         # 冲四
+OPEN_FOUR = 6    # 活四
+FIVE = 7         # 五连
+
+# 各棋型的方向潜力分数
+CLASS_SCORES = [0, 10, 20, 100, 200, 500, 1000, 10000]
+
+# 无对手棋子的连续窗口得分：(窗口长度, 己方棋子数) -> 分数
+WINDOW_SCORES = {
+    (5, 5): 10000,  # 五连胜利
+    (5, 4): 1000,   # 活四
+    (5, 3): 100,    # 活三
+    (5, 2): 10,     # 活二
+    (4, 4): 800,    # 冲四
+    (4, 3): 50,     # 冲三
+    (4, 2): 5,      # 活二
+    (3, 3): 200,    # 连三
+    (3, 2): 2,      # 连二
+}
+
+WINDOW_RADIUS = 4
+WINDOW_SIZE = 2 * WINDOW_RADIUS + 1
+DIRECTIONS = [(0, 1), (1, 0), (1, 1), (1, -1)]
+
+# 裁剪直线时在首尾棋子外各保留的空位数（棋型窗口半径的两倍），
+# 保证裁剪后每个位置的棋型、每个窗口的分数都与整条线相同
+LINE_MARGIN = 2 * WINDOW_RADIUS
+
+# 直线几何信息缓存：{board_size: (lines, cell_lines)}
+_line_geometry = {}
+
+# 直线棋型缓存：{线上棋子bytes: (黑方各位置棋型, 白方各位置棋型)}
+_line_class_cache = {}
+LINE_CACHE_LIMIT = 1 << 18
+
+# 棋型升级关系：再补一子能形成的棋型 -> 当前棋型
+_PROMOTION = {OPEN_FOUR: OPEN_THREE, FOUR: THREE, OPEN_THREE: OPEN_TWO, THREE: TWO}
+
+
+def _has_five(window):
+    """窗口中是否有经过中心的五连"""
+    for start in range(WINDOW_RADIUS - 4, WINDOW_RADIUS + 1):
+        if all(window[k] == 1 for k in range(start, start + 5)):
+            return True
+    return False
+
+
+def _classify(window, memo):
+    """
+    对中心为己方棋子的窗口分类
+    :param window: 9个元素的元组
+    :param memo: 分类结果缓存
+    :return: 棋型类别
+    """
+    cls = memo.get(window)
+    if cls is not None:
+        return cls
+
+    if _has_five(window):
+        memo[window] = FIVE
+        return FIVE
+
+    # 统计能补成经过中心的五连的空位
+    completions = 0
+    best = NONE
+    for k in range(WINDOW_SIZE):
+        if window[k] != 0:
+            continue
+        placed = window[:k] + (1,) + window[k + 1:]
+        if _has_five(placed):
+            completions += 1
+        elif completions == 0:
+            best = max(best, _PROMOTION.get(_classify(placed, memo), NONE))
+
+    if completions >= 2:
+        cls = OPEN_FOUR
+    elif completions == 1:
+        cls = FOUR
+    else:
+        cls = best
+    memo[window] = cls
+    return cls
+
+
+def _build_table():
+    """生成全部中心为己方棋子的窗口的 (类别, 分数) 表"""
+    table = [(NONE, 0)] * (3 ** WINDOW_SIZE)
+    memo = {}
+    for code in range(3 ** (WINDOW_SIZE - 1)):
+        # 把8个邻居的编码展开成9格窗口，中心固定为己方棋子
+        cells = []
+        rest = code
+        for _ in range(WINDOW_SIZE - 1):
+            rest, digit = divmod(rest, 3)
+            cells.append(digit)
+        cells.reverse()
+        window = tuple(cells[:WINDOW_RADIUS]) + (1,) + tuple(cells[WINDOW_RADIUS:])
+        full_code = 0
+        for value in window:
+            full_code = full_code * 3 + value
+        cls = _classify(window, memo)
+        table[full_code] = (cls, CLASS_SCORES[cls])
+    return table
+
+
+# 棋型查找表：PATTERN_TABLE[窗口编码] -> (棋型类别, 分数)
+PATTERN_TABLE = _build_table()
+
+
+def get_line_geometry(board_size):
+    """
+    获取棋盘上所有直线的索引表
+    每条线上的格子按方向 (0,1)、(1,0)、(1,1)、(1,-1) 前进的顺序排列，
+    在一维棋盘上都是等差索引，可以直接用切片取出
+    :param board_size: 棋盘大小
+    :return: (lines, cell_lines)
+             lines[line_id] 为该线在一维棋盘上的切片，
+             cell_lines[idx] 为经过该格子的4条线的line_id
+    """
+    geometry = _line_geometry.get(board_size)
+    if geometry is not None:
+        return geometry
+
+    n = board_size
+    lines = []
+    starts = []
+    # 横线与竖线
+    starts += [((r, 0), (0, 1)) for r in range(n)]
+    starts += [((0, c), (1, 0)) for c in range(n)]
+    # 主对角线方向 (1,1)：从左边界和上边界出发
+    starts += [((r, 0), (1, 1)) for r in range(n - 1, -1, -1)]
+    starts += [((0, c), (1, 1)) for c in range(1, n)]
+    # 副对角线方向 (1,-1)：从上边界和右边界出发
+    starts += [((0, c), (1, -1)) for c in range(n)]
+    starts += [((r, n - 1), (1, -1)) for r in range(1, n)]
+
+    cell_lines = [[] for _ in range(n * n)]
+    for (r, c), (dr, dc) in starts:
+        line = []
+        while 0 <= r < n and 0 <= c < n:
+            line.append(r * n + c)
+            r, c = r + dr, c + dc
+        line_id = len(lines)
+        for idx in line:
+            cell_lines[idx].append(line_id)
+        # 四个方向的一维步长分别为 1、n、n+1、n-1，均为正数
+        step = dr * n + dc if len(line) > 1 else 1
+        lines.append(slice(line[0], line[-1] + 1, step))
+
+    geometry = (lines, [tuple(ids) for ids in cell_lines])
+    _line_geometry[board_size] = geometry
+    return geometry
+
+
+def trim_line(key):
+    """
+    裁掉直线两端离棋子较远的空位，使大棋盘上直线的计算量和缓存键只取决于棋子分布的范围
+    :param key: 线上棋子的bytes
+    :return: (裁剪后的bytes, 裁剪后第一格在原直线上的位置)；整条线没有棋子时返回 (b'', 0)
+    """
+    if len(key) <= 2 * LINE_MARGIN + 1:
+        return key, 0  # 短直线（如15路棋盘）裁剪省不下计算，直接返回
+    body = key.lstrip(b'\x00')
+    if not body:
+        return b'', 0
+    start = max(0, len(key) - len(body) - LINE_MARGIN)
+    end = len(key.rstrip(b'\x00')) + LINE_MARGIN
+    return key[start:end], start
+
+
+def line_classes(key):
+    """
+    查表获取一条直线上每个空位落子后的棋型，线外视为阻挡
+    :param key: 线上棋子的bytes
+    :return: (黑方各位置棋型元组, 白方各位置棋型元组)，已有棋子的位置为NONE
+    """
+    classes = _line_class_cache.get(key)
+    if classes is not None:
+        return classes
+
+    length = len(key)
+    result = ([NONE] * length, [NONE] * length)
+    for pos in range(length):
+        if key[pos] != 0:
+            continue
+        for player in (1, 2):
+            code = 0
+            for k in range(pos - WINDOW_RADIUS, pos + WINDOW_RADIUS + 1):
+                if k == pos:
+                    value = 1
+                elif 0 <= k < length:
+                    piece = key[k]
+                    value = 0 if piece == 0 else (1 if piece == player else 2)
+                else:
+                    value = 2
+                code = code * 3 + value
+            result[player - 1][pos] = PATTERN_TABLE[code][0]
+
+    if len(_line_class_cache) >= LINE_CACHE_LIMIT:
+        _line_class_cache.clear()
+    classes = (tuple(result[0]), tuple(result[1]))
+    _line_class_cache[key] = classes
+    return classes
+
+
+def threat_map(game):
+    """
+    计算候选空位（game.candidates，周围两格内有棋子）落子后四个方向中最强的棋型
+    能形成冲四、活三及以上棋型的空位一定在候选集合内，无需扫描整个棋盘
+    :param game: GomokuGame实例
+    :return: [None, 黑方{索引: 棋型}, 白方{索引: 棋型}]，只包含棋型不为NONE的空位
+    """
+    cells = game.cells
+    lines, cell_lines = get_line_geometry(game.board_size)
+    line_cache = {}
+    black = {}
+    white = {}
+    for idx in game.candidates:
+        best_black = best_white = NONE
+        for line_id in cell_lines[idx]:
+            line = lines[line_id]
+            cached = line_cache.get(line_id)
+            if cached is None:
+                # 只计算裁剪后的一段，段外的空位离棋子太远，不会形成棋型
+                key, offset = trim_line(bytes(cells[line]))
+                cached = (line_classes(key), offset, len(key))
+                line_cache[line_id] = cached
+            classes, offset, length = cached
+            pos = (idx - line.start) // line.step - offset
+            if not 0 <= pos < length:
+                continue
+            if classes[0][pos] > best_black:
+                best_black = classes[0][pos]
+            if classes[1][pos] > best_white:
+                best_white = classes[1][pos]
+        if best_black:
+            black[idx] = best_black
+        if best_white:
+            white[idx] = best_white
+    return [None, black, white]
+
+
+def window_code(cells, board_size, row, col, dx, dy, player):
+    """
+    计算以 (row, col) 为中心、方向 (dx, dy) 的9格窗口编码，中心视为己方棋子
+    :param cells: 一维棋盘
+    :param board_size: 棋盘大小
+    :param player: 己方玩家编号
+    :return: PATTERN_TABLE的下标
+    """
+    code = 0
+    r, c = row - WINDOW_RADIUS * dx, col - WINDOW_RADIUS * dy
+    for k in range(WINDOW_SIZE):
+        if k == WINDOW_RADIUS:
+            value = 1
+        elif 0 <= r < board_size and 0 <= c < board_size:
+            piece = cells[r * board_size + c]
+            value = 0 if piece == 0 else (1 if piece == player else 2)
+        else:
+            value = 2
+        code = code * 3 + value
+        r += dx
+        c += dy
+    return code
+
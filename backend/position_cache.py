@@ -0,0 +1,118 @@
+"""
+进程内共享的局面缓存
+不同对局经常走到相同或互为镜像的局面。GomokuAI 完成一次搜索后，把结果按
+(棋盘大小, 规范哈希, 难度, 引擎) 存入进程内共享的LRU缓存，落子和主要变例都记录为规范形态上的索引；
+其他对局走到对称的局面时直接取出结果，再变换回实际坐标。
+"""
+
+import threading
+from collections import OrderedDict
+
+from symmetry import canonical_key, to_canonical, from_canonical
+
+
+class PositionCache:
+    """按规范局面缓存搜索结果的LRU缓存（线程安全）"""
+
+    def __init__(self, max_entries=10000):
+        """
+        :param max_entries: 最多缓存的局面数，超出时淘汰最久未使用的
+        """
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # {键: (规范落子索引, 分数, 深度, 规范主要变例, 来源)}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evicted = 0
+
+    def make_key(self, game, ai):
+        """
+        :return: (缓存键, 对称变换编号)
+        """
+        key, symmetry = canonical_key(game)
+        return (game.board_size, key, ai.difficulty, ai.engine), symmetry
+
+    def probe(self, game, ai):
+        """
+        查询局面的缓存结果
+        :param game: GomokuGame实例
+        :param ai: 发起查询的GomokuAI（难度和引擎相同的结果才可复用）
+        :return: {'move', 'score', 'depth', 'pv', 'source'}（已变换回实际坐标），未命中返回None
+        """
+        key, symmetry = self.make_key(game, ai)
+        size = game.board_size
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+        move, score, depth, pv, source = entry
+        idx = from_canonical(move, size, symmetry)
+        if game.cells[idx]:
+            return None
+        return {
+            'move': divmod(idx, size),
+            'score': score,
+            'depth': depth,
+            'pv': [divmod(from_canonical(step, size, symmetry), size) for step in pv],
+            'source': source
+        }
+
+    def store(self, game, ai, result):
+        """
+        缓存一次搜索结果
+        :param result: GomokuAI.search 的结果字典
+        """
+        key, symmetry = self.make_key(game, ai)
+        size = game.board_size
+        row, col = result['move']
+        entry = (to_canonical(row * size + col, size, symmetry), result['score'], result['depth'],
+                 tuple(to_canonical(r * size + c, size, symmetry) for r, c in result['pv']),
+                 result['source'])
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            self.stores += 1
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evicted += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def stats(self):
+        """缓存条目数与命中统计"""
+        with self.lock:
+            probes = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / probes, 4) if probes else 0.0,
+                'stores': self.stores,
+                'evicted': self.evicted
+            }
+
+
+# 进程共享的缓存实例
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_position_cache(max_entries=10000):
+    """
+    获取进程共享的局面缓存，第一次调用时按max_entries创建
+    """
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = PositionCache(max_entries)
+        return _shared_cache
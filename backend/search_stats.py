@@ -0,0 +1,155 @@
+"""
+AI搜索指标汇总
+服务端按难度累计每次AI落子的用时直方图、结果来源、完成深度以及搜索统计（GomokuAI collect_stats），
+供 /api/stats 查看，用于调整各难度的搜索深度和估算服务器容量。
+"""
+
+import threading
+import time
+
+# 延迟直方图的桶上界（毫秒），最后一个桶收集超过最大上界的样本
+LATENCY_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class LatencyHistogram:
+    """固定桶的延迟直方图"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms):
+        index = 0
+        while index < len(self.buckets) and ms > self.buckets[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, fraction):
+        """
+        估算分位数：累计比例达到fraction的桶的上界，但不超过观测到的最大值
+        （最后一个桶没有上界，直接取最大值）。只保留桶计数，结果是估计值，不是样本的精确分位数
+        :param fraction: 0-1之间的比例，如0.95
+        :return: 毫秒
+        """
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                if index < len(self.buckets):
+                    return round(min(float(self.buckets[index]), self.max_ms), 2)
+                break
+        return round(self.max_ms, 2)
+
+    def to_dict(self):
+        """
+        buckets 为按上界排列的 [{'le_ms': 上界, 'count': 样本数}, ...]，最后一个桶的上界为None；
+        p50_ms/p95_ms/p99_ms 是按桶估计的分位数（见 percentile）
+        """
+        bounds = list(self.buckets) + [None]
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total_ms / self.count, 2) if self.count else 0.0,
+            'max_ms': round(self.max_ms, 2),
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+            'buckets': [{'le_ms': bound, 'count': count} for bound, count in zip(bounds, self.counts)]
+        }
+
+
+class DifficultyMetrics:
+    """单个难度的累计指标"""
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.sources = {}  # 结果来源 -> 次数
+        self.searches = 0  # 实际搜索（非开局库/缓存等直接返回）的次数
+        self.timed_out = 0
+        self.depth_total = 0
+        self.nodes = 0
+        self.search_ms = 0.0
+        self.evaluations = 0
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.branching_total = 0.0
+        self.branching_count = 0
+
+    def add(self, result):
+        self.latency.add(result['time_ms'])
+        source = result['source']
+        self.sources[source] = self.sources.get(source, 0) + 1
+        if source != 'search':
+            return
+        self.searches += 1
+        self.timed_out += 1 if result['timed_out'] else 0
+        self.depth_total += result['depth']
+        self.nodes += result['nodes']
+        self.search_ms += result['time_ms']
+        stats = result.get('stats')
+        if stats is not None:
+            self.evaluations += stats['leaf_evaluations']
+            self.tt_probes += stats['tt_probes']
+            self.tt_hits += stats['tt_hits']
+            if stats['branching_factor'] is not None:
+                self.branching_total += stats['branching_factor']
+                self.branching_count += 1
+
+    def to_dict(self):
+        searches = self.searches
+        return {
+            'latency': self.latency.to_dict(),
+            'sources': dict(self.sources),
+            'searches': searches,
+            'timed_out_rate': round(self.timed_out / searches, 4) if searches else 0.0,
+            'avg_depth': round(self.depth_total / searches, 2) if searches else 0.0,
+            'avg_nodes': round(self.nodes / searches) if searches else 0,
+            'nps': round(self.nodes / (self.search_ms / 1000.0)) if self.search_ms > 0 else 0,
+            'avg_leaf_evaluations': round(self.evaluations / searches) if searches else 0,
+            'tt_hit_rate': round(self.tt_hits / self.tt_probes, 4) if self.tt_probes else 0.0,
+            'avg_branching_factor': (round(self.branching_total / self.branching_count, 2)
+                                     if self.branching_count else None)
+        }
+
+
+class SearchMetrics:
+    """按难度汇总AI搜索指标（线程安全）"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.difficulties = {}
+        self.started_at = time.time()
+
+    def record(self, difficulty, result):
+        """
+        记录一次AI搜索
+        :param result: GomokuAI.search 的结果字典
+        """
+        with self.lock:
+            metrics = self.difficulties.get(difficulty)
+            if metrics is None:
+                metrics = DifficultyMetrics()
+                self.difficulties[difficulty] = metrics
+            metrics.add(result)
+
+    def snapshot(self):
+        """:return: {'uptime_seconds', 'difficulties': {难度: 指标}}"""
+        with self.lock:
+            return {
+                'uptime_seconds': round(time.time() - self.started_at),
+                'difficulties': {str(difficulty): metrics.to_dict()
+                                 for difficulty, metrics in sorted(self.difficulties.items())}
+            }
+
+    def reset(self):
+        with self.lock:
+            self.difficulties = {}
+            self.started_at = time.time()
@@ -0,0 +1,275 @@
+"""
+游戏会话存储
+限制会话总数（超出时淘汰最久未访问的会话），并按最后访问时间过期清理。
+MemorySessionStore 只保存在进程内存中；SQLiteSessionStore 把会话快照写入SQLite文件，
+服务重启后可以恢复，多个工作进程共用同一个文件时也不需要会话粘滞。两者接口相同，服务端按配置选择。
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+
+class SessionStore(ABC):
+    """会话存储的公共接口：LRU容量限制、TTL过期、后台清理线程和淘汰统计；后端缺少任一抽象方法时无法创建"""
+
+    def __init__(self, max_sessions=1000, ttl_seconds=3600):
+        """
+        :param max_sessions: 最多保存的会话数，超出时淘汰最久未访问的会话
+        :param ttl_seconds: 会话超过多少秒未访问即过期
+        """
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0  # 因容量限制淘汰的会话数
+        self.expired = 0  # 因过期清理的会话数
+        self.reaper = None
+
+    @abstractmethod
+    def get(self, game_id):
+        """获取会话并刷新最后访问时间，不存在或已过期返回None"""
+
+    @abstractmethod
+    def put(self, game_id, session):
+        """保存（新建或覆盖）会话"""
+
+    @abstractmethod
+    def save(self, game_id, session):
+        """会话内容变化后保存；会话已被淘汰或删除时不会重新加入"""
+
+    @abstractmethod
+    def delete(self, game_id):
+        """删除会话"""
+
+    @abstractmethod
+    def reap(self):
+        """
+        清理全部过期会话
+        :return: 本次清理的会话数
+        """
+
+    @abstractmethod
+    def __len__(self):
+        """当前会话数"""
+
+    def __contains__(self, game_id):
+        return self.get(game_id) is not None
+
+    def stats(self):
+        """会话数量与淘汰统计"""
+        with self.lock:
+            return {
+                'backend': self.backend,
+                'active': len(self),
+                'max_sessions': self.max_sessions,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evicted': self.evicted,
+                'expired': self.expired
+            }
+
+    def start_reaper(self, interval_seconds=60):
+        """启动后台守护线程，定期清理过期会话"""
+        if self.reaper is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval_seconds)
+                self.reap()
+
+        self.reaper = threading.Thread(target=run, name='session-reaper', daemon=True)
+        self.reaper.start()
+
+
+class MemorySessionStore(SessionStore):
+    """进程内存中的会话存储"""
+    backend = 'memory'
+
+    def __init__(self, max_sessions=1000, ttl_seconds=3600):
+        super().__init__(max_sessions, ttl_seconds)
+        # {game_id: (session, 最后访问时间)}，按访问先后排列，最久未访问的在最前
+        self.sessions = OrderedDict()
+
+    def get(self, game_id):
+        with self.lock:
+            entry = self.sessions.get(game_id)
+            now = time.time()
+            if entry is None or now - entry[1] > self.ttl_seconds:
+                if entry is not None:
+                    del self.sessions[game_id]
+                    self.expired += 1
+                self.misses += 1
+                return None
+            self.sessions[game_id] = (entry[0], now)
+            self.sessions.move_to_end(game_id)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, game_id, session):
+        with self.lock:
+            self.sessions[game_id] = (session, time.time())
+            self.sessions.move_to_end(game_id)
+            while len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+                self.evicted += 1
+
+    def save(self, game_id, session):
+        with self.lock:
+            if game_id in self.sessions:
+                self.put(game_id, session)
+
+    def delete(self, game_id):
+        with self.lock:
+            self.sessions.pop(game_id, None)
+
+    def reap(self):
+        with self.lock:
+            deadline = time.time() - self.ttl_seconds
+            expired = [game_id for game_id, (_, last_access) in self.sessions.items()
+                       if last_access < deadline]
+            for game_id in expired:
+                del self.sessions[game_id]
+            self.expired += len(expired)
+            return len(expired)
+
+    def __len__(self):
+        with self.lock:
+            return len(self.sessions)
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    SQLite会话存储：会话快照持久化到文件，内存中缓存已恢复的会话对象
+    每次保存时快照版本号加一；读取时版本号与缓存一致就直接使用缓存的对象，
+    否则（其他工作进程改过或本进程重启）从快照重新恢复
+    会话对象（含棋盘、AI实例、锁等）与可保存的快照之间的转换由调用方提供
+    """
+    backend = 'sqlite'
+
+    def __init__(self, path, serialize, restore, max_sessions=1000, ttl_seconds=3600):
+        """
+        :param path: SQLite数据库文件路径
+        :param serialize: 会话对象 -> 可JSON序列化的快照
+        :param restore: (快照, 本进程缓存的旧会话对象或None) -> 会话对象
+        """
+        super().__init__(max_sessions, ttl_seconds)
+        self.path = path
+        self.serialize = serialize
+        self.restore = restore
+        self.cache = OrderedDict()  # {game_id: (快照版本号, session)}
+        # WAL模式允许多个进程同时读，写入冲突时最多等待5秒
+        self.db = sqlite3.connect(path, timeout=5, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('CREATE TABLE IF NOT EXISTS sessions ('
+                        'game_id TEXT PRIMARY KEY, data TEXT NOT NULL, last_access REAL NOT NULL, '
+                        'version INTEGER NOT NULL DEFAULT 0)')
+        columns = [row[1] for row in self.db.execute('PRAGMA table_info(sessions)')]
+        if 'version' not in columns:
+            self.db.execute('ALTER TABLE sessions ADD COLUMN version INTEGER NOT NULL DEFAULT 0')
+        self.db.execute('CREATE INDEX IF NOT EXISTS sessions_last_access ON sessions (last_access)')
+        self.db.commit()
+
+    def get(self, game_id):
+        with self.lock:
+            row = self.db.execute('SELECT data, last_access, version FROM sessions WHERE game_id = ?',
+                                  (game_id,)).fetchone()
+            now = time.time()
+            if row is None or now - row[1] > self.ttl_seconds:
+                if row is not None:
+                    self.remove(game_id)
+                    self.expired += 1
+                    self.db.commit()
+                self.misses += 1
+                return None
+            self.db.execute('UPDATE sessions SET last_access = ? WHERE game_id = ?', (now, game_id))
+            self.db.commit()
+
+            data, _, version = row
+            cached = self.cache.get(game_id)
+            if cached is not None and cached[0] == version:
+                session = cached[1]
+            else:
+                # 快照比缓存新（其他进程保存过）或本进程第一次访问：从快照恢复
+                session = self.restore(json.loads(data), cached[1] if cached else None)
+                self.cache[game_id] = (version, session)
+                self.trim_cache()
+            self.cache.move_to_end(game_id)
+            self.hits += 1
+            return session
+
+    def put(self, game_id, session):
+        self.write(game_id, session)
+
+    def save(self, game_id, session):
+        self.write(game_id, session, only_existing=True)
+
+    def write(self, game_id, session, only_existing=False):
+        """
+        写入会话快照并把版本号加一
+        读版本号之前先用 BEGIN IMMEDIATE 取得数据库写锁：self.lock 只能串行化本进程，
+        多个工作进程同时保存同一会话时，版本号的读取和写入必须在同一个写事务中完成，否则会写出相同的版本号
+        :param only_existing: 为True时会话已被淘汰或删除就不写入
+        """
+        data = json.dumps(self.serialize(session))
+        with self.lock:
+            self.db.execute('BEGIN IMMEDIATE')
+            try:
+                row = self.db.execute('SELECT version FROM sessions WHERE game_id = ?',
+                                      (game_id,)).fetchone()
+                if row is None and only_existing:
+                    self.db.rollback()
+                    return
+                version = row[0] + 1 if row else 0
+                self.db.execute('INSERT OR REPLACE INTO sessions (game_id, data, last_access, version) '
+                                'VALUES (?, ?, ?, ?)', (game_id, data, time.time(), version))
+                count = self.db.execute('SELECT COUNT(*) FROM sessions').fetchone()[0]
+                if count > self.max_sessions:
+                    oldest = self.db.execute('SELECT game_id FROM sessions ORDER BY last_access LIMIT ?',
+                                             (count - self.max_sessions,)).fetchall()
+                    for (old_id,) in oldest:
+                        self.remove(old_id)
+                    self.evicted += len(oldest)
+                self.db.commit()
+            except BaseException:
+                self.db.rollback()
+                raise
+            self.cache[game_id] = (version, session)
+            self.cache.move_to_end(game_id)
+            self.trim_cache()
+
+    def delete(self, game_id):
+        with self.lock:
+            self.remove(game_id)
+            self.db.commit()
+
+    def remove(self, game_id):
+        """从数据库和缓存中删除会话（调用方负责提交）"""
+        self.db.execute('DELETE FROM sessions WHERE game_id = ?', (game_id,))
+        self.cache.pop(game_id, None)
+
+    def trim_cache(self):
+        """内存缓存的会话对象不超过容量上限"""
+        while len(self.cache) > self.max_sessions:
+            self.cache.popitem(last=False)
+
+    def reap(self):
+        with self.lock:
+            deadline = time.time() - self.ttl_seconds
+            expired = self.db.execute('SELECT game_id FROM sessions WHERE last_access < ?',
+                                      (deadline,)).fetchall()
+            for (game_id,) in expired:
+                self.remove(game_id)
+            self.db.commit()
+            self.expired += len(expired)
+            return len(expired)
+
+    def __len__(self):
+        with self.lock:
+            return self.db.execute('SELECT COUNT(*) FROM sessions').fetchone()[0]
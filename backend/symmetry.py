@@ -0,0 +1,84 @@
+"""
+棋盘对称变换
+正方形棋盘有8种对称（4种旋转 × 是否镜像）。同一局面的8个对称形态取Zobrist哈希最小的一个作为规范形态，
+开局库和局面缓存按规范哈希存储，查到的落子再变换回实际坐标。
+"""
+
+from game_logic import get_zobrist_keys
+
+# 轮到白方行棋时异或到规范哈希上的常量，区分行棋方
+SIDE_TO_MOVE_KEY = 0x6A09E667F3BCC909
+
+# 对称映射表缓存：{board_size: ([8个正向映射], [8个逆向映射])}
+_symmetry_tables = {}
+
+
+def transform(row, col, board_size, symmetry):
+    """
+    对坐标做第symmetry种对称变换
+    :param symmetry: 0-3 为旋转0/90/180/270度，4-7 为先左右镜像再旋转
+    :return: 变换后的 (row, col)
+    """
+    last = board_size - 1
+    if symmetry >= 4:
+        col = last - col
+    for _ in range(symmetry % 4):
+        row, col = col, last - row
+    return row, col
+
+
+def get_symmetries(board_size):
+    """
+    获取指定棋盘大小的对称映射表
+    :return: (forward, inverse)，forward[s][idx] 为一维索引idx经第s种变换后的索引，inverse[s] 为其逆映射
+    """
+    tables = _symmetry_tables.get(board_size)
+    if tables is None:
+        forward = []
+        inverse = []
+        for symmetry in range(8):
+            mapping = [0] * (board_size * board_size)
+            back = [0] * (board_size * board_size)
+            for row in range(board_size):
+                for col in range(board_size):
+                    r, c = transform(row, col, board_size, symmetry)
+                    mapping[row * board_size + col] = r * board_size + c
+                    back[r * board_size + c] = row * board_size + col
+            forward.append(tuple(mapping))
+            inverse.append(tuple(back))
+        tables = (forward, inverse)
+        _symmetry_tables[board_size] = tables
+    return tables
+
+
+def canonical_key(game):
+    """
+    局面的规范哈希：8种对称形态中最小的Zobrist哈希，再按行棋方异或 SIDE_TO_MOVE_KEY
+    :param game: GomokuGame实例
+    :return: (规范哈希, 取得最小值的对称变换编号)
+    """
+    keys = get_zobrist_keys(game.board_size)
+    forward = get_symmetries(game.board_size)[0]
+    stones = game.stone_list()
+    best_key = None
+    best_symmetry = 0
+    for symmetry, mapping in enumerate(forward):
+        key = 0
+        for idx, player in stones:
+            key ^= keys[player][mapping[idx]]
+        if best_key is None or key < best_key:
+            best_key = key
+            best_symmetry = symmetry
+    if game.current_player == 2:
+        best_key ^= SIDE_TO_MOVE_KEY
+    return best_key, best_symmetry
+
+
+def to_canonical(idx, board_size, symmetry):
+    """实际局面上的一维索引 -> 规范形态上的索引"""
+    return get_symmetries(board_size)[0][symmetry][idx]
+
+
+def from_canonical(idx, board_size, symmetry):
+    """规范形态上的一维索引 -> 实际局面上的索引"""
+    return get_symmetries(board_size)[1][symmetry][idx]
@@ -0,0 +1,85 @@
+"""
+AI搜索的测试
+运行：cd backend && python -m pytest -q
+"""
+
+import random
+import time
+
+from game_logic import GomokuGame
+from ai_player import GomokuAI, is_mate_score
+
+
+def play(moves, board_size=15):
+    game = GomokuGame(board_size)
+    for row, col in moves:
+        game.make_move(row, col)
+    return game
+
+
+# 没有必胜手、难度5固定深度要搜很久的局面
+QUIET = [(7, 7), (7, 8), (8, 8), (6, 6), (9, 9), (6, 7)]
+
+
+def test_seeded_search_keeps_hard_time_cap():
+    # 指定seed时按固定深度搜索，但 max_time_ms 仍是硬上限，难度5不能无限占用服务端
+    ai = GomokuAI(5, seed=1, max_time_ms=100)
+    started = time.time()
+    result = ai.search(play(QUIET))
+    assert time.time() - started < 1.0
+    assert result['timed_out']
+    assert result['move'] is not None
+
+
+def test_seeded_search_is_deterministic_without_cap():
+    moves = QUIET[:4]
+    first = GomokuAI(3, seed=7).search(play(moves))
+    second = GomokuAI(3, seed=7).search(play(moves))
+    assert first['move'] == second['move']
+    assert first['score'] == second['score']
+    assert not first['timed_out']
+
+
+def test_search_leaves_board_unchanged():
+    # 搜索在副本上落子/撤销，调用方的棋盘、哈希和候选集合保持不变
+    game = play(QUIET)
+    before = (bytes(game.cells), game.hash, set(game.candidates), len(game.move_stack))
+    for engine in ('minimax', 'pvs'):
+        GomokuAI(3, engine=engine, seed=0).search(game, use_book=False)
+        assert (bytes(game.cells), game.hash, set(game.candidates), len(game.move_stack)) == before
+
+
+def random_openings(count, stones, seed):
+    rng = random.Random(seed)
+    openings = []
+    while len(openings) < count:
+        game = GomokuGame(15)
+        moves = []
+        while len(moves) < stones and not game.game_over:
+            row, col = rng.randint(5, 9), rng.randint(5, 9)
+            if game.make_move(row, col):
+                moves.append((row, col))
+        if not game.game_over:
+            openings.append(moves)
+    return openings
+
+
+def test_pvs_agrees_with_minimax():
+    # 同一深度下PVS（零窗口验证、期望窗口）与minimax的根节点分数相同；同分时落子可以不同
+    for moves in random_openings(6, 7, seed=11):
+        minimax = GomokuAI(3, engine='minimax', seed=0).search(play(moves), use_book=False)
+        pvs = GomokuAI(3, engine='pvs', seed=0).search(play(moves), use_book=False)
+        assert minimax['source'] == pvs['source'] == 'search'
+        assert pvs['depth'] == minimax['depth']
+        assert pvs['score'] == minimax['score'], moves
+        replay = GomokuAI(3, engine='minimax', seed=0).score_move_as(play(moves), 2, pvs['move'], pvs['depth'])
+        assert replay['score'] == minimax['score']
+
+
+def test_engines_take_immediate_win():
+    # 白方 (7, 7)-(7, 10) 四连，轮到白方：两种引擎都直接成五
+    moves = [(0, 0), (7, 7), (0, 2), (7, 8), (0, 4), (7, 9), (14, 14), (7, 10), (14, 12)]
+    for engine in ('minimax', 'pvs'):
+        result = GomokuAI(3, engine=engine, seed=0).search(play(moves), use_book=False)
+        assert result['move'] in ((7, 6), (7, 11))
+        assert is_mate_score(result['score'])
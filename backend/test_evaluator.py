@@ -0,0 +1,126 @@
+"""
+局面评估的测试：增量评估器和NumPy向量化评估与逐格扫描全盘的参考实现一致
+运行：cd backend && python -m pytest -q
+"""
+
+import random
+
+import pytest
+
+from game_logic import GomokuGame
+from evaluator import IncrementalEvaluator
+from patterns import DIRECTIONS, WINDOW_SCORES
+from vector_eval import HAS_NUMPY, evaluate_components
+
+
+def reference_pattern_score(game, player):
+    """参考实现：己方每颗棋子、每个方向上经过它的2-5格窗口，只含己方棋子和空位时按 WINDOW_SCORES 计分"""
+    size = game.board_size
+    score = 0
+    for row in range(size):
+        for col in range(size):
+            if game.cells[row * size + col] != player:
+                continue
+            for dx, dy in DIRECTIONS:
+                for length in range(2, 6):
+                    for start in range(-length + 1, 1):
+                        line = []
+                        for k in range(length):
+                            r, c = row + (start + k) * dx, col + (start + k) * dy
+                            line.append(game.cells[r * size + c] if 0 <= r < size and 0 <= c < size else -1)
+                        mine = line.count(player)
+                        if mine + line.count(0) == length:
+                            score += WINDOW_SCORES.get((length, mine), 0)
+    return score
+
+
+def reference_threat_count(game, player):
+    """参考实现：每个空位试放一子，各方向连成4子以上，或连成3子且两端皆空，各计一次威胁"""
+    size = game.board_size
+    cells = game.cells
+
+    def stone(r, c):
+        return 0 <= r < size and 0 <= c < size and cells[r * size + c] == player
+
+    def empty(r, c):
+        return 0 <= r < size and 0 <= c < size and cells[r * size + c] == 0
+
+    threats = 0
+    for row in range(size):
+        for col in range(size):
+            if cells[row * size + col] != 0:
+                continue
+            for dx, dy in DIRECTIONS:
+                forward = 0
+                while stone(row + (forward + 1) * dx, col + (forward + 1) * dy):
+                    forward += 1
+                backward = 0
+                while stone(row - (backward + 1) * dx, col - (backward + 1) * dy):
+                    backward += 1
+                count = 1 + forward + backward
+                if count >= 4:
+                    threats += 1
+                elif count == 3 and empty(row + 4 * dx, col + 4 * dy) and empty(row - dx, col - dy):
+                    threats += 1
+    return threats
+
+
+def reference_components(game):
+    return (reference_pattern_score(game, 1), reference_pattern_score(game, 2),
+            reference_threat_count(game, 1), reference_threat_count(game, 2))
+
+
+def random_games(board_size, count, stones, seed):
+    """随机对局：大多落在一块区域内（保证出现连子），少数落在全盘任意位置，返回每局的落子序列"""
+    rng = random.Random(seed)
+    games = []
+    for _ in range(count):
+        game = GomokuGame(board_size)
+        radius = min(board_size // 2, 4)
+        center_row, center_col = rng.randrange(board_size), rng.randrange(board_size)
+        region = [(row, col) for row in range(board_size) for col in range(board_size)
+                  if abs(row - center_row) <= radius and abs(col - center_col) <= radius]
+        moves = []
+        while len(moves) < stones and not game.game_over:
+            cells = region if rng.random() < 0.8 else [(row, col) for row in range(board_size)
+                                                         for col in range(board_size)]
+            empty = [move for move in cells if game.is_valid_move(*move)]
+            if not empty:
+                break
+            row, col = rng.choice(empty)
+            game.make_move(row, col)
+            moves.append((row, col))
+        games.append(moves)
+    return games
+
+
+@pytest.mark.parametrize('board_size', [5, 9, 15, 19])
+def test_incremental_evaluator_matches_reference(board_size):
+    for moves in random_games(board_size, 4, 24, board_size):
+        game = GomokuGame(board_size)
+        evaluator = IncrementalEvaluator(game)
+        for row, col in moves:
+            game.push_move(row, col)
+            evaluator.update(row * board_size + col)
+            expected = reference_components(game)
+            assert (evaluator.pattern_score(1), evaluator.pattern_score(2),
+                    evaluator.threat_count(1), evaluator.threat_count(2)) == expected
+            # 重新建立的评估器与增量维护的结果相同
+            fresh = IncrementalEvaluator(game)
+            assert fresh.totals == evaluator.totals
+        # 撤销到空棋盘后分量归零
+        while game.move_stack:
+            row, col = game.pop_move()
+            evaluator.update(row * board_size + col)
+        assert evaluator.totals == [0, 0, 0, 0]
+
+
+@pytest.mark.skipif(not HAS_NUMPY, reason='未安装NumPy')
+@pytest.mark.parametrize('board_size', [5, 9, 15, 31])
+def test_vector_components_match_reference(board_size):
+    assert evaluate_components(GomokuGame(board_size)) == (0, 0, 0, 0)
+    for moves in random_games(board_size, 4, 24, board_size + 1):
+        game = GomokuGame(board_size)
+        for row, col in moves:
+            game.make_move(row, col)
+            assert evaluate_components(game) == reference_components(game)
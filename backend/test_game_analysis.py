@@ -0,0 +1,49 @@
+"""
+对局复盘分析的测试
+运行：cd backend && python -m pytest -q
+"""
+
+from game_analysis import analyze_game, BLUNDER_THRESHOLD
+
+
+def positions(moves, difficulty):
+    return [record for record in analyze_game(moves, difficulty=difficulty) if record['type'] == 'position']
+
+
+def test_equivalent_move_is_not_blunder():
+    # 黑方在 (7, 6) 或 (7, 9) 延长都形成活三，两步同样好，不论AI选哪一步都不应记为失误
+    opening = [(7, 7), (3, 3), (7, 8), (3, 11)]
+    for difficulty in (2, 3):
+        for move in ((7, 6), (7, 9)):
+            last = positions(opening + [move], difficulty)[-1]
+            assert last['move'] == list(move)
+            assert not last['blunder'], last
+            assert last['loss'] < BLUNDER_THRESHOLD
+
+
+def test_best_move_has_no_loss():
+    records = positions([(7, 7), (3, 3), (7, 8), (3, 11)], 2)
+    for record in records:
+        if record['move'] == record['best_move']:
+            assert record['loss'] == 0
+            assert record['played_score'] == record['score']
+
+
+def test_ignoring_four_is_blunder():
+    # 黑方冲四（左端被挡），白方不挡成五点 (7, 11) 而走别处
+    moves = [(7, 7), (7, 6), (7, 8), (0, 0), (7, 9), (0, 14), (7, 10), (14, 14)]
+    last = positions(moves, 2)[-1]
+    assert last['player'] == 2
+    assert last['best_move'] == [7, 11]
+    assert last['blunder']
+
+
+def test_forced_win_source_is_scored_at_same_depth():
+    # 黑方活三，(7, 6) 和 (7, 10) 都成活四；难度3由VCF找到杀棋，另一步同样取胜，不应记为失误
+    opening = [(7, 7), (0, 0), (7, 8), (0, 14), (7, 9), (14, 0)]
+    for move in ((7, 6), (7, 10)):
+        last = positions(opening + [move], 3)[-1]
+        assert last['loss'] == 0, last
+    missed = positions(opening + [(3, 3)], 3)[-1]
+    assert missed['source'] == 'vcf'
+    assert missed['blunder']
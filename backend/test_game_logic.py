@@ -0,0 +1,139 @@
+"""
+棋盘状态的测试
+运行：cd backend && python -m pytest -q
+"""
+
+import random
+
+from game_logic import GomokuGame, STONE_INDEX_MASK, game_from_bytes, game_from_base64
+
+
+def snapshot(game):
+    """落子/撤销需要恢复的全部增量状态"""
+    return (bytes(game.cells), game.hash, set(game.candidates), list(game.neighbor_counts),
+            [list(lines) for lines in game.lines[1:]], game.stones,
+            game.current_player, game.game_over, game.winner)
+
+
+def test_push_pop_restores_state():
+    rng = random.Random(1)
+    for board_size in (9, 15):
+        game = GomokuGame(board_size)
+        states = [snapshot(game)]
+        while not game.game_over:
+            row, col = rng.randrange(board_size), rng.randrange(board_size)
+            if game.push_move(row, col):
+                states.append(snapshot(game))
+        states.pop()
+        # 最后一步结束了对局（成五或下满），撤销后game_over和winner也要恢复
+        while states:
+            game.pop_move()
+            assert snapshot(game) == states.pop()
+        assert game.pop_move() is None
+
+
+def test_candidates_match_rescan():
+    # 候选集合 = 周围两格内有棋子的空位
+    rng = random.Random(2)
+    game = GomokuGame(15)
+    for _ in range(40):
+        if not game.push_move(rng.randint(4, 10), rng.randint(4, 10)) and rng.random() < 0.3:
+            game.pop_move()
+        size = game.board_size
+        expected = set()
+        for idx, piece in enumerate(game.cells):
+            if piece:
+                continue
+            row, col = divmod(idx, size)
+            if any(game.get(row + dr, col + dc) > 0 for dr in range(-2, 3) for dc in range(-2, 3)):
+                expected.add(idx)
+        assert game.candidates == expected
+
+
+def assert_same_game(game, restored):
+    assert restored.board_size == game.board_size
+    assert restored.cells == game.cells
+    assert restored.hash == game.hash
+    assert restored.move_stack == game.move_stack
+    assert restored.candidates == game.candidates
+    assert (restored.current_player, restored.game_over, restored.winner) == \
+        (game.current_player, game.game_over, game.winner)
+
+
+def test_serialization_round_trip():
+    rng = random.Random(3)
+    for board_size in (5, 15, 19):
+        game = GomokuGame(board_size)
+        while not game.game_over:
+            game.make_move(rng.randrange(board_size), rng.randrange(board_size))
+            assert_same_game(game, game_from_bytes(game.to_bytes()))
+        assert_same_game(game, game_from_base64(game.to_base64()))
+
+
+def test_serialization_keeps_setup_stones_and_undo():
+    game = GomokuGame(15)
+    rows = [[0] * 15 for _ in range(15)]
+    rows[7][7], rows[8][8] = 1, 2
+    game.board = rows
+    game.make_move(6, 6)
+    restored = game_from_bytes(game.to_bytes())
+    assert_same_game(game, restored)
+    # 摆放的棋子不在落子记录里，只能撤销之后的落子
+    assert restored.pop_move() == (6, 6)
+    assert restored.pop_move() is None
+    assert restored.get(7, 7) == 1 and restored.get(8, 8) == 2
+
+
+def test_serialization_largest_board():
+    # 127x127 的最大索引 16128 仍在 14 位以内，不能和黑白/摆放标志位混在一起
+    game = GomokuGame(127)
+    for row, col in ((126, 126), (0, 0), (126, 0), (0, 126), (63, 63)):
+        game.make_move(row, col)
+    assert (126 * 127 + 126) <= STONE_INDEX_MASK
+    restored = game_from_bytes(game.to_bytes())
+    assert_same_game(game, restored)
+    assert restored.get(126, 126) == 1 and restored.get(0, 0) == 2
+
+
+def brute_force_five(game, row, col, player):
+    """参考实现：player落在 (row, col) 后逐格数四个方向的连子"""
+    for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1)):
+        count = 1
+        for sign in (1, -1):
+            r, c = row + sign * dr, col + sign * dc
+            while game.get(r, c) == player:
+                count += 1
+                r, c = r + sign * dr, c + sign * dc
+        if count >= 5:
+            return True
+    return False
+
+
+def test_win_check_matches_brute_force():
+    rng = random.Random(4)
+    for board_size in (5, 9, 15, 19):
+        for _ in range(20):
+            game = GomokuGame(board_size)
+            for _ in range(rng.randint(board_size, board_size * board_size // 2)):
+                row, col = rng.randrange(board_size), rng.randrange(board_size)
+                if game.cells[row * board_size + col] == 0:
+                    game.place_stone(row * board_size + col, rng.choice((1, 2)))
+            for row in range(board_size):
+                for col in range(board_size):
+                    if game.get(row, col) != 0:
+                        continue
+                    for player in (1, 2):
+                        assert game.is_winning_move(row, col, player) == \
+                            brute_force_five(game, row, col, player), (board_size, row, col, player)
+
+
+def test_last_move_on_full_board_is_draw():
+    # 5x5棋盘：逐行交替的两种排列填满也不会连成五，最后一手下满时判平局
+    rows = [[1, 1, 2, 2, 1], [2, 2, 1, 1, 2], [1, 1, 2, 2, 1], [2, 2, 1, 1, 2], [1, 1, 2, 2, 0]]
+    game = GomokuGame(5)
+    game.board = rows
+    assert not game.is_board_full()
+    assert game.make_move(4, 4, 2)
+    assert game.game_over and game.winner == 0
+    assert game.pop_move() == (4, 4)
+    assert not game.game_over and game.stones == 24
@@ -0,0 +1,65 @@
+"""
+对称规范化与开局库的测试
+运行：cd backend && python -m pytest -q
+"""
+
+from game_logic import GomokuGame
+from symmetry import transform, canonical_key, to_canonical, from_canonical
+from opening_book import OpeningBook, write_book, build_book, first_moves
+
+MOVES = [(7, 7), (6, 8), (8, 9), (5, 5)]
+
+
+def play(moves, board_size=15):
+    game = GomokuGame(board_size)
+    for row, col in moves:
+        game.make_move(row, col)
+    return game
+
+
+def symmetric_games(moves, board_size=15):
+    """同一局面的8种对称形态：[(对称变换编号, 局面)]"""
+    return [(symmetry, play([transform(row, col, board_size, symmetry) for row, col in moves], board_size))
+            for symmetry in range(8)]
+
+
+def test_symmetric_positions_share_canonical_key():
+    keys = set(canonical_key(game)[0] for _, game in symmetric_games(MOVES))
+    assert len(keys) == 1
+    # 行棋方不同是不同的局面
+    assert canonical_key(play(MOVES[:3]))[0] not in keys
+
+
+def test_canonical_index_round_trip():
+    for board_size in (9, 15):
+        for symmetry in range(8):
+            for idx in range(board_size * board_size):
+                assert from_canonical(to_canonical(idx, board_size, symmetry), board_size, symmetry) == idx
+
+
+def test_book_hits_every_symmetric_form(tmp_path):
+    game = play(MOVES)
+    key, symmetry = canonical_key(game)
+    path = str(tmp_path / 'book.bin')
+    write_book(path, 15, 8, {key: (to_canonical(game.index(6, 6), 15, symmetry), 42)})
+    book = OpeningBook(path)
+    for symmetry, mirrored in symmetric_games(MOVES):
+        assert book.probe(mirrored) == (transform(6, 6, 15, symmetry), 42)
+    assert book.probe(play(MOVES[:3])) is None
+    assert book.probe(play(MOVES, board_size=17)) is None
+    assert book.stats()['hits'] == 8
+    book.close()
+
+
+def test_built_book_covers_first_moves(tmp_path):
+    entries = build_book(board_size=9, max_plies=2, difficulty=1)
+    path = str(tmp_path / 'book.bin')
+    write_book(path, 9, 2, entries)
+    book = OpeningBook(path)
+    # 黑方第一手的25个点对称去重后只搜索了几个局面，但每个点都能查到白方应手
+    assert len(book) < len(first_moves(9))
+    for row, col in first_moves(9):
+        game = play([(row, col)], board_size=9)
+        move, _ = book.probe(game)
+        assert game.is_valid_move(*move)
+    book.close()
@@ -0,0 +1,61 @@
+"""
+对称规范化局面缓存的测试
+运行：cd backend && python -m pytest -q
+"""
+
+from game_logic import GomokuGame
+from symmetry import transform
+from ai_player import GomokuAI
+from position_cache import PositionCache
+
+MOVES = [(7, 7), (6, 8), (8, 9), (5, 5), (6, 6)]
+
+
+def play(moves, board_size=15):
+    game = GomokuGame(board_size)
+    for row, col in moves:
+        game.make_move(row, col)
+    return game
+
+
+def mirrored(moves, symmetry, board_size=15):
+    return play([transform(row, col, board_size, symmetry) for row, col in moves], board_size)
+
+
+def test_symmetric_position_hits_cache():
+    cache = PositionCache()
+    first = GomokuAI(3, seed=0, position_cache=cache)
+    result = first.search(play(MOVES), use_book=False)
+    assert result['source'] == 'search'
+    for symmetry in range(8):
+        # 另一局的AI走到对称的局面：直接取出结果，落子和主要变例变换回实际坐标
+        other = GomokuAI(3, seed=0, position_cache=cache)
+        hit = other.search(mirrored(MOVES, symmetry), use_book=False)
+        assert hit['source'] == 'cache'
+        assert hit['move'] == transform(result['move'][0], result['move'][1], 15, symmetry)
+        assert hit['pv'] == [transform(row, col, 15, symmetry) for row, col in result['pv']]
+        assert hit['score'] == result['score']
+    assert cache.stats()['hits'] == 8
+    assert len(cache) == 1
+
+
+def test_cache_separates_difficulty_and_engine():
+    cache = PositionCache()
+    GomokuAI(3, seed=0, position_cache=cache).search(play(MOVES), use_book=False)
+    assert GomokuAI(2, seed=0, position_cache=cache).search(play(MOVES), use_book=False)['source'] != 'cache'
+    assert GomokuAI(3, engine='pvs', seed=0, position_cache=cache).search(
+        play(MOVES), use_book=False)['source'] != 'cache'
+    assert len(cache) == 3
+
+
+def test_cache_evicts_least_recently_used():
+    cache = PositionCache(max_entries=2)
+    ai = GomokuAI(3, seed=0)
+    games = [play(MOVES[:3]), play(MOVES[:4]), play(MOVES)]
+    for game in games[:2]:
+        cache.store(game, ai, {'move': (0, 0), 'score': 1, 'depth': 1, 'pv': [(0, 0)], 'source': 'search'})
+    assert cache.probe(games[0], ai) is not None
+    cache.store(games[2], ai, {'move': (0, 0), 'score': 1, 'depth': 1, 'pv': [], 'source': 'search'})
+    assert cache.probe(games[1], ai) is None
+    assert cache.probe(games[0], ai) is not None
+    assert cache.stats()['evicted'] == 1
@@ -0,0 +1,123 @@
+"""
+会话存储的测试
+运行：cd backend && python -m pytest -q
+"""
+
+import threading
+import time
+
+import pytest
+
+from session_store import SessionStore, MemorySessionStore, SQLiteSessionStore
+
+
+def serialize(session):
+    return {'value': session['value']}
+
+
+def restore(data, previous):
+    return {'value': data['value'], 'previous': previous}
+
+
+def open_store(path, **kwargs):
+    return SQLiteSessionStore(str(path), serialize, restore, **kwargs)
+
+
+def version(store, game_id):
+    return store.db.execute('SELECT version FROM sessions WHERE game_id = ?', (game_id,)).fetchone()[0]
+
+
+def test_sqlite_restores_when_other_worker_saved(tmp_path):
+    # 两个存储实例共用一个数据库文件，相当于两个工作进程
+    path = tmp_path / 'sessions.db'
+    first, second = open_store(path), open_store(path)
+    session = {'value': 1}
+    first.put('g', session)
+    assert first.get('g') is session  # 版本号与本进程缓存一致，直接用缓存对象
+    seen = second.get('g')
+    assert seen['value'] == 1 and seen['previous'] is None
+    assert second.get('g') is seen
+
+    session['value'] = 2
+    first.save('g', session)
+    updated = second.get('g')
+    # 另一个进程保存过：版本号变了，从快照重新恢复，旧对象交给restore沿用
+    assert updated['value'] == 2
+    assert updated['previous'] is seen
+
+
+def test_sqlite_concurrent_saves_get_distinct_versions(tmp_path):
+    path = tmp_path / 'sessions.db'
+    stores = [open_store(path) for _ in range(3)]
+    stores[0].put('g', {'value': 0})
+    saves = 50
+
+    def run(store):
+        for i in range(saves):
+            store.save('g', {'value': i})
+
+    threads = [threading.Thread(target=run, args=(store,)) for store in stores]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # 每次保存都在写事务内读版本号再加一，不会有两个保存写出同一个版本号
+    assert version(stores[0], 'g') == len(stores) * saves
+
+
+def test_sqlite_save_does_not_resurrect_deleted_session(tmp_path):
+    path = tmp_path / 'sessions.db'
+    first, second = open_store(path), open_store(path)
+    first.put('g', {'value': 1})
+    second.delete('g')
+    first.save('g', {'value': 2})
+    assert 'g' not in second
+    assert second.get('g') is None
+
+
+def test_memory_store_evicts_least_recently_used():
+    store = MemorySessionStore(max_sessions=2)
+    store.put('a', {'value': 1})
+    store.put('b', {'value': 2})
+    store.get('a')
+    store.put('c', {'value': 3})
+    assert 'b' not in store and 'a' in store and 'c' in store
+    assert store.stats()['evicted'] == 1
+
+
+def test_memory_store_expires_idle_sessions():
+    store = MemorySessionStore(ttl_seconds=60)
+    store.put('a', {'value': 1})
+    store.put('b', {'value': 2})
+    store.sessions['a'] = (store.sessions['a'][0], time.time() - 120)
+    assert store.get('a') is None
+    assert store.get('b') == {'value': 2}
+    store.sessions['b'] = (store.sessions['b'][0], time.time() - 120)
+    assert store.reap() == 1
+    assert len(store) == 0
+
+
+def test_sqlite_evicts_least_recently_used(tmp_path):
+    store = open_store(tmp_path / 'sessions.db', max_sessions=2)
+    store.put('a', {'value': 1})
+    store.put('b', {'value': 2})
+    store.db.execute('UPDATE sessions SET last_access = last_access - 10 WHERE game_id = ?', ('b',))
+    store.db.commit()
+    store.put('c', {'value': 3})
+    assert 'b' not in store
+    assert len(store) == 2
+    assert store.stats()['evicted'] == 1
+
+
+def test_sqlite_expires_idle_sessions(tmp_path):
+    store = open_store(tmp_path / 'sessions.db', ttl_seconds=60)
+    store.put('a', {'value': 1})
+    store.db.execute('UPDATE sessions SET last_access = last_access - 120')
+    store.db.commit()
+    assert store.get('a') is None
+    assert len(store) == 0
+
+
+def test_backend_must_implement_store_methods():
+    with pytest.raises(TypeError):
+        SessionStore()
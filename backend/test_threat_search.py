@@ -0,0 +1,124 @@
+"""
+威胁空间搜索（VCF/VCT）的测试：逐格扫描验证找到的取胜序列确实防不住
+运行：cd backend && python -m pytest -q
+"""
+
+import random
+import threading
+
+from game_logic import GomokuGame
+from patterns import DIRECTIONS
+from threat_search import ThreatSolver
+
+
+def setup(black, white, board_size=15):
+    """摆出局面，轮到黑方"""
+    rows = [[0] * board_size for _ in range(board_size)]
+    for row, col in black:
+        rows[row][col] = 1
+    for row, col in white:
+        rows[row][col] = 2
+    game = GomokuGame(board_size)
+    game.board = rows
+    return game
+
+
+def five_points(game, player):
+    """参考实现：逐格尝试，player落下后某个方向连成至少五子的空位"""
+    points = []
+    for row in range(game.board_size):
+        for col in range(game.board_size):
+            if game.get(row, col) != 0:
+                continue
+            for dx, dy in DIRECTIONS:
+                count = 1
+                for sign in (1, -1):
+                    r, c = row + sign * dx, col + sign * dy
+                    while game.get(r, c) == player:
+                        count += 1
+                        r, c = r + sign * dx, c + sign * dy
+                if count >= 5:
+                    points.append((row, col))
+                    break
+    return points
+
+
+def assert_unstoppable(game, attacker, line, vcf):
+    """
+    沿取胜序列走一遍：VCF的每步进攻都必须成四（防守方只能堵唯一的成五点），
+    序列结束时进攻方已成五，或有两个以上成五点而防守方自己无法先成五
+    """
+    board = game.copy()
+    defender = 3 - attacker
+    for i in range(0, len(line), 2):
+        board.make_move(line[i][0], line[i][1], attacker)
+        if board.winner == attacker:
+            assert i == len(line) - 1
+            return
+        points = five_points(board, attacker)
+        assert not five_points(board, defender)
+        if i == len(line) - 1:
+            assert len(points) >= 2 or vcf is False
+            return
+        if vcf:
+            assert points == [line[i + 1]]
+        board.make_move(line[i + 1][0], line[i + 1][1], defender)
+
+
+def test_double_four_is_vcf():
+    # (7, 9) 同时成横向和纵向两个冲四
+    game = setup([(7, 6), (7, 7), (7, 8), (4, 9), (5, 9), (6, 9)], [(7, 5), (3, 9)])
+    solver = ThreatSolver()
+    line = solver.find_vcf(game, 1)
+    assert line == [(7, 9)]
+    assert solver.win_plies(game, 1, line) == 3
+    assert_unstoppable(game, 1, line, vcf=True)
+
+
+def test_double_three_is_vct_not_vcf():
+    # 两个活二交叉：没有连续冲四，但可以靠活三连续威胁取胜
+    game = setup([(7, 6), (7, 7), (5, 8), (6, 8)], [])
+    solver = ThreatSolver()
+    assert solver.find_vcf(game, 1) is None
+    line = solver.find_vct(game, 1)
+    assert line is not None
+    assert solver.win_plies(game, 1, line) >= len(line)
+    assert_unstoppable(game, 1, line, vcf=False)
+
+
+def test_random_vcf_lines_are_sound():
+    rng = random.Random(0)
+    solver = ThreatSolver()
+    found = 0
+    for _ in range(400):
+        game = GomokuGame(15)
+        for _ in range(rng.randint(10, 18)):
+            game.make_move(rng.randint(4, 10), rng.randint(4, 10))
+            if game.game_over:
+                break
+        attacker = game.current_player
+        if game.game_over or five_points(game, 1) or five_points(game, 2):
+            continue
+        line = solver.find_vcf(game, attacker)
+        if line:
+            assert_unstoppable(game, attacker, line, vcf=True)
+            found += 1
+    assert found >= 20, found
+
+
+def test_quiet_position_has_no_forced_win():
+    game = setup([(7, 7)], [(8, 8)])
+    solver = ThreatSolver()
+    assert solver.find_vcf(game, 1) is None
+    assert solver.find_vct(game, 1) is None
+
+
+def test_budget_and_stop_event_give_up():
+    game = setup([(7, 6), (7, 7), (5, 8), (6, 8)], [])
+    assert ThreatSolver(node_limit=1).find_vct(game, 1) is None
+    solver = ThreatSolver()
+    solver.stop_event = threading.Event()
+    solver.stop_event.set()
+    assert solver.find_vct(game, 1) is None
+    solver.stop_event = None
+    assert solver.find_vct(game, 1) is not None
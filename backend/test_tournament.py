@@ -0,0 +1,23 @@
+"""
+AI自对弈比赛的测试
+运行：cd backend && python -m pytest -q
+"""
+
+from tournament import latency_summary
+
+
+def test_latency_percentiles_are_exact():
+    # 100个样本 1..100 ms：最近秩法的 p50/p95/p99 就是第50/95/99个样本，不受直方图桶上界影响
+    latency = latency_summary([float(ms) for ms in range(100, 0, -1)])
+    assert latency['count'] == 100
+    assert latency['p50_ms'] == 50.0
+    assert latency['p95_ms'] == 95.0
+    assert latency['p99_ms'] == 99.0
+    assert latency['max_ms'] == 100.0
+    assert latency['mean_ms'] == 50.5
+
+
+def test_latency_summary_without_samples():
+    latency = latency_summary([])
+    assert latency['count'] == 0
+    assert latency['p95_ms'] == 0.0
@@ -0,0 +1,95 @@
+"""
+Zobrist哈希和置换表的测试
+运行：cd backend && python -m pytest -q
+"""
+
+import random
+
+import pytest
+
+from game_logic import GomokuGame
+from ai_player import GomokuAI
+from transposition import TranspositionTable, EXACT, LOWER, UPPER
+
+
+def play(moves, board_size=15):
+    game = GomokuGame(board_size)
+    for row, col in moves:
+        game.make_move(row, col)
+    return game
+
+
+def random_openings(count, stones, seed):
+    """中心附近随机落子的开局（没有连成五）"""
+    rng = random.Random(seed)
+    openings = []
+    while len(openings) < count:
+        game = GomokuGame(15)
+        moves = []
+        while len(moves) < stones and not game.game_over:
+            row, col = rng.randint(5, 9), rng.randint(5, 9)
+            if game.make_move(row, col):
+                moves.append((row, col))
+        if not game.game_over:
+            openings.append(moves)
+    return openings
+
+
+def test_hash_does_not_depend_on_move_order():
+    first = play([(7, 7), (8, 8), (7, 8), (8, 7)])
+    second = play([(7, 8), (8, 7), (7, 7), (8, 8)])
+    assert first.hash == second.hash
+    # 同样的棋子、不同的归属是不同的局面
+    swapped = play([(8, 8), (7, 7), (8, 7), (7, 8)])
+    assert swapped.hash != first.hash
+
+
+def test_hash_matches_board_reload():
+    game = play([(7, 7), (8, 8), (6, 6), (9, 9), (5, 5)])
+    reloaded = GomokuGame(15)
+    reloaded.board = game.board
+    assert reloaded.hash == game.hash
+    assert game.copy().hash == game.hash
+
+
+def test_table_keeps_bound_flags():
+    table = TranspositionTable(size_bits=4)
+    table.store(5, 3, LOWER, 120, (7, 7))
+    table.store(6, 2, UPPER, -40, (7, 8))
+    assert table.probe(5) == (3, LOWER, 120, (7, 7))
+    assert table.probe(6) == (2, UPPER, -40, (7, 8))
+    # 同一槽位的另一局面（键不同）不能命中
+    assert table.probe(5 + 16) is None
+
+
+def test_table_replacement_prefers_depth_within_generation():
+    table = TranspositionTable(size_bits=4)
+    table.store(1, 4, EXACT, 10, (7, 7))
+    table.store(17, 2, EXACT, 20, (8, 8))  # 同代、同槽位、更浅：不替换
+    assert table.probe(1) == (4, EXACT, 10, (7, 7))
+    assert table.probe(17) is None
+    table.new_search()
+    table.store(17, 2, EXACT, 20, (8, 8))  # 旧一代的条目直接替换
+    assert table.probe(17) == (2, EXACT, 20, (8, 8))
+
+
+@pytest.mark.parametrize('difficulty,engine', [(3, 'minimax'), (3, 'pvs'), (4, 'pvs')])
+def test_table_does_not_change_search_score(difficulty, engine):
+    # 置换表只能省去重复搜索，不能改变固定深度的搜索结果：上界/下界只用来收窄窗口
+    for moves in random_openings(4, 7, seed=3):
+        with_table = GomokuAI(difficulty, engine=engine, seed=0).search(play(moves), use_book=False)
+        ai = GomokuAI(difficulty, engine=engine, seed=0)
+        ai.tt.probe = lambda key: None
+        without_table = ai.search(play(moves), use_book=False)
+        assert with_table['source'] == 'search'
+        assert with_table['score'] == without_table['score'], moves
+
+
+def test_warm_table_gives_same_score():
+    moves = random_openings(1, 7, seed=5)[0]
+    ai = GomokuAI(3, engine='minimax', seed=0)
+    first = ai.search(play(moves), use_book=False)
+    second = ai.search(play(moves), use_book=False)
+    assert second['score'] == first['score']
+    assert second['move'] == first['move']
+    assert second['nodes'] < first['nodes']
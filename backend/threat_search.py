@@ -0,0 +1,219 @@
+"""
+威胁空间搜索（VCF / VCT）
+只展开进攻方的冲四、活四（VCF：连续冲四取胜）以及活三（VCT：连续威胁取胜），
+防守方只考虑必须应对的防点，因此能在很少的节点内找到普通搜索够不到的长杀。
+"""
+
+import time
+
+from patterns import (DIRECTIONS, PATTERN_TABLE, WINDOW_RADIUS, NONE, FIVE, OPEN_FOUR,
+                      FOUR, OPEN_THREE, window_code, threat_map)
+
+
+class BudgetExceeded(Exception):
+    """威胁搜索节点数或时间超过上限，或被要求中止"""
+    pass
+
+
+class ThreatSolver:
+    def __init__(self, node_limit=20000, cache_size=1 << 16):
+        """
+        初始化威胁空间搜索器
+        :param node_limit: 单次求解允许展开的最大节点数，超过后放弃（结果未知）
+        :param cache_size: 结果缓存的最大条目数
+        """
+        self.node_limit = node_limit
+        self.cache_size = cache_size
+        # 缓存：(局面哈希, 进攻方, 是否允许活三) -> (搜索深度, 取胜序列或None)
+        self.cache = {}
+        self.nodes = 0
+        self.deadline = None
+        self.stop_event = None  # threading.Event，被设置时中止求解（后台预读被打断时）
+
+    def find_vcf(self, game, attacker, max_depth=10, time_limit_ms=None):
+        """
+        寻找连续冲四取胜（VCF）
+        :param game: GomokuGame实例（不会被修改）
+        :param attacker: 进攻方
+        :param max_depth: 进攻方最多落子次数
+        :param time_limit_ms: 求解时间上限（毫秒），None表示只受节点数限制
+        :return: 取胜序列 [(row, col), ...]（进攻方与防守方交替），找不到返回None
+        """
+        return self.solve(game, attacker, max_depth, False, time_limit_ms)
+
+    def find_vct(self, game, attacker, max_depth=4, time_limit_ms=None):
+        """
+        寻找连续威胁取胜（VCT）：进攻方每步走冲四、活四或活三
+        :param max_depth: 进攻方最多落子次数
+        :param time_limit_ms: 求解时间上限（毫秒），None表示只受节点数限制
+        :return: 取胜序列，找不到返回None
+        """
+        return self.solve(game, attacker, max_depth, True, time_limit_ms)
+
+    def win_plies(self, game, attacker, line):
+        """
+        沿取胜序列走到成五为止的总层数（从当前局面的进攻方落子算起）
+        序列以成五结束时即为序列长度；以活四、双冲四等防不住的威胁结束时，
+        还需防守方应一手、进攻方再成五；以无防点的活三结束时还需再走4层
+        :param line: find_vcf / find_vct 返回的取胜序列
+        """
+        board = game.copy()
+        for i, (row, col) in enumerate(line):
+            board.make_move(row, col, attacker if i % 2 == 0 else 3 - attacker)
+        if board.winner == attacker:
+            return len(line)
+        fives = [idx for idx, cls in threat_map(board)[attacker].items() if cls == FIVE]
+        return len(line) + (2 if fives else 4)
+
+    def solve(self, game, attacker, max_depth, allow_three, time_limit_ms=None):
+        """在棋盘副本上求解，节点数或时间超限时返回None"""
+        if game.game_over:
+            return None
+        self.nodes = 0
+        self.deadline = None
+        if time_limit_ms is not None:
+            self.deadline = time.perf_counter() + time_limit_ms / 1000.0
+        if len(self.cache) >= self.cache_size:
+            self.cache.clear()
+        board = game.copy()
+        try:
+            return self.attack(board, attacker, max_depth, allow_three)
+        except BudgetExceeded:
+            return None
+        finally:
+            self.deadline = None
+
+    def attack(self, game, attacker, depth, allow_three):
+        """
+        进攻方节点：任一威胁落子能在所有防守下取胜即成功
+        :return: 从当前局面开始的取胜序列，失败返回None
+        """
+        self.nodes += 1
+        if self.nodes > self.node_limit:
+            raise BudgetExceeded()
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise BudgetExceeded()
+        if self.stop_event is not None and self.stop_event.is_set():
+            raise BudgetExceeded()
+
+        size = game.board_size
+        classes = threat_map(game)
+        mine = classes[attacker]
+        theirs = classes[3 - attacker]
+
+        # 能直接成五
+        for idx, cls in mine.items():
+            if cls == FIVE:
+                return [divmod(idx, size)]
+        if depth <= 0:
+            return None
+
+        key = (game.hash, attacker, allow_three)
+        cached = self.cache.get(key)
+        if cached is not None:
+            cached_depth, line = cached
+            if line is not None and cached_depth <= depth:
+                return line
+            if line is None and cached_depth >= depth:
+                return None
+
+        # 对方已有成五点：两个以上挡不住；只有一个时只能在该点落子，且这步本身必须是威胁
+        defender_fives = [idx for idx, cls in theirs.items() if cls == FIVE]
+        if len(defender_fives) >= 2:
+            return None
+
+        threshold = OPEN_THREE if allow_three else FOUR
+        if defender_fives:
+            moves = [idx for idx in defender_fives if mine.get(idx, NONE) >= threshold]
+        else:
+            moves = [idx for idx, cls in mine.items() if cls >= threshold]
+        # 先走威胁更大的落子（同级按索引，保证结果稳定）
+        moves.sort(key=lambda idx: (-mine[idx], idx))
+
+        result = None
+        for idx in moves:
+            row, col = divmod(idx, size)
+            game.push_move(row, col, attacker)
+            line = self.defend(game, attacker, row, col, mine[idx], depth, allow_three)
+            game.pop_move()
+            if line is not None:
+                result = [(row, col)] + line
+                break
+
+        self.cache[key] = (depth, result)
+        return result
+
+    def defend(self, game, attacker, row, col, cls, depth, allow_three):
+        """
+        防守方节点：进攻方刚在 (row, col) 落下类别为cls的威胁，必须所有防点都失败才算成功
+        :return: 后续取胜序列（以防守方的主要应对开头），失败返回None
+        """
+        if cls >= OPEN_FOUR:
+            return []
+
+        size = game.board_size
+        defender = 3 - attacker
+        classes = threat_map(game)
+        attacker_fives = sorted(idx for idx, c in classes[attacker].items() if c == FIVE)
+
+        if len(attacker_fives) >= 2:
+            return []  # 两个成五点，防不住
+        if attacker_fives:
+            defenses = attacker_fives  # 冲四只能挡成五点
+        else:
+            defenses = self.three_defenses(game, attacker, row, col, classes)
+
+        principal = None
+        for idx in defenses:
+            d_row, d_col = divmod(idx, size)
+            game.push_move(d_row, d_col, defender)
+            if game.game_over:
+                game.pop_move()
+                return None  # 防守方借机成五
+            line = self.attack(game, attacker, depth - 1, allow_three)
+            game.pop_move()
+            if line is None:
+                return None
+            if principal is None:
+                principal = [(d_row, d_col)] + line
+        return principal if principal is not None else []
+
+    def three_defenses(self, game, attacker, row, col, classes):
+        """
+        活三的全部防点：
+        1. 该活三所在直线上，落子后使进攻方不再有活四点的空位
+        2. 防守方自己能冲四的位置（以攻代守）
+        """
+        defender = 3 - attacker
+        cells = game.cells
+        size = game.board_size
+        defenses = set()
+
+        for dx, dy in DIRECTIONS:
+            code = window_code(cells, size, row, col, dx, dy, attacker)
+            if PATTERN_TABLE[code][0] != OPEN_THREE:
+                continue
+            line = []
+            for k in range(-WINDOW_RADIUS, WINDOW_RADIUS + 1):
+                r, c = row + k * dx, col + k * dy
+                if 0 <= r < size and 0 <= c < size and cells[r * size + c] == 0:
+                    line.append((r, c))
+            # 在线上试放防守子，进攻方在这条线上再也走不出活四即为有效防点
+            for r, c in line:
+                cells[r * size + c] = defender
+                blocked = True
+                for r2, c2 in line:
+                    if cells[r2 * size + c2] != 0:
+                        continue
+                    code = window_code(cells, size, r2, c2, dx, dy, attacker)
+                    if PATTERN_TABLE[code][0] >= OPEN_FOUR:
+                        blocked = False
+                        break
+                cells[r * size + c] = 0
+                if blocked:
+                    defenses.add(r * size + c)
+
+        for idx, cls in classes[defender].items():
+            if cls >= FOUR:
+                defenses.add(idx)
+        return sorted(defenses)
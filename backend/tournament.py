@@ -0,0 +1,329 @@
+"""
+AI自对弈比赛
+让不同配置的 GomokuAI（难度、搜索深度、引擎、评估后端、思考时间）两两对弈，
+在进程池中并行下多局，报告各组对局的得分率及置信区间、每步用时分布，
+用于确认更快的配置没有变弱后再上线：
+
+    python tournament.py --player difficulty=3 --player difficulty=3,depth=5 --games 20
+    python tournament.py --player name=fast,difficulty=4,time_ms=300 \\
+                         --player name=slow,difficulty=4,time_ms=1500 --workers 4
+
+每组对局使用随机开局（中心附近随机落下 --opening-plies 颗棋子），每个开局双方各执黑一次。
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from game_logic import GomokuGame
+
+# 选手配置可用的键：名称、难度、搜索深度（覆盖难度对应的深度）、引擎、是否用NumPy评估、每步思考时间
+PLAYER_KEYS = ('name', 'difficulty', 'depth', 'engine', 'numpy', 'time_ms')
+
+# 随机开局的落子范围：距中心不超过该格数
+OPENING_RADIUS = 3
+
+# 95%置信区间对应的z值
+CONFIDENCE_Z = 1.96
+
+
+def parse_player(spec):
+    """
+    解析选手配置
+    :param spec: 逗号分隔的 key=value，如 'name=fast,difficulty=4,depth=5,engine=pvs,numpy=0,time_ms=500'
+    :return: 配置字典（总是包含name和difficulty）
+    """
+    config = {'difficulty': 3}
+    for item in spec.split(','):
+        if not item.strip():
+            continue
+        key, sep, value = item.partition('=')
+        key = key.strip()
+        value = value.strip()
+        if not sep or key not in PLAYER_KEYS:
+            raise ValueError('无效的选手配置: %s' % item)
+        if key in ('difficulty', 'depth'):
+            config[key] = int(value)
+        elif key == 'time_ms':
+            config[key] = float(value)
+        elif key == 'numpy':
+            config[key] = value.lower() in ('1', 'true', 'yes')
+        else:
+            config[key] = value
+    if 'name' not in config:
+        config['name'] = ','.join('%s=%s' % (key, config[key]) for key in PLAYER_KEYS if key in config)
+    return config
+
+
+def create_player(config, player, seed):
+    """
+    按配置创建执player方的AI
+    指定了思考时间时不设种子（固定种子会忽略思考时间、按固定深度搜索）
+    """
+    # 在函数内导入：工作进程由spawn启动，只在真正下棋时才需要加载搜索模块
+    from ai_player import GomokuAI
+
+    time_ms = config.get('time_ms')
+    ai = GomokuAI(config['difficulty'], time_limit_ms=time_ms, engine=config.get('engine'),
+                  use_numpy=config.get('numpy'), seed=None if time_ms is not None else seed)
+    if config.get('depth') is not None:
+        ai.max_depth = config['depth']
+    ai.ai_player, ai.human_player = player, 3 - player
+    return ai
+
+
+def random_opening(board_size, plies, rng):
+    """
+    随机开局：在中心附近随机落下plies颗棋子（黑白交替）
+    :return: [(row, col), ...]
+    """
+    center = board_size // 2
+    cells = [(center + dr, center + dc)
+             for dr in range(-OPENING_RADIUS, OPENING_RADIUS + 1)
+             for dc in range(-OPENING_RADIUS, OPENING_RADIUS + 1)
+             if 0 <= center + dr < board_size and 0 <= center + dc < board_size]
+    return rng.sample(cells, min(plies, len(cells)))
+
+
+def play_game(task):
+    """
+    下一局（在工作进程中执行）
+    :param task: (对局编号, 黑方配置, 白方配置, 开局落子, 棋盘大小, 种子)
+    :return: {'index', 'black', 'white', 'winner': 胜方名称（平局为None）, 'plies',
+              'moves': {选手名称: [{'time_ms', 'depth', 'nodes', 'source'}, ...]}}
+    """
+    index, black, white, opening, board_size, seed = task
+    game = GomokuGame(board_size)
+    for row, col in opening:
+        game.make_move(row, col)
+    players = {1: (black, create_player(black, 1, seed)), 2: (white, create_player(white, 2, seed))}
+    moves = {black['name']: [], white['name']: []}
+    while not game.game_over:
+        config, ai = players[game.current_player]
+        result = ai.search(game)
+        if result['move'] is None or not game.make_move(*result['move']):
+            # 没有合法落子（理论上不会发生），判对方胜
+            game.game_over = True
+            game.winner = 3 - game.current_player
+            break
+        moves[config['name']].append({'time_ms': round(result['time_ms'], 2), 'depth': result['depth'],
+                                      'nodes': result['nodes'], 'source': result['source']})
+    return {
+        'index': index,
+        'black': black['name'],
+        'white': white['name'],
+        'opening': [list(move) for move in opening],
+        'winner': players[game.winner][0]['name'] if game.winner else None,
+        'plies': len(game.move_stack),
+        'moves': moves
+    }
+
+
+def schedule(players, rounds, board_size, opening_plies, seed):
+    """
+    生成对局任务：每两个选手之间下rounds个随机开局，每个开局双方各执黑一次
+    :return: 任务列表（见 play_game）
+    """
+    rng = random.Random(seed)
+    tasks = []
+    for i in range(len(players)):
+        for j in range(i + 1, len(players)):
+            for _ in range(rounds):
+                opening = random_opening(board_size, opening_plies, rng)
+                game_seed = rng.randrange(2 ** 31)
+                for black, white in ((players[i], players[j]), (players[j], players[i])):
+                    tasks.append((len(tasks), black, white, opening, board_size, game_seed))
+    return tasks
+
+
+def wilson_interval(score, games, z=CONFIDENCE_Z):
+    """
+    得分率的Wilson置信区间（平局按半分计入得分）
+    :return: (下限, 上限)
+    """
+    if not games:
+        return 0.0, 1.0
+    rate = score / games
+    denominator = 1 + z * z / games
+    center = (rate + z * z / (2 * games)) / denominator
+    margin = z * math.sqrt(rate * (1 - rate) / games + z * z / (4 * games * games)) / denominator
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+
+def elo_difference(rate):
+    """得分率对应的等级分差，得分率为0或1时返回None"""
+    if rate <= 0 or rate >= 1:
+        return None
+    return round(-400 * math.log10(1 / rate - 1))
+
+
+def percentile(samples, fraction):
+    """
+    由全部样本计算精确分位数（最近秩法）
+    :param samples: 已排序的样本列表
+    :param fraction: 0-1之间的比例，如0.95
+    """
+    if not samples:
+        return 0.0
+    rank = max(1, int(math.ceil(fraction * len(samples))))
+    return round(samples[rank - 1], 2)
+
+
+def latency_summary(times):
+    """
+    每步用时分布：比赛保留了全部样本，分位数是精确值（/api/stats 的直方图只能按桶估计）
+    :return: {'count', 'mean_ms', 'max_ms', 'p50_ms', 'p95_ms', 'p99_ms'}
+    """
+    samples = sorted(times)
+    return {
+        'count': len(samples),
+        'mean_ms': round(sum(samples) / len(samples), 2) if samples else 0.0,
+        'max_ms': round(samples[-1], 2) if samples else 0.0,
+        'p50_ms': percentile(samples, 0.5),
+        'p95_ms': percentile(samples, 0.95),
+        'p99_ms': percentile(samples, 0.99)
+    }
+
+
+def summarize(players, games):
+    """
+    汇总比赛结果
+    :return: {'pairs': [两两对局的得分率与置信区间], 'players': {选手名称: 每步用时分布等}}
+    """
+    pairs = []
+    for i in range(len(players)):
+        for j in range(i + 1, len(players)):
+            first, second = players[i]['name'], players[j]['name']
+            played = [game for game in games if {game['black'], game['white']} == {first, second}]
+            wins = sum(1 for game in played if game['winner'] == first)
+            losses = sum(1 for game in played if game['winner'] == second)
+            draws = len(played) - wins - losses
+            score = wins + 0.5 * draws
+            rate = score / len(played) if played else 0.0
+            low, high = wilson_interval(score, len(played))
+            pairs.append({
+                'player': first, 'opponent': second, 'games': len(played),
+                'wins': wins, 'losses': losses, 'draws': draws,
+                'score_rate': round(rate, 4), 'ci_low': round(low, 4), 'ci_high': round(high, 4),
+                'elo_difference': elo_difference(rate),
+                'black_wins': sum(1 for game in played if game['winner'] and game['winner'] == game['black'])
+            })
+
+    summary = {}
+    for config in players:
+        name = config['name']
+        times = []
+        depth_total = 0
+        nodes = 0
+        count = 0
+        played = 0
+        score = 0.0
+        for game in games:
+            if name not in (game['black'], game['white']):
+                continue
+            played += 1
+            score += 1.0 if game['winner'] == name else (0.5 if game['winner'] is None else 0.0)
+            for move in game['moves'][name]:
+                times.append(move['time_ms'])
+                depth_total += move['depth']
+                nodes += move['nodes']
+                count += 1
+        summary[name] = {
+            'config': config,
+            'games': played,
+            'score_rate': round(score / played, 4) if played else 0.0,
+            'latency': latency_summary(times),
+            'avg_depth': round(depth_total / count, 2) if count else 0.0,
+            'avg_nodes': round(nodes / count) if count else 0
+        }
+    return {'pairs': pairs, 'players': summary}
+
+
+def run_tournament(players, rounds=10, board_size=15, opening_plies=4, workers=1, seed=0, log=None):
+    """
+    运行比赛
+    :param players: 选手配置列表（见 parse_player），至少两个且名称不重复
+    :param rounds: 每两个选手之间的随机开局数（每个开局下两局）
+    :param workers: 并行下棋的工作进程数，1表示在当前进程内依次下
+    :param log: 可选的回调 log(已完成局数, 总局数, 对局结果)
+    :return: {'meta', 'games', 'pairs', 'players'}
+    """
+    names = [config['name'] for config in players]
+    if len(players) < 2 or len(set(names)) != len(names):
+        raise ValueError('至少需要两个名称不同的选手')
+    tasks = schedule(players, rounds, board_size, opening_plies, seed)
+    start = time.perf_counter()
+    games = []
+    if workers > 1:
+        # 与根节点并行搜索一样使用spawn方式启动工作进程
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            for game in pool.map(play_game, tasks):
+                games.append(game)
+                if log is not None:
+                    log(len(games), len(tasks), game)
+    else:
+        for task in tasks:
+            games.append(play_game(task))
+            if log is not None:
+                log(len(games), len(tasks), games[-1])
+
+    results = summarize(players, games)
+    results['meta'] = {
+        'board_size': board_size,
+        'rounds': rounds,
+        'opening_plies': opening_plies,
+        'workers': workers,
+        'seed': seed,
+        'elapsed_s': round(time.perf_counter() - start, 2)
+    }
+    results['games'] = games
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='五子棋AI自对弈比赛')
+    parser.add_argument('--player', action='append', required=True,
+                        help='选手配置，逗号分隔的 key=value（%s），至少指定两次' % '/'.join(PLAYER_KEYS))
+    parser.add_argument('--games', type=int, default=10, help='每两个选手之间的随机开局数（每个开局下两局）')
+    parser.add_argument('--board-size', type=int, default=15, help='棋盘大小')
+    parser.add_argument('--opening-plies', type=int, default=4, help='随机开局的棋子数')
+    parser.add_argument('--workers', type=int, default=1, help='并行下棋的工作进程数')
+    parser.add_argument('--seed', type=int, default=0, help='随机开局的种子')
+    parser.add_argument('--output', default=None, help='把完整结果（含每局记录）写入JSON文件')
+    args = parser.parse_args()
+
+    players = [parse_player(spec) for spec in args.player]
+
+    def log(done, total, game):
+        print('[%d/%d] 黑 %s  白 %s  -> %s (%d手)' % (
+            done, total, game['black'], game['white'], game['winner'] or '平局', game['plies']),
+            file=sys.stderr)
+
+    results = run_tournament(players, args.games, args.board_size, args.opening_plies,
+                             args.workers, args.seed, log)
+
+    for pair in results['pairs']:
+        print('%s 对 %s：%d局 %d胜 %d负 %d和，得分率 %.1f%% (95%%置信区间 %.1f%% - %.1f%%)，等级分差 %s' % (
+            pair['player'], pair['opponent'], pair['games'], pair['wins'], pair['losses'], pair['draws'],
+            pair['score_rate'] * 100, pair['ci_low'] * 100, pair['ci_high'] * 100,
+            '-' if pair['elo_difference'] is None else '%+d' % pair['elo_difference']))
+    for name, item in results['players'].items():
+        latency = item['latency']
+        print('%s：每步用时 平均 %.1f ms  p50 %.0f  p95 %.0f  p99 %.0f  最大 %.1f ms，平均深度 %.2f，平均节点 %d' % (
+            name, latency['mean_ms'], latency['p50_ms'], latency['p95_ms'], latency['p99_ms'],
+            latency['max_ms'], item['avg_depth'], item['avg_nodes']))
+    print('用时 %.1f 秒' % results['meta']['elapsed_s'])
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+置换表（Transposition Table）
+按Zobrist哈希缓存搜索结果，避免不同落子顺序到达的同一局面被重复搜索
+"""
+
+# 边界类型
+EXACT = 0   # 精确值
+LOWER = 1   # 下界（发生了beta剪枝，真实值 >= score）
+UPPER = 2   # 上界（所有走法都没超过alpha，真实值 <= score）
+
+
+class TranspositionTable:
+    def __init__(self, size_bits=16):
+        """
+        初始化置换表
+        :param size_bits: 槽位数量的二进制位数，表中共 2**size_bits 个槽位
+        """
+        self.size = 1 << size_bits
+        self.mask = self.size - 1
+        self.slots = [None] * self.size
+        self.generation = 0
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    def new_search(self):
+        """开始新一轮搜索，旧代的条目会被优先替换"""
+        self.generation = (self.generation + 1) & 0xFF
+
+    def clear(self):
+        """清空置换表"""
+        self.slots = [None] * self.size
+        self.probes = self.hits = self.stores = 0
+
+    def probe(self, key):
+        """
+        查询置换表
+        :param key: 局面哈希
+        :return: (depth, flag, score, best_move)，未命中返回None
+        """
+        self.probes += 1
+        entry = self.slots[key & self.mask]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry[1], entry[2], entry[3], entry[4]
+        return None
+
+    def store(self, key, depth, flag, score, best_move):
+        """
+        写入置换表
+        替换策略：空槽、同一局面、旧一代的条目直接替换；
+        同代的其他局面只有在新结果搜索深度不低于旧结果时才替换
+        """
+        slot = key & self.mask
+        entry = self.slots[slot]
+        if (entry is None or entry[0] == key or
+                entry[5] != self.generation or depth >= entry[1]):
+            self.slots[slot] = (key, depth, flag, score, best_move, self.generation)
+            self.stores += 1
+
+    def get_best_move(self, key):
+        """获取某局面在表中记录的最佳落子，没有则返回None"""
+        entry = self.slots[key & self.mask]
+        if entry is not None and entry[0] == key:
+            return entry[4]
+        return None
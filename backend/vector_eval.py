@@ -0,0 +1,155 @@
+"""
+NumPy向量化评估（可选后端）
+把棋盘四周各补 WINDOW_RADIUS 格"棋盘外"标记后，用步长视图取出每个格子在四个方向上的9格窗口，
+一次数组运算就能算完全部3-5格窗口的棋型分、全部空位的立即威胁，以及一批候选位置的落点价值。
+计算结果与纯Python实现（IncrementalEvaluator、evaluate_position_value）完全一致；未安装NumPy时 HAS_NUMPY 为False，调用方回退到纯Python实现。
+"""
+
+try:
+    import numpy as np
+    from numpy.lib.stride_tricks import as_strided
+except ImportError:
+    np = None
+    as_strided = None
+
+from patterns import PATTERN_TABLE, WINDOW_SCORES, WINDOW_RADIUS, WINDOW_SIZE, DIRECTIONS
+
+HAS_NUMPY = np is not None
+
+# 补边宽度与棋盘外标记（既不是空位也不是任何一方的棋子）
+PAD = WINDOW_RADIUS
+OFF_BOARD = 3
+# 全盘评估时在棋子范围外保留的格数：离棋子更远的格子，其窗口内没有棋子，
+# 靠近区域边缘的格子把区域外当作棋盘外也不影响结果
+REGION_MARGIN = 2 * PAD + 1
+
+if HAS_NUMPY:
+    # 窗口长度 -> 按己方棋子数索引的窗口得分（已乘以棋子数，对应每颗棋子各计一次）
+    WEIGHTED_WINDOW_SCORES = {
+        length: np.array([count * WINDOW_SCORES.get((length, count), 0)
+                          for count in range(length + 1)], dtype=np.int64)
+        for length in (3, 4, 5)
+    }
+    # 窗口编码的各位权重与按编码索引的方向潜力分
+    POWERS_OF_THREE = 3 ** np.arange(WINDOW_SIZE - 1, -1, -1, dtype=np.int64)
+    PATTERN_SCORES = np.array([entry[1] for entry in PATTERN_TABLE], dtype=np.int64)
+
+
+def padded_region(game, top, left, bottom, right):
+    """
+    取出棋盘上的一块矩形区域并四周补边，区域外仍在棋盘内的格子照常取出，棋盘外为 OFF_BOARD
+    大棋盘上只需处理棋子附近的区域，计算量与棋盘面积无关
+    :param top, left, bottom, right: 区域的行列范围（含两端）
+    :return: 形状为 (1, H, W) 的int8数组，H = bottom-top+1+2*PAD，W = right-left+1+2*PAD
+    """
+    size = game.board_size
+    board = np.frombuffer(game.cells, dtype=np.uint8).reshape(size, size)
+    padded = np.full((1, bottom - top + 1 + 2 * PAD, right - left + 1 + 2 * PAD), OFF_BOARD, dtype=np.int8)
+    r0, r1 = max(0, top - PAD), min(size, bottom + PAD + 1)
+    c0, c1 = max(0, left - PAD), min(size, right + PAD + 1)
+    padded[0, r0 - top + PAD:r1 - top + PAD, c0 - left + PAD:c1 - left + PAD] = board[r0:r1, c0:c1]
+    return padded
+
+
+def window_view(padded, dx, dy):
+    """
+    步长视图：view[b, r, c, k] 为第b块区域上 (r, c) 沿方向 (dx, dy) 偏移 k-PAD 格的格子
+    四个方向在补边后的一维数组上都是正步长，视图不复制数据
+    :param padded: padded_region 的返回值（必须是连续数组）
+    :return: 形状为 (B, H-2*PAD, W-2*PAD, WINDOW_SIZE) 的只读视图
+    """
+    count, height, width = padded.shape
+    flat = padded.reshape(-1)
+    offset = (PAD - PAD * dx) * width + (PAD - PAD * dy)
+    item = flat.itemsize
+    return as_strided(flat[offset:],
+                      shape=(count, height - 2 * PAD, width - 2 * PAD, WINDOW_SIZE),
+                      strides=(height * width * item, width * item, item, (dx * width + dy) * item),
+                      writeable=False)
+
+
+def padded_components(padded):
+    """
+    计算补边后的一批棋盘区域的评估分量
+    :param padded: padded_region 的返回值
+    :return: 形状为 (B, 4) 的数组，每行为 (黑方棋型分, 白方棋型分, 黑方威胁数, 白方威胁数)，
+             与 IncrementalEvaluator 的 pattern_score / threat_count 一致
+    """
+    result = np.zeros((len(padded), 4), dtype=np.int64)
+    for dx, dy in DIRECTIONS:
+        view = window_view(padded, dx, dy)
+        black = view == 1
+        white = view == 2
+        off_board = view == OFF_BOARD
+
+        # 棋型分：从每个格子出发、完全在棋盘内且只含一方棋子的3-5格窗口
+        for length in (3, 4, 5):
+            window = slice(PAD, PAD + length)
+            black_count = black[..., window].sum(axis=-1)
+            white_count = white[..., window].sum(axis=-1)
+            valid = ~off_board[..., window].any(axis=-1)
+            scores = WEIGHTED_WINDOW_SCORES[length]
+            result[:, 0] += (scores[black_count] * (valid & (white_count == 0))).sum(axis=(1, 2))
+            result[:, 1] += (scores[white_count] * (valid & (black_count == 0))).sum(axis=(1, 2))
+
+        # 威胁数：空位试放一子后的连子数（两侧各最多数3格即可区分"3"与"4以上"）
+        empty = view[..., PAD] == 0
+        live_ends = (view[..., PAD + 4] == 0) & (view[..., PAD - 1] == 0)
+        for column, stones in ((2, black), (3, white)):
+            forward = stones[..., PAD + 1].astype(np.int8)
+            backward = stones[..., PAD - 1].astype(np.int8)
+            run_forward = forward.copy()
+            run_backward = backward.copy()
+            for k in (2, 3):
+                forward &= stones[..., PAD + k]
+                backward &= stones[..., PAD - k]
+                run_forward += forward
+                run_backward += backward
+            count = 1 + run_forward + run_backward
+            threats = empty & ((count >= 4) | ((count == 3) & live_ends))
+            result[:, column] += threats.sum(axis=(1, 2))
+    return result
+
+
+def evaluate_components(game):
+    """
+    单个棋盘的评估分量，返回 (黑方棋型分, 白方棋型分, 黑方威胁数, 白方威胁数)
+    只计算棋子外围 REGION_MARGIN 格以内的区域，更远的空位不会形成棋型或威胁
+    """
+    region = game.occupied_region(REGION_MARGIN)
+    if region is None:
+        return 0, 0, 0, 0
+    padded = padded_region(game, *region)
+    black_pattern, white_pattern, black_threats, white_threats = padded_components(padded)[0]
+    return int(black_pattern), int(white_pattern), int(black_threats), int(white_threats)
+
+
+def position_values(game, indices, ai_player, human_player, neighbor_counts):
+    """
+    批量计算候选位置的落点价值，等价于对每个位置调用 GomokuAI.evaluate_position_value
+    :param game: GomokuGame实例
+    :param indices: 候选空位的一维索引列表
+    :param neighbor_counts: 与indices对应的周围棋子数
+    :return: 与indices对应的价值列表
+    """
+    size = game.board_size
+    rows, cols = np.divmod(np.asarray(indices, dtype=np.int64), size)
+    neighbors = np.asarray(neighbor_counts, dtype=np.int64)
+    # 只取出覆盖全部候选位置窗口的区域
+    top, left = int(rows.min()), int(cols.min())
+    padded = padded_region(game, top, left, int(rows.max()), int(cols.max()))
+
+    potential = np.zeros(len(indices), dtype=np.float64)
+    for dx, dy in DIRECTIONS:
+        windows = window_view(padded, dx, dy)[0, rows - top, cols - left]
+        for player, weight in ((ai_player, 2), (human_player, 1.5)):
+            # 按落子方视角编码：0空位，1己方（中心视为己方），2对方或棋盘外
+            digits = np.where(windows == 0, 0, np.where(windows == player, 1, 2))
+            digits[:, WINDOW_RADIUS] = 1
+            potential += PATTERN_SCORES[digits @ POWERS_OF_THREE] * weight
+
+    center = size // 2
+    center_bonus = np.maximum(0, 5 - (np.abs(rows - center) + np.abs(cols - center)))
+    values = neighbors * 20 + potential + center_bonus
+    values[neighbors == 0] = 0  # 孤立位置不考虑
+    return values.tolist()